@@ -13,10 +13,11 @@ xarray
 
 Functions
 ---------
+fingerprint
 get_shape
 """
 from . import dask, deco, numpy, pandas, xarray
-from .array import cdot, get_shape, unvec, vec
+from .array import cdot, fingerprint, get_shape, unvec, vec
 
 __all__ = [
     "dask",
@@ -28,4 +29,5 @@ __all__ = [
     "vec",
     "unvec",
     "cdot",
+    "fingerprint",
 ]
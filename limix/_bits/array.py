@@ -33,3 +33,21 @@ def cdot(A, B):
     BB = tile(B, A.shape[1])
     AA = repeat(A, B.shape[1], axis=1)
     return AA * BB
+
+
+def fingerprint(*args):
+    """
+    Hash of the given arrays and objects.
+    """
+    from hashlib import sha1
+    from numpy import ascontiguousarray, ndarray
+
+    h = sha1()
+    for a in args:
+        if isinstance(a, ndarray):
+            h.update(str((a.dtype, a.shape)).encode())
+            h.update(ascontiguousarray(a).view("u1").data)
+        else:
+            h.update(repr(a).encode())
+        h.update(b"\0")
+    return h.hexdigest()
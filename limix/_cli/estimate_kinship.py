@@ -19,30 +19,34 @@ import limix
     "--verbose/--quiet", "-v/-q", help="Enable or disable verbose mode.", default=True
 )
 def estimate_kinship(ctx, input_file, output_file, filetype, verbose):
-    """Estimate a kinship matrix."""
+    """Estimate a kinship matrix.
+
+    The kinship matrix is written to the NumPy .npy output file while it is
+    being computed, one panel of rows at a time. It can therefore be larger than
+    the available memory. BGEN variants are read and converted to dosages one
+    block at a time.
+    """
+    from limix.io._detect import infer_filetype
 
     if filetype == "guess":
-        filetype = limix.io.detect_file_type(input_file)
+        filetype = infer_filetype(input_file)
 
     if verbose:
         print("Detected file type: {}".format(filetype))
 
     if filetype == "bgen":
-        raise NotImplementedError()
-        # G = limix.io.bgen._read_dosage(input_file, verbose=verbose)
+        G = limix.io.bgen._read_dosage(input_file, verbose=verbose)
     elif filetype == "bed":
         G = limix.io.plink._read_dosage(input_file, verbose=verbose)
     else:
         print("Unknown file type: %s" % input_file)
-
-    K = limix.stats.linear_kinship(G, verbose=verbose)
+        return
 
     if output_file is None:
         output_file = input_file + ".npy"
 
-    output_file, oft = limix.io.detect_file_type(output_file)
-
-    if oft == "npy":
-        limix.io.npy.save_kinship(output_file, K, verbose=verbose)
-    else:
+    if infer_filetype(output_file) != "npy":
         print("Unknown output file type: %s" % output_file)
+        return
+
+    limix.stats.linear_kinship(G, out=output_file, verbose=verbose)
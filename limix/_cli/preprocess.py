@@ -26,6 +26,7 @@ def impute(data, spec):
     else:
         raise ValueError(f"Unrecognized impute method: {method}.")
 
+    x.attrs.pop("summary", None)
     data[varname] = x
 
     return data
@@ -61,6 +62,7 @@ def normalize(data, spec):
     else:
         raise ValueError(f"Unrecognized normalization method: {method}.")
 
+    x.attrs.pop("summary", None)
     data[varname] = x
 
     return data
@@ -113,21 +115,65 @@ def drop_missing(data, spec):
     if dim == "":
         dim = x.dims[-1]
 
-    data[varname] = data[varname].dropna(dim, method)
+    if varname == "G" and dim == "candidate" and method in ["any", "all"]:
+        summary = _genotype_summary(x)
+        missing = summary["missing"].values
+        if method == "any":
+            ok = missing == 0
+        else:
+            ok = missing < 1
+        data[varname] = _subset_candidates(x, summary, ok)
+    else:
+        data[varname] = data[varname].dropna(dim, method)
 
     return data
 
 
 def drop_maf(data, spec):
-    raise NotImplementedError()
+    try:
+        maf = float(spec.strip())
+    except ValueError:
+        raise ValueError(_syntax_error_msg("Drop-maf", "<THRESHOLD>", spec))
+
+    G = data["G"]
+    summary = _genotype_summary(G)
+    ok = summary["maf"].values >= maf
+    data["G"] = _subset_candidates(G, summary, ok)
+
+    return data
+
 
+def _genotype_summary(G):
+    """
+    Genotype summary, kept in the attributes of ``G`` for the steps that follow.
 
-# def _process_filter_maf(maf, G):
-#     from limix import compute_maf
+    It is computed again if the samples or the candidates of ``G`` no longer match
+    the ones it was computed from. Steps changing the genotype values drop it.
+    """
+    from numpy import array_equal
+    import limix
 
-#     mafs = compute_maf(G)
-#     ok = mafs >= maf
-#     return G.isel(candidate=ok)
+    if "summary" in G.attrs:
+        samples, summary = G.attrs["summary"]
+        if "candidate" in G.coords:
+            same_candidates = array_equal(summary.index.values, G.candidate.values)
+        else:
+            same_candidates = summary.shape[0] == G.candidate.size
+        if same_candidates and array_equal(samples, G.sample.values):
+            return summary
+
+    summary = limix.qc.genotype_summary(G, verbose=False)
+    G.attrs["summary"] = (G.sample.values, summary)
+    return summary
+
+
+def _subset_candidates(G, summary, ok):
+    """
+    Keep the candidates of ``G``, and the rows of its summary, selected by ``ok``.
+    """
+    G = G.isel(candidate=ok)
+    G.attrs["summary"] = (G.sample.values, summary[ok])
+    return G
 
 
 def _syntax_error_msg(what, syntax, spec):
@@ -66,6 +66,33 @@ from ._click import OrderedCommand
 @click.option(
     "--output-dir", help="Specify the output directory path.", default="output"
 )
+@click.option(
+    "--flush-every",
+    help=(
+        "Number of tests kept in memory before being appended to the output files."
+        " Defaults to 10000."
+    ),
+    default=10000,
+    type=int,
+)
+@click.option(
+    "--checkpoint-dir",
+    help=(
+        "Directory recording the fitted null model and the finished blocks of"
+        " candidates. Running the same scan again with this directory resumes it."
+    ),
+    default=None,
+)
+@click.option(
+    "--many-traits",
+    help=(
+        "Test every trait independently, sharing the kinship decomposition and the"
+        " genotype reads among them. The results of each trait are saved to a"
+        " subdirectory of the output directory named after the trait."
+    ),
+    is_flag=True,
+    default=False,
+)
 @click.option(
     "--verbose/--quiet", "-v/-q", help="Enable or disable verbose mode.", default=True
 )
@@ -75,7 +102,19 @@ from ._click import OrderedCommand
     default=False,
 )
 def scan(
-    ctx, trait, genotype, covariate, kinship, lik, output_dir, verbose, dry_run, **_
+    ctx,
+    trait,
+    genotype,
+    covariate,
+    kinship,
+    lik,
+    output_dir,
+    flush_every,
+    checkpoint_dir,
+    many_traits,
+    verbose,
+    dry_run,
+    **_
 ):
     """ Single-variant association testing via mixed models.
 
@@ -122,7 +161,7 @@ def scan(
     from os.path import abspath, exists, join
     import traceback
     from limix._display import session_block, banner, session_line, indent, print_exc
-    from limix.qtl import scan
+    from limix.qtl import scan, scan_many, CSVSink
     from limix.io import fetch
     from .pipeline import Pipeline
     from limix._data import conform_dataset
@@ -201,16 +240,51 @@ def scan(
 
     if "K" not in data:
         data["K"] = None
+
+    if many_traits:
+        if lik != "normal" or checkpoint_dir is not None:
+            msg = "The --many-traits option supports neither --lik nor"
+            msg += " --checkpoint-dir."
+            print(msg)
+            sys.exit(1)
+        dirs = [join(output_dir, str(t)) for t in data["y"].trait.values]
+    else:
+        dirs = [output_dir]
+
+    # The tests are appended to the output files while the scan runs, so that an
+    # interrupted scan still leaves the tests done so far.
+    sinks = [CSVSink(d, flush_every) for d in dirs]
     try:
-        res = scan(
-            data["G"], data["y"], lik=lik, K=data["K"], M=data["M"], verbose=verbose
-        )
+        if many_traits:
+            results = scan_many(
+                data["G"],
+                data["y"],
+                K=data["K"],
+                M=data["M"],
+                sinks=sinks,
+                verbose=verbose,
+            )
+        else:
+            res = scan(
+                data["G"],
+                data["y"],
+                lik=lik,
+                K=data["K"],
+                M=data["M"],
+                sink=sinks[0],
+                checkpoint=checkpoint_dir,
+                verbose=verbose,
+            )
+            results = [res]
     except Exception as e:
         print_exc(traceback.format_stack(), e)
         sys.exit(1)
 
     with session_line("Saving results to `{}`... ".format(output_dir)):
-        res.to_csv(join(output_dir, "null.csv"), join(output_dir, "alt.csv"))
+        for d, res in zip(dirs, results):
+            effsizes = join(d, "h0_effsizes.csv")
+            variances = join(d, "h0_variances.csv")
+            res.h0.to_csv(effsizes, variances)
 
 
 def _clean_data_array_repr(arr):
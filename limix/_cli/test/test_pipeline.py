@@ -1,12 +1,15 @@
 import os
 
+import dask.array as da
+
 from numpy import nan
 from numpy.random import RandomState
 from numpy.testing import assert_allclose
 
 import limix
+from limix._data import conform_dataset
 from limix._cli.pipeline import Pipeline
-from limix._cli.preprocess import impute, normalize, where
+from limix._cli.preprocess import drop_maf, drop_missing, impute, normalize, where
 from limix.io._fetch import fetch
 
 
@@ -179,3 +182,35 @@ def test_pipeline_impute_and_normalize():
                 -1.429_964_275_028_744_2,
             ],
         )
+
+
+def test_pipeline_drop_maf_missing(monkeypatch):
+    random = RandomState(0)
+
+    G = random.randint(0, 3, size=(20, 6)).astype(float)
+    G[:, 1] = 0
+    G[:, 2] = 0
+    G[0, 2] = 1
+    G[3, 4] = nan
+    y = random.randn(20)
+
+    calls = []
+    genotype_summary = limix.qc.genotype_summary
+
+    def counted_summary(*args, **kwargs):
+        calls.append(None)
+        return genotype_summary(*args, **kwargs)
+
+    monkeypatch.setattr(limix.qc, "genotype_summary", counted_summary)
+
+    for X in [G, da.from_array(G, chunks=(20, 2))]:
+        del calls[:]
+        data = conform_dataset(y, G=X)
+        data = {k: v for k, v in data.items() if v is not None}
+
+        pipeline = Pipeline(data)
+        pipeline.append(drop_missing, "drop-missing", "genotype")
+        pipeline.append(drop_maf, "drop-maf", "0.05")
+        data = pipeline.run(verbose=False)
+        assert_allclose(data["G"].values, G[:, [0, 3, 5]])
+        assert len(calls) == 1
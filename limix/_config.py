@@ -3,4 +3,9 @@ config = {
     "display.fallback_width": 88,
     # Human-friendly line width for paragraphs.
     "display.text_width": 88,
+    # Approximate size in bytes of a genotype block read at once by the QTL scans and
+    # the kinship estimation.
+    "qtl.block_bytes": 256 * 1024 * 1024,
+    # Whether to save kinship eigendecompositions under the user cache directory.
+    "qs.cache": False,
 }
@@ -0,0 +1,138 @@
+def economic_qs(K):
+    """
+    Economic eigendecomposition of a covariance matrix.
+
+    It wraps :func:`numpy_sugar.linalg.economic_qs`. If ``limix.config["qs.cache"]``
+    is ``True``, decompositions are saved under :func:`limix.sh.user_cache_dir`,
+    keyed by a hash of ``K``, and a matrix decomposed before is loaded back instead
+    of being decomposed again.
+
+    Parameters
+    ----------
+    K : n×n array_like
+        Covariance matrix.
+
+    Returns
+    -------
+    tuple
+        ``((Q0, Q1), S0)``.
+    """
+    from numpy import asarray
+    from numpy_sugar.linalg import economic_qs as _economic_qs
+
+    from ._config import config
+    from ._bits import fingerprint
+
+    K = asarray(K, float)
+    if not config["qs.cache"]:
+        return _economic_qs(K)
+
+    filepath = _filepath(fingerprint(K))
+    QS = _load(filepath)
+    if QS is None:
+        QS = _economic_qs(K)
+        _save(filepath, QS)
+    return QS
+
+
+def economic_qs_linear(G):
+    """
+    Economic eigendecomposition of the linear kernel of a samples-by-variants matrix.
+
+    It decomposes ``K = G Gᵀ / p``, where p is the number of columns of ``G``, from a
+    singular value decomposition of ``G`` when p is smaller than the number of
+    samples n. This costs O(n²p) operations instead of the O(n³) of decomposing
+    ``K`` itself. Decompositions are cached as in :func:`economic_qs`.
+
+    Parameters
+    ----------
+    G : n×p array_like
+        Kinship factor.
+
+    Returns
+    -------
+    tuple
+        ``((Q0, Q1), S0)``.
+    """
+    from numpy import asarray
+
+    from ._config import config
+    from ._bits import fingerprint
+
+    G = asarray(G, float)
+    if G.shape[1] >= G.shape[0]:
+        return economic_qs(G @ G.T / G.shape[1])
+
+    if not config["qs.cache"]:
+        return _economic_qs_linear(G)
+
+    filepath = _filepath(fingerprint("linear", G))
+    QS = _load(filepath)
+    if QS is None:
+        QS = _economic_qs_linear(G)
+        _save(filepath, QS)
+    return QS
+
+
+def normalise_qs(QS):
+    """
+    Rescale a decomposition so that its matrix has diagonal mean equal to one.
+
+    It is equivalent to decomposing ``K / K.diagonal().mean()``.
+    """
+    from numpy import einsum
+
+    (Q0, Q1), S0 = QS
+    mean = einsum("ij,ij,j->", Q0, Q0, S0) / Q0.shape[0]
+    return ((Q0, Q1), S0 / mean)
+
+
+def _economic_qs_linear(G):
+    from numpy import concatenate, finfo, sqrt
+    from numpy.linalg import svd
+
+    # The eigenvectors of the null eigenvalues are needed as well, hence the full U.
+    (U, S, _) = svd(G, full_matrices=True)
+    S0 = S * S / G.shape[1]
+
+    ok = S0 >= sqrt(finfo(float).eps)
+    rank = len(S0)
+    Q0 = U[:, :rank][:, ok]
+    Q1 = concatenate([U[:, :rank][:, ~ok], U[:, rank:]], axis=1)
+    return ((Q0, Q1), S0[ok])
+
+
+def _filepath(key):
+    from os import makedirs
+    from os.path import join
+
+    from .sh._user_dir import user_cache_dir
+
+    dirpath = join(user_cache_dir(), "qs")
+    makedirs(dirpath, exist_ok=True)
+    return join(dirpath, key + ".pkl")
+
+
+def _load(filepath):
+    import pickle
+    from os.path import exists
+
+    if not exists(filepath):
+        return None
+
+    with open(filepath, "rb") as f:
+        return pickle.load(f)
+
+
+def _save(filepath, QS):
+    import pickle
+    from os import fdopen, replace
+    from os.path import dirname
+    from tempfile import mkstemp
+
+    # Several processes might decompose the same matrix at once, each writing to its
+    # own temporary file before renaming it.
+    fd, tmp = mkstemp(dir=dirname(filepath), suffix=".tmp")
+    with fdopen(fd, "wb") as f:
+        pickle.dump(QS, f, protocol=pickle.HIGHEST_PROTOCOL)
+    replace(tmp, filepath)
@@ -1,9 +1,10 @@
 from .._data import conform_dataset, normalize_likelihood
 from .._display import session_block, session_line
+from .._qs import economic_qs, economic_qs_linear, normalise_qs
 from ..qtl._assert import assert_finite
 
 
-def estimate(y, lik, K, M=None, verbose=True):
+def estimate(y, lik, K, M=None, QS=None, Gk=None, verbose=True):
     """
     Estimate the so-called narrow-sense heritability.
 
@@ -27,6 +28,18 @@ def estimate(y, lik, K, M=None, verbose=True):
         Covariates matrix. If an array is passed, it will used as is; no normalisation
         will be performed. If ``None`` is passed, an offset will be used as the only
         covariate. Defaults to ``None``.
+    QS : tuple, optional
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of ``K``, as returned by
+        :func:`numpy_sugar.linalg.economic_qs`. Passing it avoids decomposing ``K``
+        again when the same kinship matrix is used for several traits, in which case
+        ``K`` can be ``None``. It is normalised in the same way as ``K``. Defaults
+        to ``None``.
+    Gk : n×q array_like, optional
+        Kinship factor, for ``K = Gk Gkᵀ / q``. When q is smaller than the number of
+        samples, it is decomposed via a singular value decomposition at O(n²q) cost
+        instead of the O(n³) cost of decomposing ``K``, which can then be ``None``.
+        The rows of ``Gk`` must follow the sample order of ``y``.
+        Defaults to ``None``.
     verbose : bool, optional
         ``True`` to display progress and summary; ``False`` otherwise.
 
@@ -58,7 +71,6 @@ def estimate(y, lik, K, M=None, verbose=True):
     It will raise a ``ValueError`` exception if non-finite values are passed. Please,
     refer to the :func:`limix.qc.mean_impute` function for missing value imputation.
     """
-    from numpy_sugar.linalg import economic_qs
     from numpy import pi, var, diag
     from glimix_core.glmm import GLMMExpFam
     from glimix_core.lmm import LMM
@@ -77,11 +89,13 @@ def estimate(y, lik, K, M=None, verbose=True):
 
         assert_finite(y, M, K)
 
-        if K is not None:
+        if QS is not None:
+            QS = normalise_qs(QS)
+        elif Gk is not None:
+            QS = normalise_qs(economic_qs_linear(Gk))
+        elif K is not None:
             K = K / diag(K).mean()
             QS = economic_qs(K)
-        else:
-            QS = None
 
         if lik_name == "normal":
             method = LMM(y.values, M.values, QS, restricted=True)
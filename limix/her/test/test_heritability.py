@@ -49,3 +49,29 @@ def test_heritability_estimate_normal():
 
     h2 = estimate(y, "normal", K, verbose=False)
     assert_allclose(h2, 0.9751053293095242, rtol=1e-5)
+
+
+def test_heritability_estimate_qs():
+    from numpy_sugar.linalg import economic_qs
+
+    random = RandomState(0)
+
+    G = random.randn(50, 100)
+    K = dot(G, G.T)
+    z = dot(G, random.randn(100)) / sqrt(100)
+    y = z + 0.2 * random.randn(50)
+
+    h2 = estimate(y, "normal", None, QS=economic_qs(K), verbose=False)
+    assert_allclose(h2, 0.9751053293095242, rtol=1e-5)
+
+
+def test_heritability_estimate_kinship_factor():
+    random = RandomState(0)
+
+    G = random.randn(50, 30)
+    K = dot(G, G.T)
+    z = dot(G, random.randn(30)) / sqrt(30)
+    y = z + 0.2 * random.randn(50)
+
+    h2 = estimate(y, "normal", K, verbose=False)
+    assert_allclose(estimate(y, "normal", None, Gk=G, verbose=False), h2, rtol=1e-5)
@@ -95,3 +95,76 @@ def _create_metadata_file(bgen_filepath, metadata_filepath, verbose=True):
     from bgen_reader import create_metadata_file
 
     create_metadata_file(bgen_filepath, metadata_filepath, verbose=True)
+
+
+def _read_dosage(filepath, verbose=True, block_size=None):
+    """
+    Read the dosage of the alternative allele of every biallelic variant.
+
+    Variants are read in blocks, lazily, and the probabilities of a block are
+    converted to dosages as soon as they are read. The samples-by-variants
+    probability tensor is therefore never held in memory at once.
+
+    Parameters
+    ----------
+    filepath : str
+        A BGEN file path.
+    verbose : bool, optional
+        ``True`` to show progress; ``False`` otherwise.
+    block_size : int, optional
+        Number of variants per block. If ``None``, it is chosen from
+        ``limix.config["qtl.block_bytes"]``. Defaults to ``None``.
+
+    Returns
+    -------
+    :class:`dask.array.Array`
+        Samples-by-variants dosage matrix, with one chunk per block of variants.
+        The last allele of each variant is taken as the alternative one, as in
+        :func:`bgen_reader.compute_dosage`.
+    """
+    import dask.array as da
+    from bgen_reader import read_bgen
+    from dask import delayed
+
+    from .._config import config
+
+    bgen = read_bgen(filepath, verbose=verbose)
+    variants = bgen["variants"].compute()
+    genotype = bgen["genotype"]
+    n = len(bgen["samples"])
+    m = len(variants)
+
+    if (variants["nalleles"] != 2).any():
+        raise ValueError("Dosages can only be computed for biallelic variants.")
+
+    if block_size is None:
+        # Three probabilities per sample and variant are read for each dosage.
+        block_size = max(config["qtl.block_bytes"] // (8 * 4 * max(n, 1)), 1)
+
+    blocks = []
+    for start in range(0, m, block_size):
+        stop = min(start + block_size, m)
+        block = delayed(_dosage_block)(genotype[start:stop], n)
+        blocks.append(da.from_delayed(block, (n, stop - start), float))
+
+    if len(blocks) == 0:
+        return da.zeros((n, 0), chunks=(n, 1))
+    return da.concatenate(blocks, axis=1)
+
+
+def _dosage_block(genotypes, nsamples):
+    from numpy import arange, empty, isnan, nan, where
+
+    X = empty((nsamples, len(genotypes)))
+    for i, geno in enumerate(genotypes):
+        p = geno["probs"]
+        # Samples of lower ploidy have their trailing probabilities set to NaN.
+        p = where(isnan(p), 0.0, p)
+        if geno["phased"]:
+            # Haplotype probabilities are laid out as (ref, alt) pairs.
+            X[:, i] = p[:, 1::2].sum(1)
+        else:
+            # The j-th genotype of a biallelic variant carries j alternative alleles.
+            X[:, i] = p @ arange(p.shape[1], dtype=float)
+        X[geno["missing"], i] = nan
+    return X
@@ -1,7 +1,7 @@
 from .._display import session_line as _session_line
 
 
-def read(filepath, verbose=True):
+def read(filepath, verbose=True, lazy=False):
     """
     Read NumPy arrays saved in a file.
 
@@ -11,6 +11,11 @@ def read(filepath, verbose=True):
         File path.
     verbose : bool, optional
         Defaults to ``True``.
+    lazy : bool, optional
+        ``True`` to memory-map a ``.npy`` file and return it as a dask array, whose
+        blocks of rows are only read when computed. It allows for using arrays
+        larger than the available memory, like a kinship matrix written by
+        :func:`limix.stats.linear_kinship`. Defaults to ``False``.
 
     Returns
     -------
@@ -20,7 +25,14 @@ def read(filepath, verbose=True):
     from numpy import load
 
     with _session_line("Reading {}...".format(filepath), disable=not verbose):
-        return load(filepath)
+        if not lazy:
+            return load(filepath)
+
+        import dask.array as da
+
+        X = load(filepath, mmap_mode="r")
+        chunks = ("auto",) + X.shape[1:]
+        return da.from_array(X, chunks=chunks)
 
 
 def _see(filepath, verbose=True):
@@ -23,3 +23,22 @@ def test_io_gen():
         assert_equal(df["sample"]["sample_id"][1], "1A1")
         assert_equal(df["sample"]["age"][0], 4)
         assert_allclose(df["genotype"]["1A4"]["AB"][0], 0.0207)
+
+
+def test_io_bgen_dosage():
+    from bgen_reader import allele_expectation, compute_dosage, example_files
+
+    with example_files("example.32bits.bgen") as filepath:
+        bgen = io.bgen.read(filepath, verbose=False)
+        X = io.bgen._read_dosage(filepath, verbose=False, block_size=7)
+        assert_equal(X.shape, (500, 199))
+        assert_equal(X.chunks[1][:2], (7, 7))
+
+        X = X.compute()
+        for i in [0, 3, 198]:
+            d = compute_dosage(allele_expectation(bgen, i))
+            assert_allclose(X[:, i], d)
+
+    with example_files("haplotypes.bgen") as filepath:
+        X = io.bgen._read_dosage(filepath, verbose=False).compute()
+        assert_allclose(X[:, 0], [0, 1, 1, 2])
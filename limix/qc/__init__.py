@@ -1,5 +1,6 @@
 from ._allele import compute_maf
 from ._boxcox import boxcox
+from ._clump import clump
 from ._covariance import normalise_covariance
 from ._impute import mean_impute
 from ._ld import indep_pairwise
@@ -7,12 +8,15 @@ from ._linalg import remove_dependent_cols
 from ._mean_std import mean_standardize
 from ._missing import count_missingness
 from ._quant_gauss import quantile_gaussianize
+from ._summary import genotype_summary
 from ._unique import unique_variants
 
 __all__ = [
     "boxcox",
+    "clump",
     "compute_maf",
     "count_missingness",
+    "genotype_summary",
     "indep_pairwise",
     "mean_impute",
     "mean_standardize",
@@ -1,7 +1,7 @@
 from __future__ import division
 
 
-def compute_maf(X):
+def compute_maf(X, summary=None):
     r"""Compute minor allele frequencies.
 
     It assumes that ``X`` encodes 0, 1, and 2 representing the number
@@ -11,6 +11,9 @@ def compute_maf(X):
     ----------
     X : array_like
         Genotype matrix.
+    summary : :class:`pandas.DataFrame`, optional
+        Output of :func:`limix.qc.genotype_summary` for ``X``. Its ``maf`` column is
+        returned instead of reading ``X`` again. Defaults to ``None``.
 
     Returns
     -------
@@ -35,6 +38,9 @@ def compute_maf(X):
     from pandas import DataFrame
     from numpy import isnan, logical_not, minimum, nansum
 
+    if summary is not None:
+        return summary["maf"].values
+
     if isinstance(X, da.Array):
         s0 = da.nansum(X, axis=0).compute()
         denom = 2 * (X.shape[0] - da.isnan(X).sum(axis=0)).compute()
@@ -0,0 +1,186 @@
+from __future__ import division
+
+
+def clump(
+    stats,
+    G,
+    window_size,
+    threshold,
+    p1=1e-4,
+    p2=1e-2,
+    pv="pv20",
+    verbose=True,
+    unit="variant",
+    chrom=None,
+    pos=None,
+):
+    """
+    Clump association results by linkage disequilibrium.
+
+    Tests having a p-value not greater than ``p1`` are taken as index variants, from
+    the most to the least significant one. Each index variant clumps every other test
+    having a p-value not greater than ``p2``, lying in the same chromosome at most
+    ``window_size`` away, and whose squared Pearson correlation with the index
+    variant is greater than ``threshold``. A clumped test is neither an index
+    variant nor a member of later clumps, as in PLINK's ``--clump``.
+
+    Correlations are computed only between index variants and their neighbours. The
+    variants involved are read from ``G`` on demand and kept standardised in a cache,
+    so the cost depends on the number of significant tests rather than on the number
+    of variants.
+
+    Parameters
+    ----------
+    stats : :class:`pandas.DataFrame`
+        Test statistics, such as :attr:`limix.qtl._result.STScanResult.stats`. Its
+        index gives the column of ``G`` of each test.
+    G : array_like
+        Sample by variants matrix. If it is a :class:`xarray.DataArray` having
+        ``chrom``, ``pos``, or ``cm`` coordinates, those are used for ``chrom`` and
+        ``pos`` when not given.
+    window_size : int, float
+        Maximum distance between an index variant and the variants it clumps, in the
+        unit given by ``unit``.
+    threshold : float
+        Squared Pearson correlation above which a test is clumped.
+    p1 : float, optional
+        Significance threshold for index variants. Defaults to ``1e-4``.
+    p2 : float, optional
+        Significance threshold for clumped variants. Defaults to ``1e-2``.
+    pv : str, optional
+        Column of ``stats`` holding the p-values. Defaults to ``"pv20"``.
+    verbose : bool, optional
+        ``True`` for progress information; ``False`` otherwise.
+    unit : str, optional
+        ``"variant"``, ``"bp"``, or ``"cm"``, as for
+        :func:`limix.qc.indep_pairwise`. Defaults to ``"variant"``.
+    chrom : array_like, optional
+        Chromosome of each variant. If ``None``, all variants are assumed to lie on
+        the same chromosome. Defaults to ``None``.
+    pos : array_like, optional
+        Position of each variant within its chromosome, in base pairs for
+        ``unit="bp"`` or in centimorgans for ``unit="cm"``. Defaults to ``None``.
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        One row per clump, indexed by the test of its index variant, with the p-value
+        of the index variant, the number of clumped tests, and the list of clumped
+        tests, in the ``pv``, ``size``, and ``clumped`` columns.
+
+    Example
+    -------
+
+    .. doctest::
+
+        >>> from numpy.random import RandomState
+        >>> from pandas import DataFrame
+        >>> from limix.qc import clump
+        >>>
+        >>> random = RandomState(0)
+        >>> G = random.randn(50, 6)
+        >>> G[:, 1] = G[:, 0] + random.randn(50) / 10
+        >>> stats = DataFrame({"pv20": [1e-8, 1e-6, 0.5, 1e-5, 0.2, 1e-3]})
+        >>>
+        >>> print(clump(stats, G, 3, 0.5, verbose=False))
+                        pv  size clumped
+        test
+        0     1.000000e-08     1     [1]
+        3     1.000000e-05     0      []
+    """
+    from numpy import argsort, asarray, errstate, ones, searchsorted, unique, zeros
+    from pandas import DataFrame
+    from tqdm import tqdm
+
+    if unit not in ["variant", "bp", "cm"]:
+        raise ValueError("Unknown window unit: {}.".format(unit))
+
+    coords = {}
+    if hasattr(G, "coords"):
+        coords = G.coords
+        G = G.data
+
+    nvariants = G.shape[1]
+    if chrom is None and "chrom" in coords:
+        chrom = coords["chrom"].values
+    if chrom is None:
+        chrom = zeros(nvariants, int)
+    (_, chrom) = unique(asarray(chrom), return_inverse=True)
+
+    if unit == "variant":
+        pos = range(nvariants)
+    elif pos is None:
+        name = {"bp": "pos", "cm": "cm"}[unit]
+        if name not in coords:
+            raise ValueError("Positions are required for windows in {}.".format(unit))
+        pos = coords[name].values
+    pos = asarray(pos, float)
+
+    tests = asarray(stats.index, int)
+    pvalues = asarray(stats[pv], float)
+
+    # Tests that can be clumped, sorted by chromosome and position. Chromosomes are
+    # laid one after the other, far enough apart for windows not to cross them.
+    ok = pvalues <= p2
+    tests = tests[ok]
+    pvalues = pvalues[ok]
+    span = pos.max() - pos.min() + window_size + 1 if nvariants > 0 else 0
+    keys = chrom[tests] * span + pos[tests]
+    order = argsort(keys, kind="mergesort")
+    tests = tests[order]
+    pvalues = pvalues[order]
+    keys = keys[order]
+
+    free = ones(len(tests), bool)
+    cache = _ColumnCache(G)
+
+    clumps = []
+    indices = [i for i in argsort(pvalues, kind="mergesort") if pvalues[i] <= p1]
+    for i in tqdm(indices, desc="Clumping", disable=not verbose):
+        if not free[i]:
+            continue
+        free[i] = False
+
+        left = searchsorted(keys, keys[i] - window_size, side="left")
+        right = searchsorted(keys, keys[i] + window_size, side="right")
+        near = [j for j in range(left, right) if free[j]]
+
+        clumped = []
+        if len(near) > 0:
+            z = cache.get(tests[[i] + near])
+            with errstate(invalid="ignore"):
+                r2 = (z[1:] @ z[0]) ** 2
+                near = [j for (j, r) in zip(near, r2) if r > threshold]
+            free[near] = False
+            clumped = sorted(tests[near].tolist())
+
+        clumps.append([tests[i], pvalues[i], len(clumped), clumped])
+
+    df = DataFrame(clumps, columns=["test", "pv", "size", "clumped"])
+    return df.set_index("test")
+
+
+class _ColumnCache(object):
+    """
+    Standardised columns of ``G``, read only once and on demand.
+    """
+
+    def __init__(self, G):
+        self._G = G
+        self._cache = {}
+
+    def get(self, cols):
+        """
+        Standardised variants of the given columns, one per row.
+        """
+        from numpy import asarray, stack
+
+        from ._ld import _standardise
+
+        missing = sorted(set(cols.tolist()) - set(self._cache.keys()))
+        if len(missing) > 0:
+            Z = _standardise(asarray(self._G[:, missing], float).T)
+            for c, z in zip(missing, Z):
+                self._cache[c] = z
+
+        return stack([self._cache[c] for c in cols])
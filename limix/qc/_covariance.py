@@ -35,9 +35,13 @@ def normalise_covariance(K, out=None):
     Parameters
     ----------
     K : array_like
-        Covariance matrix to be normalised.
+        Covariance matrix to be normalised. Memory-mapped arrays, HDF5 datasets, and
+        dask arrays are read in blocks of rows, once, to compute the scaling factor.
     out : array_like, optional
-        Result destination. Defaults to ``None``.
+        Result destination, which can be ``K`` itself for in-place normalisation or
+        a memory-mapped array or HDF5 dataset. It is written one block of rows at a
+        time, so that no other matrix of the size of ``K`` is allocated. Defaults to
+        ``None``.
 
     Examples
     --------
@@ -68,24 +72,67 @@ def normalise_covariance(K, out=None):
     if isinstance(K, DataFrame):
         K = K.astype(float)
         trace = K.values.trace()
+        total = K.values.sum()
     elif isinstance(K, da.Array):
-        trace = da.diag(K).sum()
+        trace, total = _trace_sum(K)
     elif isinstance(K, xr.DataArray):
-        trace = da.diag(K.data).sum()
+        trace, total = _trace_sum(K.data)
     else:
-        K = asarray(K, float)
-        trace = K.trace()
+        # Memory-mapped arrays and HDF5 datasets are kept as they are.
+        if not hasattr(K, "shape"):
+            K = asarray(K, float)
+        trace, total = _trace_sum(K)
 
-    c = asarray((K.shape[0] - 1) / (trace - K.mean(axis=0).sum()), float)
+    n = K.shape[0]
+    c = asarray((n - 1) / (trace - total / n), float)
     if out is None:
         return K * c
 
-    _copyto(out, K)
-    _inplace_mult(out, c)
+    if isinstance(out, DataFrame) or isinstance(K, DataFrame):
+        _copyto(out, K)
+        _inplace_mult(out, c)
+        return out
+
+    if isinstance(K, xr.DataArray):
+        K = K.data
+
+    if isinstance(K, da.Array):
+        da.store(K * c, out, lock=False)
+    else:
+        for start, stop in _row_blocks(K):
+            out[start:stop] = asarray(K[start:stop], float) * c
 
     return out
 
 
+def _trace_sum(K):
+    """
+    Trace and sum of the elements of 𝙺, from a single pass over its blocks of rows.
+    """
+    from numpy import asarray
+    import dask.array as da
+
+    if isinstance(K, da.Array):
+        # Both reductions share the reading of each chunk.
+        return da.compute(da.diag(K).sum(), K.sum())
+
+    trace = 0.0
+    total = 0.0
+    for start, stop in _row_blocks(K):
+        block = asarray(K[start:stop], float)
+        trace += block[:, start:stop].trace()
+        total += block.sum()
+    return trace, total
+
+
+def _row_blocks(K):
+    from .._config import config
+
+    n = K.shape[0]
+    size = max(config["qtl.block_bytes"] // (8 * max(K.shape[1], 1)), 1)
+    return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+
 def _copyto(dst, src):
     from numpy import copyto, ndarray
     import dask.array as da
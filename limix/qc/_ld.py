@@ -1,25 +1,52 @@
 from __future__ import division
 
 
-def indep_pairwise(X, window_size, step_size, threshold, verbose=True):
+def indep_pairwise(
+    X,
+    window_size,
+    step_size,
+    threshold,
+    verbose=True,
+    unit="variant",
+    chrom=None,
+    pos=None,
+):
     """
     Determine pair-wise independent variants.
 
     Independent variants are defined via squared Pearson correlations between
     pairs of variants inside a sliding window.
 
+    Windows never span more than one chromosome. Variants of each chromosome are
+    sorted by position, and windows are defined over the sorted variants. Windows of
+    different chromosomes are independent and are processed in parallel.
+
     Parameters
     ----------
     X : array_like
-        Sample by variants matrix.
-    window_size : int
-        Number of variants inside each window.
+        Sample by variants matrix. If it is a :class:`xarray.DataArray` having
+        ``chrom``, ``pos``, or ``cm`` coordinates, as returned by
+        :func:`pandas_plink.read_plink1_bin`, those are used for ``chrom`` and
+        ``pos`` when not given.
+    window_size : int, float
+        Window size, in the unit given by ``unit``.
     step_size : int
         Number of variants the sliding window skips.
     threshold : float
         Squared Pearson correlation threshold for independence.
     verbose : bool
         `True` for progress information; `False` otherwise.
+    unit : str, optional
+        ``"variant"`` for windows of ``window_size`` variants, ``"bp"`` for windows
+        of ``window_size`` base pairs, or ``"cm"`` for windows of ``window_size``
+        centimorgans. Defaults to ``"variant"``.
+    chrom : array_like, optional
+        Chromosome of each variant. If ``None``, all variants are assumed to lie on
+        the same chromosome. Defaults to ``None``.
+    pos : array_like, optional
+        Position of each variant within its chromosome, in base pairs for
+        ``unit="bp"`` or in centimorgans for ``unit="cm"``. If ``None``, variants
+        are assumed to be already sorted. Defaults to ``None``.
 
     Returns
     -------
@@ -45,103 +72,196 @@ def indep_pairwise(X, window_size, step_size, threshold, verbose=True):
     from joblib import Parallel, delayed
     from tqdm import tqdm
     from ..threads import get_max_nthreads
-    from numpy import ascontiguousarray, logical_not, zeros
+    from numpy import logical_not, zeros
 
-    left = 0
-    excls = zeros(X.shape[1], dtype=bool)
+    if unit not in ["variant", "bp", "cm"]:
+        raise ValueError("Unknown window unit: {}.".format(unit))
 
-    if step_size > window_size:
+    if unit == "variant" and step_size > window_size:
         raise ValueError("Window size has to be smaller than step size.")
 
-    n = (X.shape[1] + step_size) // step_size
+    coords = {}
+    if hasattr(X, "coords"):
+        coords = X.coords
+        X = X.data
 
-    steps = list(range(n))
+    if chrom is None and "chrom" in coords:
+        chrom = coords["chrom"].values
+    if pos is None and unit != "variant":
+        name = {"bp": "pos", "cm": "cm"}[unit]
+        if name not in coords:
+            raise ValueError("Positions are required for windows in {}.".format(unit))
+        pos = coords[name].values
+
+    windows = _windows(X.shape[1], window_size, step_size, chrom, pos, unit)
+    excls = zeros(X.shape[1], dtype=bool)
     cc = get_max_nthreads()
+    prune = _get_greedy_prune()
 
-    with tqdm(total=n, desc="Indep. pairwise", disable=not verbose) as pbar:
+    buffer = None
+    if all(isinstance(w, slice) for w in windows):
+        buffer = _SlidingBuffer(X)
 
-        while len(steps) > 0:
-            i = 0
-            right = 0
+    with tqdm(total=len(windows), desc="Indep. pairwise", disable=not verbose) as pbar:
+        for i in range(0, len(windows), cc):
+            batch = windows[i : i + cc]
             delayeds = []
-            while i < len(steps):
-
-                step = steps[i]
-                left = step * step_size
-                if left < right:
-                    i += 1
-                    continue
-
-                del steps[i]
-                right = min(left + window_size, X.shape[1])
-                x = ascontiguousarray(X[:, left:right].T)
-
-                delayeds.append(delayed(_func)(x, excls[left:right], threshold))
-                if len(delayeds) == cc:
-                    Parallel(n_jobs=min(len(delayeds), cc), backend="threading")(
-                        delayeds
-                    )
-                    pbar.update(len(delayeds))
-                    delayeds = []
-
-            if len(delayeds) == 0:
-                continue
-
-            Parallel(n_jobs=min(len(delayeds), cc), backend="threading")(delayeds)
+            for cols in batch:
+                if buffer is None:
+                    z = _standardise(X[:, cols].T)
+                else:
+                    z = buffer.get(cols.start, cols.stop)
+                delayeds.append(delayed(_func)(z, threshold, prune))
+
+            marks = Parallel(n_jobs=min(len(delayeds), cc), backend="threading")(
+                delayeds
+            )
+            for cols, e in zip(batch, marks):
+                excls[cols] |= e
             pbar.update(len(delayeds))
 
+            if buffer is not None and i + cc < len(windows):
+                buffer.evict(windows[i + cc].start)
+
     return logical_not(excls)
 
 
-def _row_norms(X):
-    from numpy import double, einsum, sqrt
+def _windows(nvariants, window_size, step_size, chrom, pos, unit):
+    """
+    Column indices of each window, as slices whenever the variants are sorted.
+    """
+    from numpy import arange, asarray, concatenate, lexsort, searchsorted, unique
+    from numpy import zeros
+
+    if chrom is None:
+        chrom = zeros(nvariants, int)
+    (_, chrom) = unique(asarray(chrom), return_inverse=True)
+
+    if pos is None or unit == "variant":
+        order = lexsort((arange(nvariants), chrom))
+    else:
+        order = lexsort((asarray(pos, float), chrom))
+    sorted_ = (order == arange(nvariants)).all()
+
+    ends = concatenate([[0], (chrom[order][1:] != chrom[order][:-1]).nonzero()[0] + 1])
+    ends = concatenate([ends, [nvariants]]).tolist()
 
-    norms = einsum("ij,ij->i", X, X, dtype=double)
-    return sqrt(norms, out=norms)
+    windows = []
+    for start, stop in zip(ends[:-1], ends[1:]):
+        if unit == "variant":
+            p = arange(stop - start)
+        else:
+            p = asarray(pos, float)[order[start:stop]]
 
+        for left in range(0, stop - start, step_size):
+            right = searchsorted(p, p[left] + window_size, side="left")
+            right = max(right, left + 1)
+            if sorted_:
+                windows.append(slice(start + left, start + right))
+            else:
+                windows.append(order[start + left : start + right])
 
-def _sq_pearson(X):
-    from numpy import ascontiguousarray, double, newaxis, zeros
-    from scipy.spatial import _distance_wrap
+    return windows
 
-    m = X.shape[0]
-    dm = zeros((m * (m - 1)) // 2, dtype=double)
 
-    X2 = X - X.mean(1)[:, newaxis]
-    X2 = ascontiguousarray(X2)
-    if hasattr(_distance_wrap, "pdist_cosine_wrap"):
-        norms = _row_norms(X2)
+class _SlidingBuffer(object):
+    """
+    Standardised variants of a sliding range of columns.
 
-    X2 = X - X.mean(axis=1, keepdims=True)
+    Columns are read in blocks, from left to right, as windows ask for them, and
+    are dropped once no later window needs them. Every block of ``X`` is therefore
+    read and standardised only once.
+    """
 
-    if hasattr(_distance_wrap, "pdist_cosine_wrap"):
-        _distance_wrap.pdist_cosine_wrap(X2, dm, norms)
-    else:
-        _distance_wrap.pdist_cosine_double_wrap(X2, dm)
+    def __init__(self, X):
+        from numpy import empty
 
-    return (-dm + 1) ** 2
+        from ..qtl._blocks import get_blocks
 
+        self._X = X
+        self._blocks = get_blocks(X)
+        self._next = 0
+        self._offset = 0
+        self._data = empty((0, X.shape[0]))
 
-def _pdist_threshold(mark, dist, thr):
-    mark[:] = False
-    size = len(mark)
+    def get(self, start, stop):
+        """
+        Standardised variants ``start`` to ``stop``, one per row.
+        """
+        from numpy import concatenate
 
-    m = 0
-    for i in range(0, size - 1):
-        if mark[i]:
-            m += size - (i + 1)
-            continue
+        end = self._offset + self._data.shape[0]
+        blocks = []
+        while end < stop:
+            (left, right) = self._blocks[self._next]
+            blocks.append(_standardise(self._X[:, left:right].T))
+            self._next += 1
+            end = right
 
-        for j in range(i + 1, size):
-            if dist[m] > thr:
-                mark[j] = True
-            m += 1
+        if len(blocks) > 0:
+            self._data = concatenate([self._data] + blocks)
 
+        return self._data[start - self._offset : stop - self._offset]
 
-def _func(x, excls, threshold):
-    from numpy import zeros
+    def evict(self, start):
+        """
+        Drop the variants before ``start``.
+        """
+        start = min(start, self._offset + self._data.shape[0])
+        # Copied so that the memory of the evicted variants can be released.
+        self._data = self._data[start - self._offset :].copy()
+        self._offset = start
+
+
+def _standardise(X):
+    """
+    Centre the rows of ``X`` and scale them to unit norm.
+    """
+    from numpy import array, errstate, sqrt
+
+    X = array(X, float)
+    X -= X.mean(1, keepdims=True)
+    with errstate(divide="ignore", invalid="ignore"):
+        X /= sqrt((X * X).sum(1, keepdims=True))
+    return X
+
+
+def _get_jit():
+    try:
+        from numba import jit
+    except ImportError:
+
+        def jit(x, *args, **kwargs):
+            return x
+
+    return jit
+
+
+def _get_greedy_prune():
+    jit = _get_jit()
+
+    # Compiled without the GIL, so that windows are pruned in parallel threads. Rows
+    # are still vectorised when numba is not available.
+    @jit(nopython=True, nogil=True, cache=True)
+    def _greedy_prune(mark, above):
+        size = len(mark)
+        mark[:] = False
+        for i in range(size - 1):
+            if not mark[i]:
+                mark[i + 1 :] |= above[i, i + 1 :]
+
+    return _greedy_prune
+
+
+def _func(z, threshold, prune):
+    from numpy import errstate, zeros
 
-    dist = _sq_pearson(x)
-    e = zeros(x.shape[0], dtype=bool)
-    _pdist_threshold(e, dist, threshold)
-    excls |= e
+    # Squared Pearson correlations of the standardised variants, via one product.
+    R = z @ z.T
+    R *= R
+    # NaN correlations, from constant variants, never exceed the threshold.
+    with errstate(invalid="ignore"):
+        above = R > threshold
+    e = zeros(z.shape[0], dtype=bool)
+    prune(e, above)
+    return e
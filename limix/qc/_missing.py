@@ -1,4 +1,4 @@
-def count_missingness(X):
+def count_missingness(X, summary=None):
     """
     Count the number of missing values per column.
 
@@ -6,6 +6,9 @@ def count_missingness(X):
     ----------
     X : array_like
         Matrix.
+    summary : :class:`pandas.DataFrame`, optional
+        Output of :func:`limix.qc.genotype_summary` for ``X``. Its ``missing``
+        column is used instead of reading ``X`` again. Defaults to ``None``.
 
     Returns
     -------
@@ -15,6 +18,9 @@ def count_missingness(X):
     import dask.array as da
     from numpy import isnan
 
+    if summary is not None:
+        return (summary["missing"].values * X.shape[0]).round().astype(int)
+
     if isinstance(X, da.Array):
         return da.isnan(X).sum(axis=0).compute()
 
@@ -0,0 +1,94 @@
+from __future__ import division
+
+
+def genotype_summary(G, hwe=False, verbose=True):
+    """
+    Per-variant genotype statistics computed in a single pass.
+
+    The genotype is read once, in blocks of variants, and each block is used to
+    compute every statistic at once. It assumes that ``G`` encodes 0, 1, and 2
+    representing the number of alleles (or dosage), or ``NaN`` to represent missing
+    values.
+
+    Parameters
+    ----------
+    G : array_like
+        Samples-by-variants genotype matrix. Dask arrays are read in their chunks
+        of variants.
+    hwe : bool, optional
+        ``True`` to also count the samples of each genotype, for Hardy-Weinberg
+        equilibrium tests. Dosages are rounded to the nearest genotype. Defaults to
+        ``False``.
+    verbose : bool, optional
+        ``True`` for progress information; ``False`` otherwise.
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        One row per variant, indexed as the variants of ``G`` if it is a
+        :class:`xarray.DataArray`, with the frequency of the counted allele, the
+        minor allele frequency, the fraction of missing values, and the mean and
+        variance of the non-missing values, in the ``freq``, ``maf``, ``missing``,
+        ``mean``, and ``var`` columns. The ``n0``, ``n1``, and ``n2`` columns hold
+        the genotype counts if ``hwe`` is ``True``.
+
+    Examples
+    --------
+    .. doctest::
+
+        >>> from numpy.random import RandomState
+        >>> from limix.qc import genotype_summary
+        >>>
+        >>> random = RandomState(0)
+        >>> G = random.randint(0, 3, size=(100, 3)).astype(float)
+        >>> G[0, 0] = float("nan")
+        >>>
+        >>> print(genotype_summary(G, verbose=False))  # doctest: +FLOAT_CMP
+               freq       maf  missing      mean       var
+        0  0.520202  0.479798     0.01  1.040404  0.604428
+        1  0.520000  0.480000     0.00  1.040000  0.698400
+        2  0.415000  0.415000     0.00  0.830000  0.601100
+    """
+    from numpy import asarray, concatenate, errstate, isnan, minimum, where, zeros
+    from numpy import round as round_
+    from pandas import DataFrame
+    from tqdm import tqdm
+
+    from ..qtl._blocks import get_blocks
+
+    index = None
+    if hasattr(G, "coords"):
+        index = G.coords[G.dims[1]].to_index()
+        G = G.data
+
+    names = ["missing", "mean", "var"]
+    if hwe:
+        names += ["n0", "n1", "n2"]
+
+    nsamples = G.shape[0]
+    stats = {k: [zeros(0)] for k in names}
+    for start, stop in tqdm(get_blocks(G), "Genotype summary", disable=not verbose):
+        g = asarray(G[:, start:stop], float)
+        ok = ~isnan(g)
+        count = ok.sum(0)
+        with errstate(invalid="ignore", divide="ignore"):
+            mean = where(ok, g, 0).sum(0) / count
+            var = (where(ok, g - mean, 0) ** 2).sum(0) / count
+        stats["missing"].append((nsamples - count) / nsamples)
+        stats["mean"].append(mean)
+        stats["var"].append(var)
+        if hwe:
+            g = round_(g)
+            for i in range(3):
+                stats["n{}".format(i)].append((g == i).sum(0))
+
+    stats = {k: concatenate(v) for k, v in stats.items()}
+
+    freq = stats["mean"] / 2
+    df = DataFrame({"freq": freq, "maf": minimum(freq, 1 - freq)}, index=index)
+    for k in names:
+        df[k] = stats[k]
+    if hwe:
+        df[["n0", "n1", "n2"]] = df[["n0", "n1", "n2"]].astype(int)
+
+    return df
@@ -1,16 +1,33 @@
-def unique_variants(X):
+def unique_variants(X, method="projection", return_index=False):
     """
     Filters out variants with the same genetic profile.
 
+    The ``"projection"`` method compares the projections of the variants onto a
+    random vector. It is fast but distinct variants might collide and missing values
+    are not supported. The ``"hash"`` method reads the variants in blocks, hashes the
+    bytes of each variant, and checks variants having the same hash value for
+    equality, so that only exact duplicates are removed. Earlier variants whose hash
+    value matches one in the current block are read again for that check. Missing
+    values are considered equal to each other. It keeps the first occurrence of each
+    variant, in the original order.
+
     Parameters
     ----------
     X : array_like
         Samples-by-variants matrix of genotype values.
+    method : str, optional
+        ``"projection"`` or ``"hash"``. Defaults to ``"projection"``.
+    return_index : bool, optional
+        ``True`` to also return the indices of the unique variants. Defaults to
+        ``False``.
 
     Returns
     -------
     genotype : ndarray
         Genotype array with unique variants.
+    index : ndarray
+        Indices of the unique variants. Only provided if ``return_index`` is
+        ``True``.
 
     Example
     -------
@@ -39,6 +56,15 @@ def unique_variants(X):
     from limix._bits import dask
     import numpy as np
 
+    if method == "hash":
+        i = _unique_hash(X)
+        if return_index:
+            return X[:, i], i
+        return X[:, i]
+
+    if method != "projection":
+        raise ValueError("Unknown method: {}.".format(method))
+
     if dask.is_array(X):
         import dask.array as da
 
@@ -51,4 +77,49 @@ def unique_variants(X):
 
     u = np.random.rand(X.shape[0])
     i = unique(dot(u, X), return_index=True)[1]
+    if return_index:
+        return X[:, i], i
     return X[:, i]
+
+
+def _unique_hash(X):
+    from hashlib import blake2b
+
+    from numpy import array, asarray, isnan, nan
+
+    from ..qtl._blocks import get_blocks
+
+    table = {}
+    keep = []
+    for start, stop in get_blocks(X):
+        # One contiguous row per variant, with a single representation of zero and
+        # of missing values.
+        B = array(asarray(X[:, start:stop], float).T, order="C")
+        B += 0.0
+        B[isnan(B)] = nan
+
+        digests = [blake2b(b.tobytes(), digest_size=16).digest() for b in B]
+
+        # Variants of earlier blocks having the same hash value are read all at once.
+        older = set()
+        for d in digests:
+            older.update(j for j in table.get(d, []) if j < start)
+        older = sorted(older)
+        if len(older) > 0:
+            O = array(asarray(X[:, older], float).T, order="C")
+            O += 0.0
+            O[isnan(O)] = nan
+            older = dict(zip(older, O))
+
+        for i, d in enumerate(digests):
+            b = B[i]
+            reps = table.setdefault(d, [])
+            for j in reps:
+                c = B[j - start] if j >= start else older[j]
+                if c.tobytes() == b.tobytes():
+                    break
+            else:
+                reps.append(start + i)
+                keep.append(start + i)
+
+    return asarray(keep, int)
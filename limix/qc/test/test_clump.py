@@ -0,0 +1,50 @@
+from numpy import arange, repeat
+from numpy.random import RandomState
+from numpy.testing import assert_equal
+from pandas import DataFrame
+from xarray import DataArray
+
+from limix.qc import clump
+
+
+def _dataset():
+    random = RandomState(0)
+
+    G = random.randn(100, 8)
+    G[:, 1] = G[:, 0] + random.randn(100) / 10
+    G[:, 4] = G[:, 0] + random.randn(100) / 10
+    G[:, 6] = G[:, 5] + random.randn(100) / 10
+    pv = [1e-8, 1e-5, 0.3, 1e-3, 1e-3, 1e-6, 0.02, 1e-4]
+    stats = DataFrame({"pv20": pv}, index=arange(8))
+    stats.index.name = "test"
+    return G, stats
+
+
+def test_clump():
+    G, stats = _dataset()
+
+    r = clump(stats, G, 5, 0.5, verbose=False)
+    assert_equal(r.index.values, [0, 5, 7])
+    assert_equal(r["size"].values, [2, 0, 0])
+    assert_equal(r.loc[0, "clumped"], [1, 4])
+
+    r = clump(stats, G, 5, 0.5, p2=0.05, verbose=False)
+    assert_equal(r.loc[5, "clumped"], [6])
+
+    r = clump(stats, G, 2, 0.5, verbose=False)
+    assert_equal(r.loc[0, "clumped"], [1])
+    assert_equal(r.index.values, [0, 5, 7])
+
+
+def test_clump_chromosomes():
+    G, stats = _dataset()
+
+    coords = {
+        "chrom": ("variant", repeat(["1", "2"], 4)),
+        "pos": ("variant", [10, 20, 30, 40, 10, 20, 30, 40]),
+    }
+    X = DataArray(G, dims=["sample", "variant"], coords=coords)
+
+    r = clump(stats, X, 100, 0.5, unit="bp", verbose=False)
+    assert_equal(r.index.values, [0, 5, 7])
+    assert_equal(r.loc[0, "clumped"], [1])
@@ -19,3 +19,65 @@ def test_indep_pairwise():
     X = from_array(X, chunks=(2, 10))
     assert_equal(indep_pairwise(X, 4, 2, 0.5, verbose=False)[:5], head)
     assert_equal(indep_pairwise(X, 4, 2, 0.5, verbose=False)[-4:], tail)
+
+
+def test_indep_pairwise_duplicates():
+    random = RandomState(0)
+
+    X = random.randn(50, 6)
+    X[:, 2] = 2 * X[:, 0] + 1
+    X[:, 3] = 1.0
+    X[:, 5] = -X[:, 4]
+
+    ok = indep_pairwise(X, 6, 3, 0.9, verbose=False)
+    assert_equal(ok, [True, True, False, True, True, False])
+
+
+def test_indep_pairwise_positions():
+    from numpy import arange, concatenate, repeat, tile
+    from xarray import DataArray
+
+    random = RandomState(0)
+
+    X = random.randn(20, 40)
+    X[:, 20] = X[:, 19]
+    chrom = repeat(["1", "2"], 20)
+    pos = tile(arange(20) * 1000, 2)
+
+    ok = indep_pairwise(X, 4, 2, 0.5, verbose=False, chrom=chrom)
+    ok0 = indep_pairwise(X[:, :20], 4, 2, 0.5, verbose=False)
+    ok1 = indep_pairwise(X[:, 20:], 4, 2, 0.5, verbose=False)
+    assert_equal(ok, concatenate([ok0, ok1]))
+    assert ok[19] and ok[20]
+
+    coords = {"chrom": ("variant", chrom), "pos": ("variant", pos)}
+    G = DataArray(X, dims=["sample", "variant"], coords=coords)
+    assert_equal(indep_pairwise(G, 4000, 2, 0.5, verbose=False, unit="bp"), ok)
+
+    idx = random.permutation(40)
+    ok2 = indep_pairwise(G[:, idx], 4000, 2, 0.5, verbose=False, unit="bp")
+    assert_equal(ok2, ok[idx])
+
+
+def test_indep_pairwise_read_once():
+    from numpy import zeros
+
+    class Reader(object):
+        def __init__(self, X):
+            self.X = X
+            self.shape = X.shape
+            self.chunks = ((X.shape[0],), (3,) * (X.shape[1] // 3))
+            self.reads = zeros(X.shape[1], int)
+
+        def __getitem__(self, idx):
+            self.reads[idx[1]] += 1
+            return self.X[idx]
+
+    random = RandomState(0)
+    X = random.randn(10, 30)
+    X[:, 7] = X[:, 5]
+
+    G = Reader(X)
+    ok = indep_pairwise(G, 8, 2, 0.5, verbose=False)
+    assert_equal(ok, indep_pairwise(X, 8, 2, 0.5, verbose=False))
+    assert_equal(G.reads, 1)
@@ -111,3 +111,40 @@ def test_qc_kinship_dataarray():
 
     assert_allclose(K0, K2)
     assert_(K2 is K1)
+
+
+def test_qc_kinship_memmap(tmp_path, monkeypatch):
+    import limix
+    from numpy.lib.format import open_memmap
+
+    monkeypatch.setitem(limix.config, "qtl.block_bytes", 8 * 10 * 3)
+
+    random = RandomState(0)
+    X = random.randn(10, 5)
+    K = X.dot(X.T)
+    K0 = normalise_covariance(K)
+
+    filepath = str(tmp_path / "K.npy")
+    K1 = open_memmap(filepath, mode="w+", dtype=float, shape=K.shape)
+    K1[:] = K
+    K2 = normalise_covariance(K1, out=K1)
+    assert_(K2 is K1)
+    assert_allclose(K1, K0)
+
+    K3 = zeros(K.shape)
+    normalise_covariance(da.from_array(K, chunks=3), out=K3)
+    assert_allclose(K3, K0)
+
+
+def test_qc_kinship_hdf5(tmp_path):
+    import h5py
+
+    random = RandomState(0)
+    X = random.randn(10, 5)
+    K = X.dot(X.T)
+    K0 = normalise_covariance(K)
+
+    with h5py.File(str(tmp_path / "K.h5"), "w") as f:
+        K1 = f.create_dataset("K", data=K, chunks=(3, 10))
+        normalise_covariance(K1, out=K1)
+        assert_allclose(K1[()], K0)
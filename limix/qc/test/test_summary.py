@@ -0,0 +1,42 @@
+import dask.array as da
+from numpy import nan, nanmean, nanvar
+from numpy.random import RandomState
+from numpy.testing import assert_allclose, assert_equal
+from xarray import DataArray
+
+from limix.qc import compute_maf, count_missingness, genotype_summary
+
+
+def test_genotype_summary():
+    random = RandomState(0)
+    G = random.randint(0, 3, size=(30, 10)).astype(float)
+    G[0, 0] = nan
+    G[:5, 3] = nan
+    G[:, 7] = nan
+
+    s = genotype_summary(G, hwe=True, verbose=False)
+    assert_allclose(s["maf"], compute_maf(G))
+    assert_allclose(s["missing"] * 30, count_missingness(G))
+    assert_allclose(s["mean"], nanmean(G, 0))
+    assert_allclose(s["var"], nanvar(G, 0))
+    assert_equal(s[["n0", "n1", "n2"]].sum(1).values + count_missingness(G), 30)
+
+    s1 = genotype_summary(da.from_array(G, chunks=(30, 3)), hwe=True, verbose=False)
+    assert_allclose(s1.values, s.values)
+
+    coords = {"candidate": list("abcdefghij")}
+    X = DataArray(G, dims=["sample", "candidate"], coords=coords)
+    s2 = genotype_summary(X, verbose=False)
+    assert_equal(s2.index.values, list("abcdefghij"))
+    assert_allclose(s2["maf"], s["maf"])
+
+
+def test_genotype_summary_reuse():
+    random = RandomState(1)
+    G = random.randint(0, 3, size=(20, 8)).astype(float)
+    G[:3, 2] = nan
+    G[5, 6] = nan
+
+    s = genotype_summary(G, verbose=False)
+    assert_allclose(compute_maf(G, summary=s), compute_maf(G))
+    assert_equal(count_missingness(G, summary=s), count_missingness(G))
@@ -12,3 +12,22 @@ def test_unique_variants():
     assert_array_equal(unique_variants(X), X[:, 1:])
     X = da.from_array(X, 1)
     assert_array_equal(unique_variants(X), X[:, 1:])
+
+
+def test_unique_variants_hash():
+    from numpy import nan
+
+    random = RandomState(0)
+    X = random.randn(4, 7)
+    X[:, 2] = X[:, 0]
+    X[1, 3] = nan
+    X[:, 5] = X[:, 3]
+    X[:, 6] = X[:, 1]
+    X[0, 6] = -X[0, 6]
+
+    G, idx = unique_variants(X, method="hash", return_index=True)
+    assert_array_equal(idx, [0, 1, 3, 4, 6])
+    assert_array_equal(G, X[:, idx])
+
+    X = da.from_array(X, chunks=(4, 2))
+    assert_array_equal(unique_variants(X, method="hash"), X[:, idx])
@@ -4,5 +4,15 @@ Quantitative trait locus analysis.
 
 from ._iscan import iscan
 from ._scan import scan
+from ._scan_many import scan_many
+from ._sink import CSVSink, HDF5Sink, ParquetSink, ResultSink
 
-__all__ = ["scan", "iscan"]
+__all__ = [
+    "scan",
+    "scan_many",
+    "iscan",
+    "ResultSink",
+    "CSVSink",
+    "HDF5Sink",
+    "ParquetSink",
+]
@@ -0,0 +1,54 @@
+def get_blocks(G, block_size=None):
+    """
+    Column-block boundaries for streaming a samples-by-candidates matrix.
+
+    Parameters
+    ----------
+    G : n×m array_like
+        Genetic candidates.
+    block_size : int, optional
+        Number of candidates per block. If ``None``, the column chunks of a
+        dask-backed ``G`` are used. Otherwise, the number of candidates per block is
+        chosen so that a block of double-precision values takes about
+        ``limix.config["qtl.block_bytes"]`` bytes. Defaults to ``None``.
+
+    Returns
+    -------
+    blocks : list
+        List of ``(start, stop)`` tuples.
+    """
+    from limix import config
+
+    (n, m) = G.shape
+
+    if block_size is None:
+        chunks = _column_chunks(G)
+        if chunks is not None:
+            return _chunks_to_blocks(chunks)
+        block_size = config["qtl.block_bytes"] // (8 * max(n, 1))
+
+    block_size = max(int(block_size), 1)
+
+    return [(i, min(i + block_size, m)) for i in range(0, m, block_size)]
+
+
+def _column_chunks(G):
+    from numpy import isfinite
+
+    chunks = getattr(G, "chunks", None)
+    if chunks is None or len(chunks) != 2:
+        return None
+
+    if not all(isfinite(chunks[1])):
+        return None
+
+    return chunks[1]
+
+
+def _chunks_to_blocks(chunks):
+    blocks = []
+    start = 0
+    for c in chunks:
+        blocks.append((start, start + int(c)))
+        start += int(c)
+    return blocks
@@ -0,0 +1,62 @@
+class Checkpoint:
+    """
+    Directory recording the progress of a scan.
+
+    It holds the fitted null model and the tests of every finished block of
+    candidates, one file each, so that a restarted scan can skip both. Files are
+    written to a temporary name first and then renamed, so that a job killed while
+    writing never leaves a truncated record behind.
+
+    Parameters
+    ----------
+    dirpath : str
+        Directory path. It is created if it does not exist.
+    key : str
+        Fingerprint of the scan inputs. A directory recording a scan with different
+        inputs is rejected.
+    """
+
+    def __init__(self, dirpath, key):
+        from os import makedirs
+
+        makedirs(dirpath, exist_ok=True)
+        self._dirpath = dirpath
+
+        saved = self.load("key")
+        if saved is None:
+            self.save("key", key)
+        elif saved != key:
+            msg = f"Checkpoint directory `{dirpath}` belongs to a scan with different"
+            msg += " inputs."
+            raise ValueError(msg)
+
+    def load(self, name):
+        """
+        Load record ``name``, or return ``None`` if it has not been saved.
+        """
+        import pickle
+        from os.path import exists
+
+        filepath = self._filepath(name)
+        if not exists(filepath):
+            return None
+
+        with open(filepath, "rb") as f:
+            return pickle.load(f)
+
+    def save(self, name, obj):
+        """
+        Save ``obj`` as record ``name``.
+        """
+        import pickle
+        from os import replace
+
+        filepath = self._filepath(name)
+        with open(filepath + ".tmp", "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        replace(filepath + ".tmp", filepath)
+
+    def _filepath(self, name):
+        from os.path import join
+
+        return join(self._dirpath, name + ".pkl")
@@ -5,11 +5,30 @@ from limix._display import session_line
 from .._bits import unvec
 from .._data import asarray as _asarray, conform_dataset, normalize_likelihood
 from .._display import session_block
+from .._qs import economic_qs, economic_qs_linear
 from ._assert import assert_finite
+from ._blocks import get_blocks
+from ._parallel import process_pool
 from ._result import IScanResultFactory
-
-
-def iscan(G, y, lik="normal", K=None, M=None, idx=None, E0=None, E1=None, verbose=True):
+from ._rotation import NullRotation
+
+
+def iscan(
+    G,
+    y,
+    lik="normal",
+    K=None,
+    M=None,
+    idx=None,
+    E0=None,
+    E1=None,
+    QS=None,
+    Gk=None,
+    block_size=None,
+    n_jobs=None,
+    sink=None,
+    verbose=True,
+):
     r"""
     Single-trait association with interaction test via generalized linear mixed models.
 
@@ -78,6 +97,31 @@ def iscan(G, y, lik="normal", K=None, M=None, idx=None, E0=None, E1=None, verbos
         Matrix representing the first environment.
     E1 : array_like
         Matrix representing the second environment.
+    QS : tuple, optional
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of ``K``, as returned by
+        :func:`numpy_sugar.linalg.economic_qs`. Passing it avoids decomposing ``K``
+        again when the same kinship matrix is used for several scans, in which case
+        ``K`` itself can be omitted. The rows of ``Q0`` and ``Q1`` must follow the
+        sample order of ``y``. Defaults to ``None``.
+    Gk : n×q array_like, optional
+        Kinship factor, for ``K = Gk Gkᵀ / q``. When q is smaller than the number of
+        samples, it is decomposed via a singular value decomposition at O(n²q) cost
+        instead of the O(n³) cost of decomposing ``K``, which can then be omitted.
+        The rows of ``Gk`` must follow the sample order of ``y``.
+        Defaults to ``None``.
+    block_size : int, optional
+        Number of candidates read from ``G`` at once. If ``None``, the column chunks
+        of a dask-backed ``G`` are used; otherwise the block size is chosen from
+        ``limix.config["qtl.block_bytes"]``. Defaults to ``None``.
+    n_jobs : int, optional
+        Number of worker processes used to test the candidates. ``-1`` uses every
+        available core. If ``None``, the candidates are tested in the calling process.
+        Defaults to ``None``.
+    sink : :class:`limix.qtl.ResultSink`, optional
+        Destination to which the tests are written while the scan is running, every
+        ``sink.flush_every`` tests. Only that many tests are kept in memory, and the
+        returned result reads its statistics and effect sizes back from the sink. If
+        ``None``, every test is kept in memory. Defaults to ``None``.
     verbose : bool, optional
         ``True`` to display progress and summary; ``False`` otherwise.
 
@@ -91,7 +135,6 @@ def iscan(G, y, lik="normal", K=None, M=None, idx=None, E0=None, E1=None, verbos
     It will raise a ``ValueError`` exception if non-finite values are passed. Please,
     refer to the :func:`limix.qc.mean_impute` function for missing value imputation.
     """
-    from numpy_sugar.linalg import economic_qs
     from xarray import concat
     from numpy import asarray, empty, ones
 
@@ -122,10 +165,10 @@ def iscan(G, y, lik="normal", K=None, M=None, idx=None, E0=None, E1=None, verbos
         E1 = _asarray(E1, "env1", ["sample", "env"])
         E01 = concat([E0, E1], dim="env")
 
-        if K is not None:
+        if QS is None and Gk is not None:
+            QS = economic_qs_linear(Gk)
+        elif QS is None and K is not None:
             QS = economic_qs(K)
-        else:
-            QS = None
 
         if lik_name == "normal":
             scanner, v0, v1 = _lmm(Y.values.ravel(), M.values, QS, verbose)
@@ -144,48 +187,62 @@ def iscan(G, y, lik="normal", K=None, M=None, idx=None, E0=None, E1=None, verbos
             scanner.null_beta_se,
             v0,
             v1,
+            sink,
         )
 
-        if idx is None:
-
-            assert E1.shape[1] > 0
-            idx = range(G.shape[1])
-
-            if E0.shape[1] == 0:
-                r1 = scanner.fast_scan(G, verbose)
+        with process_pool(n_jobs) as pool:
+            if idx is None:
+
+                assert E1.shape[1] > 0
+
+                for start, stop in get_blocks(G, block_size):
+                    g = asarray(G[:, start:stop], float)
+                    gs = [g[:, i:j] for i, j in pool.split(stop - start)]
+                    hs = pool.map(_scan_block, gs, scanner, E0, E01)
+                    hs = [h for hs in hs for h in hs]
+                    for i, (h1, h2) in enumerate(hs):
+                        r.add_test([start + i], h1, h2)
+            else:
+                for tests in pool.rounds(idx):
+                    tests = [_2d_sel(i) for i in tests]
+                    gs = [asarray(G[:, i], float) for i in tests]
+                    gs = [gs[i:j] for i, j in pool.split(len(gs))]
+                    hs = pool.map(_scan_sets, gs, scanner, E0, E01)
+                    hs = [h for hs in hs for h in hs]
+                    for i, (h1, h2) in zip(tests, hs):
+                        r.add_test(i, h1, h2)
 
-            for i in idx:
-                i = _2d_sel(i)
-                g = asarray(G[:, i], float)
+        r = r.create()
+        if verbose:
+            print(r)
 
-                if E0.shape[1] > 0:
-                    r1 = scanner.scan(g, E0)
-                    h1 = _normalise_scan_names(r1)
-                else:
-                    h1 = _normalise_scan_names({k: v[i] for k, v in r1.items()})
-                    h1["covariate_effsizes"] = h1["covariate_effsizes"].ravel()
-                    h1["covariate_effsizes_se"] = h1["covariate_effsizes_se"].ravel()
+        return r
 
-                r2 = scanner.scan(g, E01)
-                h2 = _normalise_scan_names(r2)
-                r.add_test(i, h1, h2)
-        else:
-            for i in idx:
-                i = _2d_sel(i)
-                g = asarray(G[:, i], float)
 
-                r1 = scanner.scan(g, E0)
-                r2 = scanner.scan(g, E01)
+def _scan_block(scanner, E0, E01, g):
+    if E0.shape[1] == 0:
+        r1 = scanner.fast_scan(g, False)
+    else:
+        r1 = scanner.block_scan(g, E0)
+    r2 = scanner.block_scan(g, E01)
 
-                h1 = _normalise_scan_names(r1)
-                h2 = _normalise_scan_names(r2)
-                r.add_test(i, h1, h2)
+    hs = []
+    for i in range(g.shape[1]):
+        h1 = _normalise_scan_names({k: v[i] for k, v in r1.items()})
+        h1["covariate_effsizes"] = h1["covariate_effsizes"].ravel()
+        h1["covariate_effsizes_se"] = h1["covariate_effsizes_se"].ravel()
+        h2 = _normalise_scan_names({k: v[i] for k, v in r2.items()})
+        hs.append((h1, h2))
+    return hs
 
-        r = r.create()
-        if verbose:
-            print(r)
 
-        return r
+def _scan_sets(scanner, E0, E01, gs):
+    hs = []
+    for g in gs:
+        h1 = _normalise_scan_names(scanner.scan(g, E0))
+        h2 = _normalise_scan_names(scanner.scan(g, E01))
+        hs.append((h1, h2))
+    return hs
 
 
 def _normalise_scan_names(r):
@@ -209,8 +266,9 @@ def _2d_sel(idx):
 
 
 class ScannerWrapper:
-    def __init__(self, scanner):
+    def __init__(self, scanner, rotation):
         self._scanner = scanner
+        self._rotation = rotation
 
     @property
     def null_lml(self):
@@ -241,8 +299,83 @@ class ScannerWrapper:
         r["effsizes1_se"] = unvec(r["effsizes1_se"], (-1, G.shape[1])).T
         return r
 
+    def block_scan(self, G, E):
+        """
+        Same as calling ``scan(G[:, [i]], E)`` for every column of ``G``.
+
+        The interaction designs of the whole block are rotated by a single matrix
+        product per eigenspace, and the small per-candidate systems are solved at
+        once. The rotated null terms are computed only once per scanner.
+
+        Returns
+        -------
+        dict
+            Arrays whose first axis indexes the columns of ``G``.
+        """
+        from numpy import asarray, concatenate
+        from limix import config
+
+        G = asarray(G, float)
+        E = asarray(E, float)
+        (n, k) = G.shape
+
+        step = max(config["qtl.block_bytes"] // (8 * n * max(E.shape[1], 1)), 1)
+        rs = [self._block_scan(G[:, i : i + step], E) for i in range(0, k, step)]
+        return {key: concatenate([r[key] for r in rs]) for key in rs[0]}
+
+    def _block_scan(self, G, E):
+        from numpy import clip, einsum, empty, inf, sqrt, zeros
+        from numpy.linalg import pinv
+        from numpy_sugar import epsilon
+        from glimix_core._util import safe_log
+
+        rot = self._rotation
+        (n, k) = G.shape
+        m = E.shape[1]
+        c = rot.ncovariates
+
+        # Row j·m + a holds the interaction gⱼ⊙eₐ of the j-th candidate.
+        GE = (G.T[:, None, :] * E.T[None, :, :]).reshape(k * m, n)
+
+        left = zeros((k, c + m, c + m))
+        right = zeros((k, c + m))
+        left[:, :c, :c] = rot.XTBX[0]
+        right[:, :c] = rot.yTBX[0]
+
+        terms = zip(rot.rotate(GE.T), rot.Di, rot.yTQDi, rot.XTQDi)
+        for MTQ, Di, yTQDi, XTQDi in terms:
+            MTQ = MTQ.reshape(k, m, -1)
+            right[:, c:] += MTQ @ yTQDi[0]
+            left[:, :c, c:] += (MTQ @ XTQDi[0].T).transpose(0, 2, 1)
+            left[:, c:, c:] += (MTQ * Di[0]) @ MTQ.transpose(0, 2, 1)
+        left[:, c:, :c] = left[:, :c, c:].transpose(0, 2, 1)
+
+        lefti = pinv(left)
+        x = einsum("kij,kj->ki", lefti, right)
+
+        bstar = rot.yTBy[0] - 2 * einsum("ki,ki->k", x, right)
+        bstar += einsum("ki,kij,kj->k", x, left, x)
+        scale = clip(bstar, epsilon.tiny, inf) / n
+        lml = (rot.static_lml[0] - n * safe_log(scale)) / 2
+        se = sqrt(scale[:, None] * einsum("kii->ki", lefti))
+
+        effsizes1 = empty((k, 1, m))
+        effsizes1[:, 0, :] = x[:, c:]
+        effsizes1_se = empty((k, 1, m))
+        effsizes1_se[:, 0, :] = se[:, c:]
+
+        return {
+            "lml": lml,
+            "effsizes0": x[:, :c],
+            "effsizes0_se": se[:, :c],
+            "effsizes1": effsizes1,
+            "effsizes1_se": effsizes1_se,
+            "scale": scale,
+        }
+
 
 def _lmm(y, M, QS, verbose):
+    from numpy import nan
     from glimix_core.lmm import LMM
 
     lmm = LMM(y, M, QS, restricted=False)
@@ -250,17 +383,21 @@ def _lmm(y, M, QS, verbose):
     sys.stdout.flush()
 
     if QS is None:
-        v0 = None
+        v0 = nan
     else:
         v0 = lmm.v0
     v1 = lmm.v1
-    scanner = ScannerWrapper(lmm.get_fast_scanner())
+    rotation = NullRotation(y, M, QS, lmm.v0, lmm.v1)
+    scanner = ScannerWrapper(lmm.get_fast_scanner(), rotation)
 
     return scanner, v0, v1
 
 
 def _glmm(y, lik, M, QS, verbose):
+    from numpy import eye
+    from numpy_sugar.linalg import ddot, economic_qs, sum2diag
     from glimix_core.glmm import GLMMExpFam, GLMMNormal
+    from glimix_core.lmm import FastScanner
 
     glmm = GLMMExpFam(y.ravel(), lik, M, QS)
 
@@ -275,6 +412,18 @@ def _glmm(y, lik, M, QS, verbose):
     gnormal = GLMMNormal(eta, tau, M, QS)
     gnormal.fit(verbose=verbose)
 
-    scanner = ScannerWrapper(gnormal.get_fast_scanner())
+    # Same scanner as GLMMNormal.get_fast_scanner, whose covariance decomposition is
+    # also needed for the rotations. It depends on the fitted v0 and tau, so it is
+    # not worth caching.
+    y = eta / tau
+    if QS is None:
+        K = eye(len(y)) / tau
+    else:
+        (Q0, S0) = (QS[0][0], QS[1])
+        K = sum2diag(ddot(Q0, gnormal.v0 * S0) @ Q0.T, 1 / tau)
+    QS = economic_qs(K)
+
+    rotation = NullRotation(y, M, QS, 1.0, gnormal.v1)
+    scanner = ScannerWrapper(FastScanner(y, M, QS, gnormal.v1), rotation)
 
     return scanner, v0, v1
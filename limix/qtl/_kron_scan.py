@@ -0,0 +1,222 @@
+class KronBlockScanner:
+    """
+    Multi-trait scanner that tests a block of single-candidate sets at once.
+
+    It computes, for every column of a samples-by-candidates block, the statistics
+    that :meth:`glimix_core.lmm.KronFastScanner.scan` computes for that column on its
+    own, from the trait covariances of a fitted :class:`glimix_core.lmm.Kron2Sum`.
+
+    The covariance K = C₀ ⊗ Q₀S₀Q₀ᵀ + C₁ ⊗ I is diagonalised by L ⊗ Q, where
+    LᵀC₁L = I and LᵀC₀L = Λ, with eigenvalues D₀ = Λ ⊗ S₀ + 1 over Q₀ and one over
+    its complement. Only the rotations by Q₀ are therefore needed, the complement
+    being accounted for by the unrotated products. The terms of all candidates are
+    stacked along a leading axis so that each one is evaluated by a single matrix
+    product or batched pseudo-inverse instead of one LAPACK call per candidate.
+
+    Parameters
+    ----------
+    Y : n×p array_like
+        Traits.
+    A : p×a array_like
+        Trait-by-trait design matrix.
+    M : n×c array_like
+        Covariates.
+    QS : tuple
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of the kinship matrix, or
+        ``None`` for no kinship.
+    C0 : p×p array_like
+        Trait covariance of the kinship term. It is ignored if ``QS`` is ``None``.
+    C1 : p×p array_like
+        Trait covariance of the residual term.
+    """
+
+    def __init__(self, Y, A, M, QS, C0, C1):
+        from numpy import asarray, einsum, empty, kron, log, newaxis, sqrt
+        from numpy.linalg import eigh
+
+        Y = asarray(Y, float)
+        A = asarray(A, float)
+        M = asarray(M, float)
+        n, p = Y.shape
+
+        S1, U1 = eigh(asarray(C1, float))
+        L = U1 / sqrt(S1)
+        if QS is None:
+            Q0 = empty((n, 0))
+            D0 = empty((0, p))
+        else:
+            Q0 = QS[0][0]
+            S, U0 = eigh(L.T @ asarray(C0, float) @ L)
+            L = L @ U0
+            D0 = QS[1][:, newaxis] * S[newaxis, :] + 1
+
+        self._L = L
+        self._Q0 = Q0
+        # Correction of D⁻¹ over Q₀ with respect to its complement, where D = 1.
+        self._E = 1 / D0 - 1
+        self._nsamples = n
+        self._ncovariates = M.shape[1]
+        self._logdetK = log(D0).sum() + n * log(S1).sum()
+
+        self._Ah = L.T @ A
+        self._M = M
+        self._Q0M = Q0.T @ M
+        self._Yh = Y @ L
+        self._EQ0Yh = self._E * (Q0.T @ self._Yh)
+
+        XEX = einsum("ic,ij,id->jcd", self._Q0M, self._E, self._Q0M)
+        MKiM = kron(self._Ah.T @ self._Ah, M.T @ M)
+        MKiM += _batch_ab(self._Ah, self._Ah, XEX)
+        self._MKiM = MKiM
+
+        MKiy = M.T @ self._Yh @ self._Ah + self._Q0M.T @ self._EQ0Yh @ self._Ah
+        self._MKiy = MKiy.T.ravel()
+        self._yKiy = (self._Yh ** 2).sum() + (self._EQ0Yh * (Q0.T @ self._Yh)).sum()
+
+    def scan(self, A1, G):
+        """
+        LML, fixed-effect sizes, and scale of each candidate.
+
+        Parameters
+        ----------
+        A1 : p×e array_like
+            Trait-by-environments design matrix.
+        G : n×k array_like
+            Block of candidates, each one tested on its own.
+
+        Returns
+        -------
+        dict
+            ``lml`` and ``scale`` of shape (k,), ``effsizes0`` and ``effsizes0_se`` of
+            shape (k, c, a), and ``effsizes1`` and ``effsizes1_se`` of shape (k, 1, e).
+        """
+        from numpy import asarray, einsum, empty
+        from numpy_sugar import is_all_finite
+
+        A1 = asarray(A1, float)
+        G = asarray(G, float)
+
+        if not is_all_finite(A1):
+            raise ValueError("A1 parameter has non-finite elements.")
+
+        if not is_all_finite(G):
+            raise ValueError("X1 parameter has non-finite elements.")
+
+        k = G.shape[1]
+        if A1.shape[1] == 0:
+            return self._null(k)
+
+        ca = self._MKiM.shape[0]
+        e = A1.shape[1]
+        A1h = self._L.T @ A1
+        Q0G = self._Q0.T @ G
+
+        # Per-candidate terms with the candidate on axis 0.
+        XEg = einsum("ic,ij,ik->kjc", self._Q0M, self._E, Q0G)
+        MRiM1 = _batch_kron(self._Ah.T @ A1h, self._M.T @ G)
+        MRiM1 += _batch_ab(self._Ah, A1h, XEg[:, :, :, None])
+        gEg = einsum("ik,ij->kj", Q0G ** 2, self._E)
+        M1RiM1 = (A1h.T @ A1h)[None, :, :] * einsum("ij,ij->j", G, G)[:, None, None]
+        M1RiM1 += einsum("je,jf,kj->kef", A1h, A1h, gEg)
+        M1Riy = G.T @ self._Yh @ A1h + Q0G.T @ self._EQ0Yh @ A1h
+
+        MKiM = empty((k, ca + e, ca + e))
+        MKiM[:, :ca, :ca] = self._MKiM
+        MKiM[:, :ca, ca:] = MRiM1
+        MKiM[:, ca:, :ca] = MRiM1.transpose(0, 2, 1)
+        MKiM[:, ca:, ca:] = M1RiM1
+
+        MKiy = empty((k, ca + e))
+        MKiy[:, :ca] = self._MKiy
+        MKiy[:, ca:] = M1Riy
+
+        r = self._fit(MKiM, MKiy)
+        c = self._ncovariates
+        a = ca // c
+        return {
+            "lml": r["lml"],
+            "effsizes0": _unvec(r["beta"][:, :ca], (k, c, a)),
+            "effsizes0_se": _unvec(r["se"][:, :ca], (k, c, a)),
+            "effsizes1": _unvec(r["beta"][:, ca:], (k, 1, e)),
+            "effsizes1_se": _unvec(r["se"][:, ca:], (k, 1, e)),
+            "scale": r["scale"],
+        }
+
+    def _fit(self, MKiM, MKiy):
+        from numpy import clip, einsum, inf, log, pi, sqrt
+        from numpy.linalg import pinv
+        from numpy_sugar import epsilon
+
+        # Same cutoff as the robust solve of glimix-core: A01 = [A0, A1] is
+        # rank-deficient whenever A1 spans A0, and so is MᵀK⁻¹M.
+        MKiMi = pinv(MKiM, rcond=epsilon.small)
+        beta = einsum("kij,kj->ki", MKiMi, MKiy)
+        mKiy = einsum("ki,ki->k", beta, MKiy)
+
+        np = self._nsamples * self._Yh.shape[1]
+        scale = clip((self._yKiy - mKiy) / np, epsilon.tiny, inf)
+        static_lml = -np * log(2 * pi) - self._logdetK
+        lml = static_lml / 2 - np * _safe_log(scale) / 2 - np / 2
+
+        diag = einsum("kii->ki", MKiMi)
+        se = sqrt(clip(scale[:, None] * diag, epsilon.tiny, inf))
+        return {"lml": lml, "beta": beta, "se": se, "scale": scale}
+
+    def _null(self, k):
+        from numpy import empty, tile
+
+        r = self._fit(self._MKiM[None, :, :], self._MKiy[None, :])
+        c = self._ncovariates
+        shape = (1, c, self._MKiM.shape[0] // c)
+        return {
+            "lml": tile(r["lml"], k),
+            "effsizes0": tile(_unvec(r["beta"], shape), (k, 1, 1)),
+            "effsizes0_se": tile(_unvec(r["se"], shape), (k, 1, 1)),
+            "effsizes1": empty((k, 0)),
+            "effsizes1_se": empty((k, 0)),
+            "scale": tile(r["scale"], k),
+        }
+
+
+def _batch_ab(P, R, X):
+    """
+    Stack of ``Σⱼ kron(outer(P[j], R[j]), X[:, j])`` over the leading axis of ``X``.
+
+    ``X`` has shape (k, p, c, d) and the result has shape (k, a·c, b·d), for ``P`` of
+    shape (p, a) and ``R`` of shape (p, b). A three-dimensional ``X`` is a single
+    block.
+    """
+    from numpy import einsum
+
+    if X.ndim == 3:
+        return _batch_ab(P, R, X[None])[0]
+    (k, _, c, d) = X.shape
+    (a, b) = (P.shape[1], R.shape[1])
+    return einsum("ja,jb,kjcd->kacbd", P, R, X).reshape(k, a * c, b * d)
+
+
+def _batch_kron(P, X):
+    """
+    Stack of ``kron(P, X[:, [i]])`` over the columns of ``X``.
+    """
+    from numpy import einsum
+
+    (a, b) = P.shape
+    (c, k) = X.shape
+    return einsum("ab,ck->kacb", P, X).reshape(k, a * c, b)
+
+
+def _unvec(x, shape):
+    """
+    Column-major unvec applied to each row of ``x``.
+    """
+    from numpy import reshape
+
+    return reshape(x, shape[:1] + shape[1:][::-1]).transpose(0, 2, 1)
+
+
+def _safe_log(x):
+    from numpy import clip, inf, log
+    from numpy_sugar import epsilon
+
+    return log(clip(x, epsilon.small, inf))
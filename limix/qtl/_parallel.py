@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+
+
+@contextmanager
+def process_pool(n_jobs):
+    """
+    Pool of worker processes that returns results in the order of submission.
+
+    Parameters
+    ----------
+    n_jobs : int, None
+        Number of worker processes. ``-1`` uses every available core. ``None`` or ``1``
+        runs every task in the calling process.
+    """
+    if n_jobs is None or n_jobs == 1:
+        yield Pool(None, 1)
+        return
+
+    from joblib import Parallel, effective_n_jobs
+
+    with Parallel(n_jobs=n_jobs, backend="loky") as parallel:
+        yield Pool(parallel, effective_n_jobs(n_jobs))
+
+
+class Pool:
+    def __init__(self, parallel, nworkers):
+        self._parallel = parallel
+        self._nworkers = nworkers
+
+    @property
+    def nworkers(self):
+        return self._nworkers
+
+    def split(self, n):
+        """
+        Split ``range(n)`` into at most one contiguous ``(start, stop)`` per worker.
+        """
+        size = max(-(-n // self._nworkers), 1)
+        return [(i, min(i + size, n)) for i in range(0, n, size)]
+
+    def map(self, func, items, *args):
+        """
+        Compute ``func(*args, item)`` for each item, keeping the original order.
+
+        Large arrays in ``args``, like the ones defining a fitted scanner, are shared
+        with the worker processes via memory mapping instead of being copied.
+        """
+        if self._parallel is None:
+            return [func(*args, i) for i in items]
+
+        from joblib import delayed
+
+        return self._parallel(delayed(func)(*args, i) for i in items)
+
+    def rounds(self, items, size=64):
+        """
+        Group items in rounds of ``size`` tasks per worker.
+        """
+        items = list(items)
+        n = size * self._nworkers
+        return [items[i : i + n] for i in range(0, len(items), n)]
@@ -0,0 +1,148 @@
+class PermutationScanner:
+    """
+    Maximum likelihood-ratio statistic of each permuted trait over all candidates.
+
+    The null model is fitted only once. Its whitened residuals, i.e. the residuals
+    rotated by the eigenvectors of the fitted covariance and divided by the square
+    roots of its eigenvalues, are exchangeable under the null hypothesis. Each
+    permutation shuffles them and maps them back with the same covariance, which
+    preserves the kinship structure of the trait. The permuted traits share the
+    covariance of the null model, so the candidate and covariate terms of a block
+    are computed once and only their product with the n×P permuted traits is done
+    per permutation, via :class:`limix.qtl._scan_many.ManyTraitScanner`.
+
+    Parameters
+    ----------
+    y : array_like
+        Trait.
+    M : n×c array_like
+        Covariates.
+    QS : tuple
+        Economic eigendecomposition of the kinship matrix, or ``None``.
+    v0 : float
+        Fitted kinship variance.
+    v1 : float
+        Fitted residual variance.
+    npermutations : int
+        Number of permuted traits.
+    random : :class:`numpy.random.RandomState`
+        Source of the permutations.
+    """
+
+    def __init__(self, y, M, QS, v0, v1, npermutations, random):
+        from numpy import full, inf
+
+        from ._scan_many import ManyTraitScanner
+
+        Y = _permuted_traits(y, M, QS, v0, v1, npermutations, random)
+        self._scanner = ManyTraitScanner(Y, M, QS, v0, v1)
+        self._null_lml = self._scanner.null_lml()
+        self.max_stats = full(npermutations, -inf)
+
+    def add_block(self, G):
+        """
+        Test a block of candidates against every permuted trait.
+
+        Parameters
+        ----------
+        G : n×k array_like
+            Block of candidates, each one tested on its own.
+        """
+        from numpy import maximum
+
+        lml = self._scanner.lml(G)
+        if lml.shape[1] == 0:
+            return
+        stats = 2 * (lml - self._null_lml[:, None])
+        maximum(self.max_stats, stats.max(1), out=self.max_stats)
+
+
+def _permuted_traits(y, M, QS, v0, v1, npermutations, random):
+    from numpy import asarray, concatenate, cumsum, errstate, sqrt, where
+    from numpy.linalg import pinv
+
+    from ._rotation import NullRotation
+
+    y = asarray(y, float)
+    M = asarray(M, float)
+    null = NullRotation(y, M, QS, v0, v1)
+    m = M @ (pinv(null.XTBX[0]) @ null.yTBX[0])
+
+    # Whitened residuals, of unit variance under the null hypothesis.
+    r = [(yQ * sqrt(Di))[0] for yQ, Di in zip(null.rotate(y - m), null.Di)]
+    W = concatenate(r)[random.rand(npermutations, len(y)).argsort(1)]
+
+    ends = cumsum([0] + [Di.shape[1] for Di in null.Di])
+    R = []
+    for Di, i, j in zip(null.Di, ends[:-1], ends[1:]):
+        with errstate(divide="ignore"):
+            sd = where(Di[0] > 0, 1 / sqrt(Di[0]), 0)
+        R.append(W[:, i:j] * sd)
+    return m[:, None] + null.unrotate(R)
+
+
+class PermutationResult:
+    """
+    Genome-wide significance from permuted traits.
+
+    Parameters
+    ----------
+    max_stats : array_like
+        Maximum likelihood-ratio statistic over the candidates, per permutation.
+    stats : :class:`pandas.DataFrame`
+        Statistics of the tests of the original trait.
+    """
+
+    def __init__(self, max_stats, stats):
+        from numpy import asarray
+
+        self._max_stats = asarray(max_stats, float)
+        self._stats = stats
+
+    @property
+    def max_stats(self):
+        """
+        Maximum likelihood-ratio statistic over the candidates, per permutation.
+        """
+        return self._max_stats
+
+    def threshold(self, alpha=0.05):
+        """
+        Family-wise significance threshold on the p-values of the tests.
+
+        Parameters
+        ----------
+        alpha : float, optional
+            Family-wise error rate. Defaults to ``0.05``.
+
+        Returns
+        -------
+        float
+            P-value below which a test is significant at the family-wise error rate
+            ``alpha``.
+        """
+        from numpy import quantile
+        from scipy.stats import chi2
+
+        stat = quantile(self._max_stats, 1 - alpha)
+        dof = self._stats["dof20"].max()
+        return chi2.sf(stat, dof)
+
+    @property
+    def pvalues(self):
+        """
+        Family-wise adjusted p-value of each test.
+
+        Returns
+        -------
+        :class:`pandas.Series`
+            Fraction of permutations whose maximum statistic is above the statistic
+            of the test, as given by :func:`limix.stats.empirical_pvalues`.
+        """
+        from pandas import Series
+
+        from ..stats import empirical_pvalues
+
+        stats = 2 * (self._stats["lml2"] - self._stats["lml0"])
+        pv = empirical_pvalues(stats.values, self._max_stats)
+        return Series(pv, index=self._stats.index, name="pv20_fwer")
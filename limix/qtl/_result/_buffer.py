@@ -0,0 +1,234 @@
+class ScanBuffer:
+    """
+    Columnar storage of the tests of a scan.
+
+    Per-test values are written into preallocated numpy arrays instead of being kept
+    as one Python object per test. Candidate-wise values, whose number varies from
+    test to test, are stored contiguously and delimited by offsets.
+
+    Parameters
+    ----------
+    ncandidates : int
+        Number of candidates, used as the initial capacity of the buffers.
+    """
+
+    def __init__(self, ncandidates):
+        from numpy import empty, zeros
+
+        capacity = max(int(ncandidates), 1)
+        self._ntests = 0
+        self._ncands = 0
+        self._idx = empty(capacity, int)
+        self._offsets = zeros(capacity + 1, int)
+        self._hyps = {}
+
+    @property
+    def ntests(self):
+        """
+        Number of tests.
+        """
+        return self._ntests
+
+    @property
+    def idx(self):
+        """
+        Candidate indices of all tests, concatenated.
+        """
+        return self._idx[: self._ncands]
+
+    @property
+    def sizes(self):
+        """
+        Number of candidates of each test.
+        """
+        from numpy import diff
+
+        return diff(self._offsets[: self._ntests + 1])
+
+    def has(self, name):
+        """
+        Whether hypothesis ``name`` has been recorded.
+        """
+        return name in self._hyps
+
+    def hypothesis(self, name):
+        """
+        Arrays of hypothesis ``name``.
+
+        Per-test arrays have the tests along the first axis. Candidate-wise arrays,
+        ``candidate_effsizes`` and ``candidate_effsizes_se``, have the candidates of
+        all tests, in the same order as :attr:`idx`, along the first axis.
+        """
+        h = self._hyps[name]
+        r = {k: v[: self._ntests] for k, v in h.items()}
+        for k in ["candidate_effsizes", "candidate_effsizes_se"]:
+            r[k] = h[k][: self._ncands]
+        return r
+
+    def add_test(self, cand_idx, **hyps):
+        """
+        Append a test.
+
+        Parameters
+        ----------
+        cand_idx : array_like
+            Candidate indices of the test.
+        **hyps : dict
+            Results of each hypothesis, keyed by hypothesis name. ``None`` values are
+            ignored.
+        """
+        from numpy import asarray, reshape
+
+        cand_idx = asarray(cand_idx, int).ravel()
+        n = cand_idx.size
+        i = self._ntests
+        j = self._ncands
+        self._reserve(i + 1, j + n)
+
+        self._idx[j : j + n] = cand_idx
+        self._offsets[i + 1] = j + n
+
+        for name, h in hyps.items():
+            if h is None:
+                continue
+            if name not in self._hyps:
+                capacity = (len(self._offsets) - 1, len(self._idx))
+                self._hyps[name] = _allocate(h, n, *capacity)
+            cols = self._hyps[name]
+            cols["lml"][i] = h["lml"]
+            cols["scale"][i] = h["scale"]
+            cols["covariate_effsizes"][i] = h["covariate_effsizes"]
+            cols["covariate_effsizes_se"][i] = h["covariate_effsizes_se"]
+            for k in ["candidate_effsizes", "candidate_effsizes_se"]:
+                v = cols[k]
+                v[j : j + n] = reshape(h[k], (n,) + v.shape[1:])
+
+        self._ntests += 1
+        self._ncands += n
+
+    def add_tests(self, cand_idx, **hyps):
+        """
+        Append tests of one candidate each.
+
+        It is equivalent to calling :meth:`add_test` once per candidate, without the
+        per-test overhead.
+
+        Parameters
+        ----------
+        cand_idx : array_like
+            Candidate index of each test.
+        **hyps : dict
+            Results of each hypothesis, keyed by hypothesis name, with the tests along
+            the first axis of every array. ``None`` values are ignored.
+        """
+        from numpy import arange, asarray, reshape
+
+        cand_idx = asarray(cand_idx, int).ravel()
+        k = cand_idx.size
+        i = self._ntests
+        j = self._ncands
+        self._reserve(i + k, j + k)
+
+        self._idx[j : j + k] = cand_idx
+        self._offsets[i + 1 : i + k + 1] = j + arange(1, k + 1)
+
+        for name, h in hyps.items():
+            if h is None:
+                continue
+            if name not in self._hyps:
+                capacity = (len(self._offsets) - 1, len(self._idx))
+                first = {key: asarray(v)[0] for key, v in h.items()}
+                self._hyps[name] = _allocate(first, 1, *capacity)
+            cols = self._hyps[name]
+            for key, v in cols.items():
+                start = j if key.startswith("candidate") else i
+                v[start : start + k] = reshape(h[key], (k,) + v.shape[1:])
+
+        self._ntests += k
+        self._ncands += k
+
+    def _reserve(self, ntests, ncands):
+        if ntests >= len(self._offsets):
+            capacity = max(ntests, 2 * (len(self._offsets) - 1))
+            self._offsets = _grow(self._offsets, capacity + 1)
+            for h in self._hyps.values():
+                for k in h:
+                    if not k.startswith("candidate"):
+                        h[k] = _grow(h[k], capacity)
+
+        if ncands > len(self._idx):
+            capacity = max(ncands, 2 * len(self._idx))
+            self._idx = _grow(self._idx, capacity)
+            for h in self._hyps.values():
+                for k in ["candidate_effsizes", "candidate_effsizes_se"]:
+                    h[k] = _grow(h[k], capacity)
+
+
+def stack_segments(lengths, columns):
+    """
+    Interleave per-test segments of rows into a single test-major table.
+
+    The rows of test ``i`` are the rows of the first segment that belong to test
+    ``i``, followed by the ones of the second segment, and so on.
+
+    Parameters
+    ----------
+    lengths : list
+        Number of rows of each test, one array per segment.
+    columns : dict
+        Maps a column name to a list with the values of each segment. The values of a
+        segment are given for all tests at once, in test order.
+
+    Returns
+    -------
+    dict
+        Maps a column name to its values in test-major order.
+    """
+    from numpy import arange, asarray, cumsum, empty, repeat, stack
+
+    L = stack([asarray(l, int) for l in lengths])
+    ntests = L.shape[1]
+    total = L.sum(0)
+    test_start = cumsum(total) - total
+    seg_start = cumsum(L, 0) - L
+
+    positions = []
+    for k in range(L.shape[0]):
+        test = repeat(arange(ntests), L[k])
+        first = repeat(cumsum(L[k]) - L[k], L[k])
+        local = arange(L[k].sum()) - first
+        positions.append(test_start[test] + seg_start[k][test] + local)
+
+    nrows = int(total.sum())
+    table = {}
+    for name, values in columns.items():
+        values = [asarray(v) for v in values]
+        dtype = values[0].dtype if values[0].dtype.kind in "biuf" else object
+        col = empty(nrows, dtype)
+        for p, v in zip(positions, values):
+            col[p] = v
+        table[name] = col
+    return table
+
+
+def _allocate(h, n, ntests, ncands):
+    from numpy import asarray, empty, shape
+
+    width = asarray(h["candidate_effsizes"]).size // max(n, 1)
+    cshape = shape(h["covariate_effsizes"])
+    return {
+        "lml": empty(ntests),
+        "scale": empty(ntests),
+        "covariate_effsizes": empty((ntests,) + cshape),
+        "covariate_effsizes_se": empty((ntests,) + cshape),
+        "candidate_effsizes": empty((ncands, width)),
+        "candidate_effsizes_se": empty((ncands, width)),
+    }
+
+
+def _grow(x, n):
+    from numpy import empty
+
+    y = empty((n,) + x.shape[1:], x.dtype)
+    y[: len(x)] = x
+    return y
@@ -1,3 +1,4 @@
+from ._buffer import ScanBuffer
 from ._iresult import IScanResult
 from ._st_simple import STSimpleModelResult
 
@@ -16,24 +17,26 @@ class IScanResultFactory:
         beta_se,
         C0,
         C1,
+        sink=None,
     ):
         from numpy import asarray, atleast_1d
 
         self._h0 = STSimpleModelResult(
             lik, traits, covariates, lml, beta, beta_se, C0, C1
         )
-        self._tests = []
         self._traits = asarray(atleast_1d(traits), str)
         self._covariates = asarray(atleast_1d(covariates), str)
         self._candidates = asarray(atleast_1d(candidates), str)
         self._envs0 = asarray(atleast_1d(envs0), str)
         self._envs1 = asarray(atleast_1d(envs1), str)
+        self._sink = sink
+        self._tests = self._new_buffer()
 
     def add_test(self, cand_idx, h1, h2):
-        from numpy import atleast_1d, atleast_2d, asarray
+        from numpy import arange, atleast_2d, asarray
 
-        if not isinstance(cand_idx, slice):
-            cand_idx = asarray(atleast_1d(cand_idx).ravel(), int)
+        if isinstance(cand_idx, slice):
+            cand_idx = arange(len(self._candidates))[cand_idx]
 
         def _2d_shape(x):
             x = asarray(x, float)
@@ -53,15 +56,39 @@ class IScanResultFactory:
         h1 = _normalize(h1)
         h2 = _normalize(h2)
 
-        self._tests.append({"idx": cand_idx, "h1": h1, "h2": h2})
+        self._tests.add_test(cand_idx, h1=h1, h2=h2)
+        self._flush(False)
 
     def create(self):
+        self._flush(True)
+        return self._result(self._tests, self._sink)
+
+    def _result(self, tests, sink=None):
         return IScanResult(
-            self._tests,
+            tests,
             self._traits,
             self._covariates,
             self._candidates,
             self._h0,
             self._envs0,
             self._envs1,
+            sink,
         )
+
+    def _new_buffer(self):
+        n = len(self._candidates)
+        if self._sink is not None:
+            n = min(n, self._sink.flush_every)
+        return ScanBuffer(n)
+
+    def _flush(self, force):
+        if self._sink is None:
+            return
+
+        ntests = self._tests.ntests
+        if ntests > 0 and (force or ntests >= self._sink.flush_every):
+            self._sink.write(self._result(self._tests)._tables())
+            self._tests = self._new_buffer()
+
+        if force:
+            self._sink.close()
@@ -2,11 +2,15 @@ from limix._cache import cache
 from limix.stats import lrt_pvalues
 
 from limix._display import AlignedText, draw_title
+from .._sink import dataframes
+from ._buffer import stack_segments
 from ._draw import draw_alt_hyp_table, draw_lrt_table, draw_model
 
 
 class IScanResult:
-    def __init__(self, tests, traits, covariates, candidates, h0, envs0, envs1):
+    def __init__(
+        self, tests, traits, covariates, candidates, h0, envs0, envs1, sink=None
+    ):
         self._tests = tests
         self._traits = traits
         self._covariates = covariates
@@ -14,11 +18,16 @@ class IScanResult:
         self._envs0 = envs0
         self._envs1 = envs1
         self._h0 = h0
+        self._sink = sink
 
     @property
     def stats(self):
         """
         Statistics.
+
+        The natural logarithms of the p-values are given in the ``logpv10``,
+        ``logpv20``, and ``logpv21`` columns, which keep the strongest associations
+        apart when their p-values underflow.
         """
         return self._dataframes["stats"].set_index("test")
 
@@ -54,85 +63,54 @@ class IScanResult:
 
     @property
     def _h1_dataframe(self):
-        from pandas import DataFrame
-
-        covariates = list(self._covariates)
-        envs0 = list(self._envs0)
-
-        trait = self._traits[0]
-        h1 = []
-        for i, test in enumerate(self._tests):
-            candidates = list(self._candidates[test["idx"]])
-
-            effsizes = test["h1"]["covariate_effsizes"]
-            effsizes_se = test["h1"]["covariate_effsizes_se"]
-            for j, c in enumerate(covariates):
-                eff = effsizes[j]
-                eff_se = effsizes_se[j]
-                v = [i, str(trait), "covariate", str(c), None, eff, eff_se]
-                h1.append(v)
-
-            effsizes = test["h1"]["candidate_effsizes"]
-            effsizes_se = test["h1"]["candidate_effsizes_se"]
-            for l, c in enumerate(candidates):
-                for j, e in enumerate(envs0):
-                    env_name = "env0_" + str(e)
-                    eff = effsizes[l, j]
-                    eff_se = effsizes_se[l, j]
-                    v = [i, str(trait), "candidate", str(c), env_name, eff, eff_se]
-                    h1.append(v)
-
-        columns = [
-            "test",
-            "trait",
-            "effect_type",
-            "effect_name",
-            "env",
-            "effsize",
-            "effsize_se",
-        ]
-        return DataFrame(h1, columns=columns)
+        envs = [(slice(0, len(self._envs0)), "env0_", self._envs0)]
+        return self._hyp_dataframe("h1", envs)
 
     @property
     def _h2_dataframe(self):
-        from pandas import DataFrame
-
-        envs0 = list(self._envs0)
-        envs1 = list(self._envs1)
-        covariates = list(self._covariates)
+        off = len(self._envs0)
+        envs = [(slice(0, off), "env0_", self._envs0)]
+        envs += [(slice(off, off + len(self._envs1)), "env1_", self._envs1)]
+        return self._hyp_dataframe("h2", envs)
 
-        trait = self._traits[0]
-        h2 = []
-        for i, test in enumerate(self._tests):
-            candidates = list(self._candidates[test["idx"]])
+    def _hyp_dataframe(self, name, envs):
+        from numpy import arange, asarray, full, repeat, tile
+        from pandas import DataFrame
 
-            effsizes = test["h2"]["covariate_effsizes"]
-            effsizes_se = test["h2"]["covariate_effsizes_se"]
-            for j, c in enumerate(covariates):
-                eff = effsizes[j]
-                eff_se = effsizes_se[j]
-                v = [i, str(trait), "covariate", str(c), None, eff, eff_se]
-                h2.append(v)
-
-            effsizes = test["h2"]["candidate_effsizes"]
-            effsizes_se = test["h2"]["candidate_effsizes_se"]
-            off = 0
-            for l, c in enumerate(candidates):
-                for j, e in enumerate(envs0):
-                    env_name = "env0_" + str(e)
-                    eff = effsizes[l, off + j]
-                    eff_se = effsizes_se[l, off + j]
-                    v = [i, str(trait), "candidate", str(c), env_name, eff, eff_se]
-                    h2.append(v)
-
-            off = len(envs0)
-            for l, c in enumerate(candidates):
-                for j, e in enumerate(envs1):
-                    env_name = "env1_" + str(e)
-                    eff = effsizes[l, off + j]
-                    eff_se = effsizes_se[l, off + j]
-                    v = [i, str(trait), "candidate", str(c), env_name, eff, eff_se]
-                    h2.append(v)
+        tests = self._tests
+        h = tests.hypothesis(name)
+        ntests = tests.ntests
+        sizes = tests.sizes
+        trait = str(self._traits[0])
+        covariates = self._covariates
+        candidates = self._candidates[tests.idx]
+        ncovariates = len(covariates)
+
+        test = arange(ntests)
+        lengths = [full(ntests, ncovariates)]
+        values = {
+            "test": [repeat(test, ncovariates)],
+            "trait": [full(ntests * ncovariates, trait, object)],
+            "effect_type": [full(ntests * ncovariates, "covariate", object)],
+            "effect_name": [tile(covariates, ntests)],
+            "env": [full(ntests * ncovariates, None, object)],
+            "effsize": [h["covariate_effsizes"].ravel()],
+            "effsize_se": [h["covariate_effsizes_se"].ravel()],
+        }
+
+        # Candidate rows are ordered by candidate and then by environment.
+        for cols, prefix, names in envs:
+            nenvs = len(names)
+            n = len(candidates) * nenvs
+            lengths.append(sizes * nenvs)
+            values["test"].append(repeat(test, sizes * nenvs))
+            values["trait"].append(full(n, trait, object))
+            values["effect_type"].append(full(n, "candidate", object))
+            values["effect_name"].append(repeat(candidates, nenvs))
+            envnames = asarray([prefix + str(e) for e in names], object)
+            values["env"].append(tile(envnames, len(candidates)))
+            values["effsize"].append(h["candidate_effsizes"][:, cols].ravel())
+            values["effsize_se"].append(h["candidate_effsizes_se"][:, cols].ravel())
 
         columns = [
             "test",
@@ -143,30 +121,31 @@ class IScanResult:
             "effsize",
             "effsize_se",
         ]
-        return DataFrame(h2, columns=columns)
+        return DataFrame(stack_segments(lengths, values), columns=columns)
 
     @property
     def _stats_dataframe(self):
+        from numpy import arange, full
         from pandas import DataFrame
 
-        stats = []
-        for i, test in enumerate(self._tests):
-            dof10 = test["h1"]["candidate_effsizes"].size
-            dof20 = test["h2"]["candidate_effsizes"].size
-            dof21 = dof20 - dof10
-            stats.append(
-                [
-                    i,
-                    self._h0.lml,
-                    test["h1"]["lml"],
-                    test["h2"]["lml"],
-                    dof10,
-                    dof20,
-                    dof21,
-                    test["h1"]["scale"],
-                    test["h2"]["scale"],
-                ]
-            )
+        tests = self._tests
+        h1 = tests.hypothesis("h1")
+        h2 = tests.hypothesis("h2")
+        ntests = tests.ntests
+        dof10 = tests.sizes * h1["candidate_effsizes"].shape[1]
+        dof20 = tests.sizes * h2["candidate_effsizes"].shape[1]
+
+        stats = {
+            "test": arange(ntests),
+            "lml0": full(ntests, self._h0.lml),
+            "lml1": h1["lml"],
+            "lml2": h2["lml"],
+            "dof10": dof10,
+            "dof20": dof20,
+            "dof21": dof20 - dof10,
+            "scale1": h1["scale"],
+            "scale2": h2["scale"],
+        }
 
         columns = [
             "test",
@@ -184,17 +163,29 @@ class IScanResult:
         stats["pv10"] = lrt_pvalues(stats["lml0"], stats["lml1"], stats["dof10"])
         stats["pv20"] = lrt_pvalues(stats["lml0"], stats["lml2"], stats["dof20"])
         stats["pv21"] = lrt_pvalues(stats["lml1"], stats["lml2"], stats["dof21"])
+        stats["logpv10"] = lrt_pvalues(
+            stats["lml0"], stats["lml1"], stats["dof10"], log=True
+        )
+        stats["logpv20"] = lrt_pvalues(
+            stats["lml0"], stats["lml2"], stats["dof20"], log=True
+        )
+        stats["logpv21"] = lrt_pvalues(
+            stats["lml1"], stats["lml2"], stats["dof21"], log=True
+        )
 
         return stats
 
+    def _tables(self):
+        return {
+            "stats": self._stats_dataframe,
+            "effsizes_h1": self._h1_dataframe,
+            "effsizes_h2": self._h2_dataframe,
+        }
+
     @property
     @cache
     def _dataframes(self):
-        h1 = self._h1_dataframe
-        h2 = self._h2_dataframe
-        stats = self._stats_dataframe
-
-        return {"stats": stats, "effsizes": {"h1": h1, "h2": h2}}
+        return dataframes(self._tables, self._sink)
 
     def _covariance_expr(self):
         from numpy import isnan
@@ -2,11 +2,15 @@ from limix._cache import cache
 from limix.stats import lrt_pvalues
 
 from limix._display import AlignedText, draw_title
+from .._sink import dataframes
+from ._buffer import stack_segments
 from ._draw import draw_alt_hyp_table, draw_lrt_table, draw_model
 
 
 class MTScanResult:
-    def __init__(self, tests, traits, covariates, candidates, h0, envs0, envs1):
+    def __init__(
+        self, tests, traits, covariates, candidates, h0, envs0, envs1, sink=None
+    ):
         self._tests = tests
         self._traits = traits
         self._covariates = covariates
@@ -14,11 +18,16 @@ class MTScanResult:
         self._envs0 = envs0
         self._envs1 = envs1
         self._h0 = h0
+        self._sink = sink
 
     @property
     def stats(self):
         """
         Statistics.
+
+        The natural logarithms of the p-values are given in the ``logpv10``,
+        ``logpv20``, and ``logpv21`` columns, which keep the strongest associations
+        apart when their p-values underflow.
         """
         return self._dataframes["stats"].set_index("test")
 
@@ -54,85 +63,51 @@ class MTScanResult:
 
     @property
     def _h1_dataframe(self):
-        from pandas import DataFrame
-
-        covariates = list(self._covariates)
-        envs0 = list(self._envs0)
-
-        h1 = []
-        for i, test in enumerate(self._tests):
-            candidates = list(self._candidates[test.idx])
-
-            effsizes = test.h1.covariate_effsizes
-            effsizes_se = test.h1.covariate_effsizes_se
-            for j, trait in enumerate(self._traits):
-                for l, c in enumerate(covariates):
-                    eff = effsizes[l, j]
-                    eff_se = effsizes_se[l, j]
-                    v = [i, str(trait), "covariate", str(c), None, eff, eff_se]
-                    h1.append(v)
-
-            effsizes = test.h1.candidate_effsizes
-            effsizes_se = test.h1.candidate_effsizes_se
-            for j, e in enumerate(envs0):
-                for l, c in enumerate(candidates):
-                    env_name = "env0_" + str(e)
-                    eff = effsizes[l, j]
-                    eff_se = effsizes_se[l, j]
-                    v = [i, None, "candidate", str(c), env_name, eff, eff_se]
-                    h1.append(v)
-
-        columns = [
-            "test",
-            "trait",
-            "effect_type",
-            "effect_name",
-            "env",
-            "effsize",
-            "effsize_se",
-        ]
-        return DataFrame(h1, columns=columns)
+        envs = [(j, "env0_" + str(e)) for j, e in enumerate(self._envs0)]
+        return self._hyp_dataframe("h1", envs)
 
     @property
     def _h2_dataframe(self):
-        from pandas import DataFrame
+        off = len(self._envs0)
+        envs = [(j, "env0_" + str(e)) for j, e in enumerate(self._envs0)]
+        envs += [(off + j, "env1_" + str(e)) for j, e in enumerate(self._envs1)]
+        return self._hyp_dataframe("h2", envs)
 
-        envs0 = list(self._envs0)
-        envs1 = list(self._envs1)
-        covariates = list(self._covariates)
+    def _hyp_dataframe(self, name, envs):
+        from numpy import arange, full, repeat, tile
+        from pandas import DataFrame
 
-        h2 = []
-        for i, test in enumerate(self._tests):
-            candidates = list(self._candidates[test.idx])
-
-            effsizes = test.h2.covariate_effsizes
-            effsizes_se = test.h2.covariate_effsizes_se
-            for j, trait in enumerate(self._traits):
-                for l, c in enumerate(covariates):
-                    eff = effsizes[l, j]
-                    eff_se = effsizes_se[l, j]
-                    v = [i, str(trait), "covariate", str(c), None, eff, eff_se]
-                    h2.append(v)
-
-            effsizes = test.h2.candidate_effsizes
-            effsizes_se = test.h2.candidate_effsizes_se
-            off = 0
-            for j, e in enumerate(envs0):
-                for l, c in enumerate(candidates):
-                    env_name = "env0_" + str(e)
-                    eff = effsizes[l, off + j]
-                    eff_se = effsizes_se[l, off + j]
-                    v = [i, None, "candidate", str(c), env_name, eff, eff_se]
-                    h2.append(v)
-
-            off = len(envs0)
-            for j, e in enumerate(envs1):
-                for l, c in enumerate(candidates):
-                    env_name = "env1_" + str(e)
-                    eff = effsizes[l, off + j]
-                    eff_se = effsizes_se[l, off + j]
-                    v = [i, None, "candidate", str(c), env_name, eff, eff_se]
-                    h2.append(v)
+        tests = self._tests
+        h = tests.hypothesis(name)
+        ntests = tests.ntests
+        sizes = tests.sizes
+        traits = self._traits
+        covariates = self._covariates
+        candidates = self._candidates[tests.idx]
+        ncovs = len(traits) * len(covariates)
+        ncandidates = len(candidates)
+
+        test = arange(ntests)
+        lengths = [full(ntests, ncovs)]
+        values = {
+            "test": [repeat(test, ncovs)],
+            "trait": [tile(repeat(traits, len(covariates)), ntests)],
+            "effect_type": [full(ntests * ncovs, "covariate", object)],
+            "effect_name": [tile(tile(covariates, len(traits)), ntests)],
+            "env": [full(ntests * ncovs, None, object)],
+            "effsize": [h["covariate_effsizes"].transpose(0, 2, 1).ravel()],
+            "effsize_se": [h["covariate_effsizes_se"].transpose(0, 2, 1).ravel()],
+        }
+
+        for j, env in envs:
+            lengths.append(sizes)
+            values["test"].append(repeat(test, sizes))
+            values["trait"].append(full(ncandidates, None, object))
+            values["effect_type"].append(full(ncandidates, "candidate", object))
+            values["effect_name"].append(candidates)
+            values["env"].append(full(ncandidates, env, object))
+            values["effsize"].append(h["candidate_effsizes"][:, j])
+            values["effsize_se"].append(h["candidate_effsizes_se"][:, j])
 
         columns = [
             "test",
@@ -143,33 +118,34 @@ class MTScanResult:
             "effsize",
             "effsize_se",
         ]
-        return DataFrame(h2, columns=columns)
+        return DataFrame(stack_segments(lengths, values), columns=columns)
 
     @property
     def _stats_dataframe(self):
+        from numpy import arange, full
         from pandas import DataFrame
 
         if len(self._envs0) == 0:
             return self._stats_dataframe_h2_only
 
-        stats = []
-        for i, test in enumerate(self._tests):
-            dof10 = test.h1.candidate_effsizes.size
-            dof20 = test.h2.candidate_effsizes.size
-            dof21 = dof20 - dof10
-            stats.append(
-                [
-                    i,
-                    self._h0.lml,
-                    test.h1.lml,
-                    test.h2.lml,
-                    dof10,
-                    dof20,
-                    dof21,
-                    test.h1.scale,
-                    test.h2.scale,
-                ]
-            )
+        tests = self._tests
+        h1 = tests.hypothesis("h1")
+        h2 = tests.hypothesis("h2")
+        ntests = tests.ntests
+        dof10 = tests.sizes * h1["candidate_effsizes"].shape[1]
+        dof20 = tests.sizes * h2["candidate_effsizes"].shape[1]
+
+        stats = {
+            "test": arange(ntests),
+            "lml0": full(ntests, self._h0.lml),
+            "lml1": h1["lml"],
+            "lml2": h2["lml"],
+            "dof10": dof10,
+            "dof20": dof20,
+            "dof21": dof20 - dof10,
+            "scale1": h1["scale"],
+            "scale2": h2["scale"],
+        }
 
         columns = [
             "test",
@@ -187,34 +163,56 @@ class MTScanResult:
         stats["pv10"] = lrt_pvalues(stats["lml0"], stats["lml1"], stats["dof10"])
         stats["pv20"] = lrt_pvalues(stats["lml0"], stats["lml2"], stats["dof20"])
         stats["pv21"] = lrt_pvalues(stats["lml1"], stats["lml2"], stats["dof21"])
+        stats["logpv10"] = lrt_pvalues(
+            stats["lml0"], stats["lml1"], stats["dof10"], log=True
+        )
+        stats["logpv20"] = lrt_pvalues(
+            stats["lml0"], stats["lml2"], stats["dof20"], log=True
+        )
+        stats["logpv21"] = lrt_pvalues(
+            stats["lml1"], stats["lml2"], stats["dof21"], log=True
+        )
 
         return stats
 
     @property
     def _stats_dataframe_h2_only(self):
+        from numpy import arange, full
         from pandas import DataFrame
 
-        stats = []
-        for i, test in enumerate(self._tests):
-            dof20 = test.h2.candidate_effsizes.size
-            stats.append([i, self._h0.lml, test.h2.lml, dof20, test.h2.scale])
+        tests = self._tests
+        h2 = tests.hypothesis("h2")
+        ntests = tests.ntests
+
+        stats = {
+            "test": arange(ntests),
+            "lml0": full(ntests, self._h0.lml),
+            "lml2": h2["lml"],
+            "dof20": tests.sizes * h2["candidate_effsizes"].shape[1],
+            "scale2": h2["scale"],
+        }
 
         columns = ["test", "lml0", "lml2", "dof20", "scale2"]
         stats = DataFrame(stats, columns=columns)
 
         stats["pv20"] = lrt_pvalues(stats["lml0"], stats["lml2"], stats["dof20"])
+        stats["logpv20"] = lrt_pvalues(
+            stats["lml0"], stats["lml2"], stats["dof20"], log=True
+        )
 
         return stats
 
+    def _tables(self):
+        tables = {"stats": self._stats_dataframe}
+        if len(self._envs0) > 0:
+            tables["effsizes_h1"] = self._h1_dataframe
+        tables["effsizes_h2"] = self._h2_dataframe
+        return tables
+
     @property
     @cache
     def _dataframes(self):
-        h2 = self._h2_dataframe
-        stats = self._stats_dataframe
-        r = {"stats": stats, "effsizes": {"h2": h2}}
-        if len(self._envs0) > 0:
-            r["effsizes"]["h1"] = self._h1_dataframe
-        return r
+        return dataframes(self._tables, self._sink)
 
     def _repr_three_hypothesis(self):
         from numpy import asarray
@@ -1,25 +1,39 @@
+from ._buffer import ScanBuffer
 from ._st_result import STScanResult
 from ._st_simple import STSimpleModelResult
-from ._tuples import VariantResult, Result
 
 
 class STScanResultFactory:
-    def __init__(self, lik, trait, covariates, candidates, lml, beta, beta_se, v0, v1):
+    def __init__(
+        self,
+        lik,
+        trait,
+        covariates,
+        candidates,
+        lml,
+        beta,
+        beta_se,
+        v0,
+        v1,
+        sink=None,
+    ):
         from numpy import asarray, atleast_1d
 
         self._h0 = STSimpleModelResult(
             lik, trait, covariates, lml, beta, beta_se, v0, v1
         )
-        self._tests = []
         self._trait = str(trait)
         self._covariates = asarray(atleast_1d(covariates), str)
         self._candidates = asarray(atleast_1d(candidates), str)
+        self._sink = sink
+        self._tests = self._new_buffer()
+        self._max_stats = None
 
     def add_test(self, cand_idx, h2):
-        from numpy import atleast_1d, asarray
+        from numpy import arange, atleast_1d, asarray
 
-        if not isinstance(cand_idx, slice):
-            cand_idx = asarray(atleast_1d(cand_idx).ravel(), int)
+        if isinstance(cand_idx, slice):
+            cand_idx = arange(len(self._candidates))[cand_idx]
 
         def _1d_shape(x):
             x = asarray(x, float)
@@ -27,18 +41,72 @@ class STScanResultFactory:
             return x
 
         def _normalize(h):
-            return VariantResult(
-                lml=float(h.lml),
-                covariate_effsizes=_1d_shape(h.covariate_effsizes),
-                candidate_effsizes=_1d_shape(h.candidate_effsizes),
-                covariate_effsizes_se=_1d_shape(h.covariate_effsizes_se),
-                candidate_effsizes_se=_1d_shape(h.candidate_effsizes_se),
-                scale=float(h.scale),
-            )
+            return {
+                "lml": float(h.lml),
+                "covariate_effsizes": _1d_shape(h.covariate_effsizes),
+                "candidate_effsizes": _1d_shape(h.candidate_effsizes),
+                "covariate_effsizes_se": _1d_shape(h.covariate_effsizes_se),
+                "candidate_effsizes_se": _1d_shape(h.candidate_effsizes_se),
+                "scale": float(h.scale),
+            }
 
-        self._tests.append(Result(idx=cand_idx, h1=None, h2=_normalize(h2)))
+        self._tests.add_test(cand_idx, h2=_normalize(h2))
+        self._flush(False)
+
+    def add_tests(self, cand_idx, h2):
+        """
+        Add one test per candidate index.
+
+        Parameters
+        ----------
+        cand_idx : array_like
+            Candidate index of each test.
+        h2 : dict
+            ``lml``, ``scale``, ``covariate_effsizes``, ``covariate_effsizes_se``,
+            ``candidate_effsizes``, and ``candidate_effsizes_se`` arrays with the tests
+            along the first axis.
+        """
+        from numpy import asarray
+
+        h2 = {k: asarray(v, float) for k, v in h2.items()}
+        self._tests.add_tests(cand_idx, h2=h2)
+        self._flush(False)
+
+    def set_permutation(self, max_stats):
+        """
+        Set the maximum statistic over the candidates of each permuted trait.
+        """
+        self._max_stats = max_stats
 
     def create(self):
+        self._flush(True)
+        return self._result(self._tests, self._sink, self._max_stats)
+
+    def _result(self, tests, sink=None, max_stats=None):
         return STScanResult(
-            self._tests, self._trait, self._covariates, self._candidates, self._h0
+            tests,
+            self._trait,
+            self._covariates,
+            self._candidates,
+            self._h0,
+            sink,
+            max_stats,
         )
+
+    def _new_buffer(self):
+        n = len(self._candidates)
+        if self._sink is not None:
+            n = min(n, self._sink.flush_every)
+        return ScanBuffer(n)
+
+    def _flush(self, force):
+        if self._sink is None:
+            return
+
+        ntests = self._tests.ntests
+        if ntests > 0 and (force or ntests >= self._sink.flush_every):
+            self._sink.write(self._result(self._tests)._tables())
+            self._tests = self._new_buffer()
+
+        if force:
+            self._sink.close()
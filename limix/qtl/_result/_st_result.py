@@ -2,21 +2,30 @@ from limix._cache import cache
 from limix.stats import lrt_pvalues
 
 from limix._display import AlignedText, draw_title
+from .._sink import dataframes
+from ._buffer import stack_segments
 from ._draw import draw_alt_hyp_table, draw_lrt_table, draw_model
 
 
 class STScanResult:
-    def __init__(self, tests, trait, covariates, candidates, h0):
+    def __init__(
+        self, tests, trait, covariates, candidates, h0, sink=None, max_stats=None
+    ):
         self._tests = tests
         self._trait = trait
         self._covariates = covariates
         self._candidates = candidates
         self._h0 = h0
+        self._sink = sink
+        self._max_stats = max_stats
 
     @property
     def stats(self):
         """
         Statistics.
+
+        The natural logarithms of the p-values are given in the ``logpv20`` column,
+        which keeps the strongest associations apart when their p-values underflow.
         """
         return self._dataframes["stats"].set_index("test")
 
@@ -27,6 +36,19 @@ class STScanResult:
         """
         return self._dataframes["effsizes"]
 
+    @property
+    def permutation(self):
+        """
+        Genome-wide significance from permuted traits.
+
+        It is ``None`` unless permutations have been requested.
+        """
+        from .._permutation import PermutationResult
+
+        if self._max_stats is None:
+            return None
+        return PermutationResult(self._max_stats, self.stats)
+
     @property
     def h0(self):
         """
@@ -51,29 +73,40 @@ class STScanResult:
 
     @property
     def _h2_dataframe(self):
+        from numpy import arange, full, repeat, tile
         from pandas import DataFrame
 
-        covariates = list(self._covariates)
-
-        h2 = []
-        for i, test in enumerate(self._tests):
-            candidates = list(self._candidates[test.idx])
-
-            effsizes = test.h2.covariate_effsizes
-            effsizes_se = test.h2.covariate_effsizes_se
-            for l, c in enumerate(covariates):
-                eff = effsizes[l]
-                eff_se = effsizes_se[l]
-                v = [i, self._trait, "covariate", str(c), eff, eff_se]
-                h2.append(v)
-
-            effsizes = test.h2.candidate_effsizes
-            effsizes_se = test.h2.candidate_effsizes_se
-            for l, c in enumerate(candidates):
-                eff = effsizes[l]
-                eff_se = effsizes_se[l]
-                v = [i, self._trait, "candidate", str(c), eff, eff_se]
-                h2.append(v)
+        tests = self._tests
+        h2 = tests.hypothesis("h2")
+        ntests = tests.ntests
+        sizes = tests.sizes
+        covariates = self._covariates
+        candidates = self._candidates[tests.idx]
+        ncovariates = len(covariates)
+        ncandidates = len(candidates)
+
+        test = arange(ntests)
+        lengths = [full(ntests, ncovariates), sizes]
+        values = {
+            "test": [repeat(test, ncovariates), repeat(test, sizes)],
+            "trait": [
+                full(ntests * ncovariates, self._trait, object),
+                full(ncandidates, self._trait, object),
+            ],
+            "effect_type": [
+                full(ntests * ncovariates, "covariate", object),
+                full(ncandidates, "candidate", object),
+            ],
+            "effect_name": [tile(covariates, ntests), candidates],
+            "effsize": [
+                h2["covariate_effsizes"].ravel(),
+                h2["candidate_effsizes"][:, 0],
+            ],
+            "effsize_se": [
+                h2["covariate_effsizes_se"].ravel(),
+                h2["candidate_effsizes_se"][:, 0],
+            ],
+        }
 
         columns = [
             "test",
@@ -83,31 +116,42 @@ class STScanResult:
             "effsize",
             "effsize_se",
         ]
-        return DataFrame(h2, columns=columns)
+        return DataFrame(stack_segments(lengths, values), columns=columns)
 
     @property
     def _stats_dataframe(self):
+        from numpy import arange, full
         from pandas import DataFrame
 
-        stats = []
-        for i, test in enumerate(self._tests):
-            dof20 = test.h2.candidate_effsizes.size
-            stats.append([i, self._h0.lml, test.h2.lml, dof20, test.h2.scale])
+        tests = self._tests
+        h2 = tests.hypothesis("h2")
+        ntests = tests.ntests
+
+        stats = {
+            "test": arange(ntests),
+            "lml0": full(ntests, self._h0.lml),
+            "lml2": h2["lml"],
+            "dof20": tests.sizes * h2["candidate_effsizes"].shape[1],
+            "scale2": h2["scale"],
+        }
 
         columns = ["test", "lml0", "lml2", "dof20", "scale2"]
         stats = DataFrame(stats, columns=columns)
 
         stats["pv20"] = lrt_pvalues(stats["lml0"], stats["lml2"], stats["dof20"])
+        stats["logpv20"] = lrt_pvalues(
+            stats["lml0"], stats["lml2"], stats["dof20"], log=True
+        )
 
         return stats
 
+    def _tables(self):
+        return {"stats": self._stats_dataframe, "effsizes_h2": self._h2_dataframe}
+
     @property
     @cache
     def _dataframes(self):
-        h2 = self._h2_dataframe
-        stats = self._stats_dataframe
-
-        return {"stats": stats, "effsizes": {"h2": h2}}
+        return dataframes(self._tables, self._sink)
 
     def _covariance_expr(self):
         from numpy import isnan
@@ -11,5 +11,3 @@ VariantResult = namedtuple(
         "scale",
     ],
 )
-
-Result = namedtuple("Result", ["idx", "h1", "h2"])
@@ -0,0 +1,101 @@
+class NullRotation:
+    """
+    Null-model terms rotated by the eigenvectors of the sample covariance.
+
+    The covariance v₀·Q₀S₀Q₀ᵀ + v₁·I of a fitted linear mixed model is diagonalised
+    by Q = [Q₀, Q₁], with eigenvalues D₀ = v₀·S₀ + v₁ and D₁ = v₁. The products of
+    the rotated traits and covariates with D⁻¹ are computed once, so that candidates
+    only need to be rotated themselves. Eigenspaces having a null eigenvalue are
+    left out, as :class:`glimix_core.lmm.FastScanner` does.
+
+    Traits sharing the covariance share every covariate term: those have a leading
+    axis of length one, which broadcasts against the per-trait terms.
+
+    Parameters
+    ----------
+    Y : n×t array_like
+        Traits, or a single trait.
+    X : n×c array_like
+        Covariates.
+    QS : tuple
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of the kinship matrix, or
+        ``None`` for no kinship.
+    v0 : float, array_like
+        Kinship variance, shared by the traits or one per trait. It is ignored if
+        ``QS`` is ``None``.
+    v1 : float, array_like
+        Residual variance, shared by the traits or one per trait.
+    """
+
+    def __init__(self, Y, X, QS, v0, v1):
+        from numpy import asarray, atleast_1d, clip, einsum, inf, log, ones, pi
+        from numpy_sugar import epsilon
+
+        Y = asarray(Y, float)
+        if Y.ndim == 1:
+            Y = Y[:, None]
+        X = asarray(X, float)
+        v0 = atleast_1d(asarray(v0, float))[:, None]
+        v1 = atleast_1d(asarray(v1, float))[:, None]
+        n = Y.shape[0]
+
+        if QS is None:
+            self._Q = [None]
+            D = [v1 * ones(n)]
+        else:
+            self._Q = [Q for Q in QS[0] if Q.size > 0]
+            S = QS[1]
+            D = []
+            if S.size > 0:
+                D.append(v0 * S + v1)
+            if S.size < n:
+                D.append(v1 * ones(n - S.size))
+
+        self.nsamples = n
+        self.ncovariates = X.shape[1]
+        self.static_lml = -n * log(2 * pi) - n
+        self.static_lml -= sum(log(clip(d, epsilon.small, inf)).sum(1) for d in D)
+        self.Di = [(d.min(1)[:, None] > 0) / clip(d, epsilon.tiny, inf) for d in D]
+
+        self.XTQ = self.rotate(X)
+        yTQ = self.rotate(Y)
+        self.yTQDi = [yQ * Di for yQ, Di in zip(yTQ, self.Di)]
+        XQDi = zip(self.XTQ, self.Di)
+        self.XTQDi = [XQ[None, :, :] * Di[:, None, :] for XQ, Di in XQDi]
+
+        self.XTBX = sum(XD @ XQ.T for XD, XQ in zip(self.XTQDi, self.XTQ))
+        self.yTBX = sum(yD @ XQ.T for yD, XQ in zip(self.yTQDi, self.XTQ))
+        yQDi = zip(yTQ, self.yTQDi)
+        self.yTBy = sum(einsum("tn,tn->t", yQ, yD) for yQ, yD in yQDi)
+
+    def rotate(self, M):
+        """
+        Rotated columns of ``M``, one array of rows ``MᵀQᵢ`` per eigenspace.
+
+        Parameters
+        ----------
+        M : n×k array_like
+            Matrix to be rotated.
+
+        Returns
+        -------
+        list
+            Arrays of shape (k, rᵢ).
+        """
+        return [M.T if Q is None else M.T @ Q for Q in self._Q]
+
+    def unrotate(self, MTQ):
+        """
+        Inverse of :meth:`rotate`.
+
+        Parameters
+        ----------
+        MTQ : list
+            Arrays of shape (k, rᵢ), one per eigenspace.
+
+        Returns
+        -------
+        ndarray
+            Array of shape (n, k).
+        """
+        return sum(M.T if Q is None else Q @ M.T for Q, M in zip(self._Q, MTQ))
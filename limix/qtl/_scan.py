@@ -2,14 +2,37 @@ import sys
 
 from limix._display import session_line
 
+from .._bits import fingerprint
 from .._data import asarray as _asarray, conform_dataset, normalize_likelihood
 from .._display import session_block
+from .._qs import economic_qs, economic_qs_linear
 from ._assert import assert_finite
+from ._blocks import get_blocks
+from ._checkpoint import Checkpoint
+from ._kron_scan import KronBlockScanner
+from ._parallel import process_pool
 from ._result import MTScanResultFactory, STScanResultFactory
 
 
 def scan(
-    G, Y, lik="normal", K=None, M=None, idx=None, A=None, A0=None, A1=None, verbose=True
+    G,
+    Y,
+    lik="normal",
+    K=None,
+    M=None,
+    idx=None,
+    A=None,
+    A0=None,
+    A1=None,
+    QS=None,
+    Gk=None,
+    block_size=None,
+    n_jobs=None,
+    sink=None,
+    checkpoint=None,
+    permutations=None,
+    seed=None,
+    verbose=True,
 ):
     """
     Multi-trait association and interaction testing via linear mixed models.
@@ -85,6 +108,50 @@ def scan(
     A1 : p×p₁ array_like, optional
         Matrix A₁, possibility a non-symmetric one. If ``None``, it defines an identity
         matrix, p₀=p. Defaults to ``None``.
+    QS : tuple, optional
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of ``K``, as returned by
+        :func:`numpy_sugar.linalg.economic_qs`. Passing it avoids decomposing ``K``
+        again when the same kinship matrix is used for several scans, in which case
+        ``K`` itself can be omitted. The rows of ``Q0`` and ``Q1`` must follow the
+        sample order of ``Y``. Defaults to ``None``.
+    Gk : n×q array_like, optional
+        Kinship factor, for ``K = Gk Gkᵀ / q``. When q is smaller than the number of
+        samples, it is decomposed via a singular value decomposition at O(n²q) cost
+        instead of the O(n³) cost of decomposing ``K``, which can then be omitted.
+        The rows of ``Gk`` must follow the sample order of ``Y``.
+        Defaults to ``None``.
+    block_size : int, optional
+        Number of candidates read from ``G`` at once. Only the current block of
+        candidates is held in memory, which allows for scanning dask-backed genotype
+        matrices larger than the available memory. If ``None``, the column chunks of a
+        dask-backed ``G`` are used; otherwise the block size is chosen from
+        ``limix.config["qtl.block_bytes"]``. Defaults to ``None``.
+    n_jobs : int, optional
+        Number of worker processes used to test the candidates. The null model is
+        fitted only once and its state is shared with the workers, which receive
+        disjoint sets of candidates. ``-1`` uses every available core. If ``None``,
+        the candidates are tested in the calling process. Defaults to ``None``.
+    sink : :class:`limix.qtl.ResultSink`, optional
+        Destination to which the tests are written while the scan is running, every
+        ``sink.flush_every`` tests. Only that many tests are kept in memory, and the
+        returned result reads its statistics and effect sizes back from the sink. If
+        ``None``, every test is kept in memory. Defaults to ``None``.
+    checkpoint : str, optional
+        Directory in which the eigendecomposition of ``K``, the fitted null model,
+        and the tests of every finished block of candidates are recorded. Calling
+        ``scan`` again with the same inputs and directory reuses them instead of
+        recomputing, which allows for resuming an interrupted scan. Defaults to
+        ``None``.
+    permutations : int, optional
+        Number of permuted traits used to assess genome-wide significance, for a
+        single trait with the normal likelihood. The null model is fitted once, and
+        its whitened residuals are permuted to generate traits sharing its
+        covariance. Each block of candidates is tested against all the permuted
+        traits at once, while it is read for the scan itself, and the maximum
+        statistic of each permuted trait is kept in the ``permutation`` attribute of
+        the result. Defaults to ``None``.
+    seed : int, optional
+        Seed of the permutations. Defaults to ``None``.
     verbose : bool, optional
         ``True`` to display progress and summary; ``False`` otherwise.
 
@@ -174,11 +241,11 @@ def scan(
         >>> result = scan(candidates, y, 'poisson', K, M=M, verbose=False)
         >>>
         >>> result.stats  # doctest: +FLOAT_CMP
-                   lml0       lml2  dof20    scale2      pv20
+                   lml0       lml2  dof20    scale2      pv20   logpv20
         test
-        0    -48.720890 -48.536860      1  0.943532  0.544063
-        1    -48.720890 -47.908341      1  0.904814  0.202382
-        2    -48.720890 -48.534754      1  0.943400  0.541768
+        0    -48.720890 -48.536860      1  0.943532  0.544063 -0.608690
+        1    -48.720890 -47.908341      1  0.904814  0.202382 -1.597596
+        2    -48.720890 -48.534754      1  0.943400  0.541768 -0.612917
         >>> print(result)  # doctest: +FLOAT_CMP
         Hypothesis 0
         ------------
@@ -277,14 +344,20 @@ def scan(
     It will raise a ``ValueError`` exception if non-finite values are passed. Please,
     refer to the :func:`limix.qc.mean_impute` function for missing value imputation.
     """
-    from numpy_sugar.linalg import economic_qs
-
     lik = normalize_likelihood(lik)
 
     if A is None:
         if A0 is not None or A1 is not None:
             raise ValueError("You cannot define `A0` or `A1` without defining `A`.")
 
+    if permutations is not None:
+        if lik[0] != "normal" or A is not None or idx is not None:
+            msg = "Permutations are only supported for single-candidate tests of a"
+            msg += " single trait under the normal likelihood."
+            raise ValueError(msg)
+        if checkpoint is not None:
+            raise ValueError("Permutations cannot be resumed from a checkpoint.")
+
     with session_block("QTL analysis", disable=not verbose):
 
         with session_line("Normalising input... ", disable=not verbose):
@@ -297,20 +370,53 @@ def scan(
 
         assert_finite(Y, M, K)
 
-        if K is not None:
-            QS = economic_qs(K)
-        else:
-            QS = None
+        if checkpoint is not None:
+            key = _fingerprint(lik, Y, M, G, K, QS, Gk, idx, A, A0, A1)
+            checkpoint = Checkpoint(checkpoint, key)
+
+        if QS is None and Gk is not None:
+            QS = _resume(checkpoint, "QS", economic_qs_linear, Gk)
+        elif QS is None and K is not None:
+            QS = _resume(checkpoint, "QS", economic_qs, K)
 
         if verbose:
             print()
-            _print_input_info(idx, lik, Y, M, G, K)
+            _print_input_info(idx, lik, Y, M, G, QS)
             print()
 
         if A is None:
-            r = _single_trait_scan(idx, lik, Y, M, G, QS, verbose)
+            r = _single_trait_scan(
+                idx,
+                lik,
+                Y,
+                M,
+                G,
+                QS,
+                block_size,
+                n_jobs,
+                sink,
+                checkpoint,
+                permutations,
+                seed,
+                verbose,
+            )
         else:
-            r = _multi_trait_scan(idx, lik, Y, M, G, QS, A, A0, A1, verbose)
+            r = _multi_trait_scan(
+                idx,
+                lik,
+                Y,
+                M,
+                G,
+                QS,
+                A,
+                A0,
+                A1,
+                block_size,
+                n_jobs,
+                sink,
+                checkpoint,
+                verbose,
+            )
 
         r = r.create()
         if verbose:
@@ -320,7 +426,7 @@ def scan(
         return r
 
 
-def _print_input_info(idx, lik, Y, M, G, K):
+def _print_input_info(idx, lik, Y, M, G, QS):
     from limix._display import draw_list
     from limix._display import AlignedText, draw_title
 
@@ -344,7 +450,7 @@ def _print_input_info(idx, lik, Y, M, G, K):
         ncandidates = len(idx)
     aligned.add_item("N. of candidates", ncandidates)
 
-    if K is None:
+    if QS is None:
         kinship_presence = "absent"
     else:
         kinship_presence = "present"
@@ -354,15 +460,33 @@ def _print_input_info(idx, lik, Y, M, G, K):
     print(aligned.draw())
 
 
-def _single_trait_scan(idx, lik, Y, M, G, QS, verbose):
+def _single_trait_scan(
+    idx,
+    lik,
+    Y,
+    M,
+    G,
+    QS,
+    block_size,
+    n_jobs,
+    sink,
+    checkpoint,
+    permutations,
+    seed,
+    verbose,
+):
     from numpy import asarray
+    from numpy.random import RandomState
     from tqdm import tqdm
 
+    from ._permutation import PermutationScanner
+
+    y = Y.values.ravel()
     if lik[0] == "normal":
-        scanner, v0, v1 = _st_lmm(Y.values.ravel(), M.values, QS, verbose)
+        null = _resume(checkpoint, "null", _st_lmm, y, M.values, QS, verbose)
     else:
-        scanner, v0, v1 = _st_glmm(Y.values.ravel(), lik, M.values, QS, verbose)
-    pass
+        null = _resume(checkpoint, "null", _st_glmm, y, lik, M.values, QS, verbose)
+    scanner, v0, v1 = null
 
     r = STScanResultFactory(
         lik[0],
@@ -374,22 +498,64 @@ def _single_trait_scan(idx, lik, Y, M, G, QS, verbose):
         scanner.null_beta_se,
         v0,
         v1,
+        sink,
     )
 
-    if idx is None:
-        r1 = scanner.fast_scan(G, verbose)
-        for i in tqdm(range(G.shape[1]), "Results", disable=not verbose):
-            h2 = _normalise_scan_names({k: v[i] for k, v in r1.items()})
-            r.add_test(i, h2)
-    else:
-        for i in tqdm(idx, "Results", disable=not verbose):
-            i = _2d_sel(i)
-            h2 = _normalise_scan_names(scanner.scan(asarray(G[:, i], float)))
-            r.add_test(i, h2)
+    perm = None
+    if permutations is not None:
+        random = RandomState(seed)
+        perm = PermutationScanner(y, M.values, QS, v0, v1, permutations, random)
+
+    def _block(start, stop):
+        g = asarray(G[:, start:stop], float)
+        if perm is not None:
+            perm.add_block(g)
+        gs = [g[:, i:j] for i, j in pool.split(stop - start)]
+        tests = []
+        for r1 in pool.map(_st_fast_scan, gs, scanner):
+            for i in range(len(r1["lml"])):
+                h2 = _normalise_scan_names({k: v[i] for k, v in r1.items()})
+                tests.append((start + len(tests), h2))
+        return tests
+
+    def _round(tests):
+        gs = [asarray(G[:, i], float) for i in tests]
+        gs = [gs[i:j] for i, j in pool.split(len(gs))]
+        h2s = [h2 for h2s in pool.map(_st_scan, gs, scanner) for h2 in h2s]
+        return [(i, _normalise_scan_names(h2)) for i, h2 in zip(tests, h2s)]
+
+    with process_pool(n_jobs) as pool:
+        if idx is None:
+            blocks = get_blocks(G, block_size)
+            for start, stop in tqdm(blocks, "Results", disable=not verbose):
+                name = f"block_{start}_{stop}"
+                for test in _resume(checkpoint, name, _block, start, stop):
+                    r.add_test(*test)
+        else:
+            start = 0
+            for tests in tqdm(pool.rounds(idx), "Results", disable=not verbose):
+                tests = [_2d_sel(i) for i in tests]
+                name = f"tests_{start}_{start + len(tests)}"
+                for test in _resume(checkpoint, name, _round, tests):
+                    r.add_test(*test)
+                start += len(tests)
+
+    if perm is not None:
+        r.set_permutation(perm.max_stats)
     return r
 
 
-def _multi_trait_scan(idx, lik, Y, M, G, QS, A, A0, A1, verbose):
+def _st_fast_scan(scanner, g):
+    return scanner.fast_scan(g, False)
+
+
+def _st_scan(scanner, gs):
+    return [scanner.scan(g) for g in gs]
+
+
+def _multi_trait_scan(
+    idx, lik, Y, M, G, QS, A, A0, A1, block_size, n_jobs, sink, checkpoint, verbose
+):
     from xarray import concat, DataArray
     from numpy import eye, asarray, empty
     from tqdm import tqdm
@@ -415,7 +581,7 @@ def _multi_trait_scan(idx, lik, Y, M, G, QS, A, A0, A1, verbose):
     A01 = concat([A0, A1], dim="env")
 
     if lik[0] == "normal":
-        scanner, C0, C1 = _mt_lmm(Y, A, M, QS, verbose)
+        scanner, C0, C1 = _resume(checkpoint, "null", _mt_lmm, Y, A, M, QS, verbose)
     else:
         msg = "Non-normal likelihood inference has not been implemented for"
         msg += " multiple traits yet."
@@ -433,25 +599,68 @@ def _multi_trait_scan(idx, lik, Y, M, G, QS, A, A0, A1, verbose):
         scanner.null_beta_se,
         C0,
         C1,
+        sink,
     )
 
-    if idx is None:
-        idx = range(G.shape[1])
+    def _scan(func, tests, gs, scanner):
+        hs = [h for hs in pool.map(func, gs, scanner, A0, A01) for h in hs]
+        return [(i, h1, h2) for i, (h1, h2) in zip(tests, hs)]
+
+    def _block(start, stop):
+        g = asarray(G[:, start:stop], float)
+        gs = [g[:, i:j] for i, j in pool.split(stop - start)]
+        return _scan(_mt_block_scan, range(start, stop), gs, block_scanner)
+
+    def _round(tests):
+        gs = [asarray(G[:, i], float) for i in tests]
+        gs = [gs[i:j] for i, j in pool.split(len(gs))]
+        return _scan(_mt_scan, tests, gs, scanner)
+
+    with process_pool(n_jobs) as pool:
+        if idx is None:
+            block_scanner = KronBlockScanner(Y.values, A, M.values, QS, C0, C1)
+            blocks = get_blocks(G, block_size)
+            for start, stop in tqdm(blocks, "Results", disable=not verbose):
+                name = f"block_{start}_{stop}"
+                for test in _resume(checkpoint, name, _block, start, stop):
+                    r.add_test(*test)
+        else:
+            start = 0
+            for tests in tqdm(pool.rounds(idx), "Results", disable=not verbose):
+                tests = [_2d_sel(i) for i in tests]
+                name = f"tests_{start}_{start + len(tests)}"
+                for test in _resume(checkpoint, name, _round, tests):
+                    r.add_test(*test)
+                start += len(tests)
+
+    return r
+
+
+def _mt_block_scan(scanner, A0, A01, g):
+    r1 = None if A0.shape[1] == 0 else scanner.scan(A0, g)
+    r2 = scanner.scan(A01, g)
 
-    for i in tqdm(idx, "Results", disable=not verbose):
+    hs = []
+    for i in range(g.shape[1]):
+        if r1 is None:
+            h1 = None
+        else:
+            h1 = _normalise_scan_names({k: v[i] for k, v in r1.items()})
+        h2 = _normalise_scan_names({k: v[i] for k, v in r2.items()})
+        hs.append((h1, h2))
+    return hs
 
-        i = _2d_sel(i)
-        g = asarray(G[:, i], float)
 
+def _mt_scan(scanner, A0, A01, gs):
+    hs = []
+    for g in gs:
         if A0.shape[1] == 0:
             h1 = None
         else:
             h1 = _normalise_scan_names(scanner.scan(A0, g))
-
         h2 = _normalise_scan_names(scanner.scan(A01, g))
-        r.add_test(i, h1, h2)
-
-    return r
+        hs.append((h1, h2))
+    return hs
 
 
 def _st_lmm(Y, M, QS, verbose):
@@ -517,6 +726,32 @@ def _mt_lmm(Y, A, M, QS, verbose):
     return lmm.get_fast_scanner(), C0, C1
 
 
+def _resume(checkpoint, name, func, *args):
+    if checkpoint is None:
+        return func(*args)
+
+    r = checkpoint.load(name)
+    if r is None:
+        r = func(*args)
+        checkpoint.save(name, r)
+    return r
+
+
+def _fingerprint(lik, Y, M, G, K, QS, Gk, idx, A, A0, A1):
+    from numpy import asarray
+
+    if QS is not None:
+        QS = [QS[0][0], QS[1]]
+    else:
+        QS = [None]
+
+    arrays = [asarray(x, float) for x in lik[1:] + (Y, M)]
+    arrays += [G.shape, asarray(G.candidate.values, str)]
+    arrays += [None if x is None else asarray(x, float) for x in [K, A, A0, A1, Gk]]
+    arrays += [None if x is None else asarray(x, float) for x in QS]
+    return fingerprint(lik[0], repr(idx), *arrays)
+
+
 def _2d_sel(idx):
     from collections.abc import Iterable
 
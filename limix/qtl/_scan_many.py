@@ -0,0 +1,321 @@
+from .._data import conform_dataset
+from .._display import session_block, session_line
+from .._qs import economic_qs, economic_qs_linear
+from ._assert import assert_finite
+from ._blocks import get_blocks
+from ._result import STScanResultFactory
+from ._rotation import NullRotation
+
+
+def scan_many(
+    G, Y, K=None, M=None, QS=None, Gk=None, block_size=None, sinks=None, verbose=True
+):
+    """
+    Single-trait association testing of many phenotypes via linear mixed models.
+
+    Each column of ``Y`` is an independent, normally distributed trait tested against
+    every candidate as in :func:`limix.qtl.scan`. The dataset is conformed and ``K``
+    is decomposed only once for all the traits, and each block of candidates is read
+    and rotated only once and then tested against all the traits at the same time
+    via matrix products.
+
+    Parameters
+    ----------
+    G : n×m array_like
+        Genetic candidates.
+    Y : n×p array_like
+        Rows are samples and columns are phenotypes.
+    K : n×n array_like, optional
+        Sample covariance, often the so-called kinship matrix.
+    M : n×c array_like, optional
+        Covariates matrix.
+    QS : tuple, optional
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of ``K``, as returned by
+        :func:`numpy_sugar.linalg.economic_qs`, in which case ``K`` can be omitted.
+        The rows of ``Q0`` and ``Q1`` must follow the sample order of ``Y``. Defaults
+        to ``None``.
+    Gk : n×q array_like, optional
+        Kinship factor, for ``K = Gk Gkᵀ / q``, decomposed as in
+        :func:`limix.qtl.scan`. Defaults to ``None``.
+    block_size : int, optional
+        Number of candidates read from ``G`` at once. If ``None``, the column chunks
+        of a dask-backed ``G`` are used; otherwise the block size is chosen from
+        ``limix.config["qtl.block_bytes"]``. Defaults to ``None``.
+    sinks : list, optional
+        One :class:`limix.qtl.ResultSink` per trait, to which its tests are written
+        while the scan is running. If ``None``, every test is kept in memory.
+        Defaults to ``None``.
+    verbose : bool, optional
+        ``True`` to display progress and summary; ``False`` otherwise.
+
+    Returns
+    -------
+    list
+        One :class:`limix.qtl._result.STScanResult` per trait.
+
+    Notes
+    -----
+    It will raise a ``ValueError`` exception if non-finite values are passed. Please,
+    refer to the :func:`limix.qc.mean_impute` function for missing value imputation.
+    """
+    from numpy import asarray
+    from tqdm import tqdm
+
+    from ._scan import _print_input_info, _st_lmm
+
+    with session_block("QTL analysis", disable=not verbose):
+
+        with session_line("Normalising input... ", disable=not verbose):
+            data = conform_dataset(Y, M, G=G, K=K)
+
+        Y = data["y"]
+        M = data["M"]
+        G = data["G"]
+        K = data["K"]
+
+        assert_finite(Y, M, K)
+
+        ntraits = Y.shape[1]
+        if sinks is None:
+            sinks = [None] * ntraits
+        if len(sinks) != ntraits:
+            raise ValueError("There must be one sink per trait.")
+
+        if QS is None and Gk is not None:
+            QS = economic_qs_linear(Gk)
+        elif QS is None and K is not None:
+            QS = economic_qs(K)
+
+        if verbose:
+            print()
+            _print_input_info(None, ("normal",), Y, M, G, QS)
+            print()
+
+        v0s = []
+        v1s = []
+        factories = []
+        traits = Y.trait.values
+        for i in tqdm(range(ntraits), "Null models", disable=not verbose):
+            scanner, v0, v1 = _st_lmm(Y.values[:, i], M.values, QS, False)
+            v0s.append(v0)
+            v1s.append(v1)
+            r = STScanResultFactory(
+                "normal",
+                traits[i],
+                M.covariate,
+                G.candidate,
+                scanner.null_lml(),
+                scanner.null_beta,
+                scanner.null_beta_se,
+                v0,
+                v1,
+                sinks[i],
+            )
+            factories.append(r)
+
+        scanner = ManyTraitScanner(Y.values, M.values, QS, v0s, v1s)
+
+        blocks = get_blocks(G, block_size)
+        for start, stop in tqdm(blocks, "Results", disable=not verbose):
+            g = asarray(G[:, start:stop], float)
+            for first, h2 in scanner.scan(g):
+                cand_idx = range(start + first, start + first + len(h2[0]["lml"]))
+                for r, h in zip(factories, h2):
+                    r.add_tests(cand_idx, h)
+
+        return [r.create() for r in factories]
+
+
+class ManyTraitScanner:
+    """
+    Single-candidate scanner for many traits sharing samples, covariates, and kinship.
+
+    A block of candidates is rotated by the eigenvectors of the kinship matrix once
+    for all the traits, and the per-trait normal equations, whose covariate part
+    does not depend on the candidate, are solved in closed form via the Schur
+    complement of the candidate. Terms that depend only on the covariance are
+    computed once for traits sharing their variances, such as permuted traits.
+
+    Parameters
+    ----------
+    Y : n×t array_like
+        Traits to be tested.
+    M : n×c array_like
+        Covariates.
+    QS : tuple
+        Economic eigendecomposition ``((Q0, Q1), S0)`` of the kinship matrix, or
+        ``None`` for no kinship.
+    v0 : float, array_like
+        Fitted kinship variance of the null model, shared by the traits or one per
+        trait.
+    v1 : float, array_like
+        Fitted residual variance of the null model, shared by the traits or one per
+        trait.
+    """
+
+    def __init__(self, Y, M, QS, v0, v1):
+        from numpy.linalg import pinv
+
+        self._rot = NullRotation(Y, M, QS, v0, v1)
+        self._XTBXi = pinv(self._rot.XTBX)
+
+    def null_lml(self):
+        """
+        Log of the marginal likelihood of each trait under the null hypothesis.
+
+        Returns
+        -------
+        ndarray
+            One log of the marginal likelihood per trait.
+        """
+        from numpy import clip, einsum, inf, log
+        from numpy_sugar import epsilon
+
+        rot = self._rot
+        xr = einsum("tc,tcd,td->t", rot.yTBX, self._XTBXi, rot.yTBX)
+        scale = clip((rot.yTBy - xr) / rot.nsamples, epsilon.small, inf)
+        return (rot.static_lml - rot.nsamples * log(scale)) / 2
+
+    def scan(self, G):
+        """
+        Test each candidate of a block against every trait.
+
+        Parameters
+        ----------
+        G : n×k array_like
+            Block of candidates, each one tested on its own.
+
+        Returns
+        -------
+        generator
+            Pairs of the offset of a chunk of candidates within the block and a list
+            with, for each trait, its ``lml``, ``scale``, ``covariate_effsizes``,
+            ``covariate_effsizes_se``, ``candidate_effsizes``, and
+            ``candidate_effsizes_se`` arrays over the chunk.
+        """
+        for start, g in self._chunks(G):
+            yield start, self._scan_chunk(g)
+
+    def lml(self, G):
+        """
+        Log of the marginal likelihood of each trait for each candidate of a block.
+
+        Only the terms the likelihood depends on are computed, which spares the
+        per-trait effect sizes and their standard errors.
+
+        Parameters
+        ----------
+        G : n×k array_like
+            Block of candidates, each one tested on its own.
+
+        Returns
+        -------
+        ndarray
+            Array of shape (t, k).
+        """
+        from numpy import concatenate, empty
+
+        lmls = [self._fit_chunk(g)["lml"] for _, g in self._chunks(G)]
+        if len(lmls) == 0:
+            return empty((len(self._rot.yTBy), 0))
+        return concatenate(lmls, axis=1)
+
+    def _chunks(self, G):
+        from numpy import asarray
+        from numpy_sugar import is_all_finite
+
+        from .._config import config
+
+        G = asarray(G, float)
+        if not is_all_finite(G):
+            raise ValueError("One or more variants have non-finite value.")
+
+        # Per-trait and per-candidate arrays are the largest ones, so the block is
+        # split to keep them within the configured block size.
+        ntraits = len(self._rot.yTBy)
+        c = self._rot.ncovariates
+        size = config["qtl.block_bytes"] // (8 * ntraits * (c + 1) * (c + 2))
+        size = max(size, 1)
+
+        for start in range(0, G.shape[1], size):
+            yield start, G[:, start : start + size]
+
+    def _fit_chunk(self, G):
+        from numpy import clip, einsum, inf, log
+        from numpy_sugar import epsilon
+
+        rot = self._rot
+        k = G.shape[1]
+        c = rot.ncovariates
+
+        # Only yᵀBM depends on the trait; the other terms are shared by the traits
+        # having the same variances.
+        yTBM = 0
+        XTBM = 0
+        MTBM = 0
+        for MTQ, Di, yD, XD in zip(rot.rotate(G), rot.Di, rot.yTQDi, rot.XTQDi):
+            nx = XD.shape[0]
+            yTBM = yTBM + yD @ MTQ.T
+            XTBM = XTBM + (XD.reshape(nx * c, -1) @ MTQ.T).reshape(nx, c, k)
+            MTBM = MTBM + Di @ (MTQ * MTQ).T
+
+        # Schur complement of the candidate in [[XᵀBX, XᵀBM], [MᵀBX, MᵀBM]].
+        AiB = self._XTBXi @ XTBM
+        schur = MTBM - einsum("tck,tck->tk", XTBM, AiB)
+        valid = schur > epsilon.small
+        schur_i = 1 / clip(schur, epsilon.small, inf)
+        schur_i[~valid] = 0
+
+        Aib = einsum("tcd,td->tc", self._XTBXi, rot.yTBX)
+        r = yTBM - einsum("tck,tc->tk", XTBM, Aib)
+        alpha = r * schur_i
+
+        xr = einsum("tc,tc->t", Aib, rot.yTBX)[:, None] + r * alpha
+        bstar = clip(rot.yTBy[:, None] - xr, epsilon.tiny, inf)
+
+        n = rot.nsamples
+        scale = bstar / n
+        lml = (rot.static_lml[:, None] - n * log(clip(scale, epsilon.small, inf))) / 2
+
+        return {
+            "lml": lml,
+            "scale": scale,
+            "alpha": alpha,
+            "Aib": Aib,
+            "AiB": AiB,
+            "schur_i": schur_i,
+        }
+
+    def _scan_chunk(self, G):
+        from numpy import clip, einsum, inf, ones_like, sqrt
+        from numpy_sugar import epsilon
+
+        fit = self._fit_chunk(G)
+        scale = fit["scale"]
+        alpha = fit["alpha"]
+        AiB = fit["AiB"]
+        schur_i = fit["schur_i"]
+        beta = fit["Aib"][:, :, None] - AiB * alpha[:, None, :]
+
+        # FastScanner.fast_scan, used by scan, multiplies the variances by the scale
+        # only when there is a single covariate.
+        c = self._rot.ncovariates
+        var_scale = scale if c == 1 else ones_like(scale)
+        Aii = einsum("tcc->tc", self._XTBXi)
+        beta_var = Aii[:, :, None] + AiB * AiB * schur_i[:, None, :]
+        beta_se = sqrt(clip(var_scale[:, None, :] * beta_var, epsilon.tiny, inf))
+        alpha_se = sqrt(clip(var_scale * schur_i, epsilon.tiny, inf))
+
+        h2 = []
+        for t in range(len(scale)):
+            h2.append(
+                {
+                    "lml": fit["lml"][t],
+                    "scale": scale[t],
+                    "covariate_effsizes": beta[t].T,
+                    "covariate_effsizes_se": beta_se[t].T,
+                    "candidate_effsizes": alpha[t],
+                    "candidate_effsizes_se": alpha_se[t],
+                }
+            )
+        return h2
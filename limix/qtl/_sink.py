@@ -0,0 +1,291 @@
+class ResultSink:
+    """
+    Destination for scan results written while the scan is running.
+
+    The scan hands its tests over to the sink every ``flush_every`` tests, so that
+    only that many tests are kept in memory and an interrupted scan leaves the tests
+    done so far on disk. Each flush appends rows to the ``"stats"`` table and to one
+    ``"effsizes_<hypothesis>"`` table per alternative hypothesis, with the ``test``
+    column numbered across the whole scan.
+
+    Subclasses implement :meth:`_append` and :meth:`_read`.
+
+    Parameters
+    ----------
+    flush_every : int, optional
+        Number of tests kept in memory before being written. Defaults to ``10000``.
+    """
+
+    def __init__(self, flush_every=10000):
+        self._flush_every = max(int(flush_every), 1)
+        self._ntests = 0
+        self._tables = []
+
+    @property
+    def flush_every(self):
+        """
+        Number of tests kept in memory before being written.
+        """
+        return self._flush_every
+
+    @property
+    def tables(self):
+        """
+        Names of the tables written so far.
+        """
+        return list(self._tables)
+
+    def write(self, tables):
+        """
+        Append the tables of a group of tests.
+
+        Parameters
+        ----------
+        tables : dict
+            Maps table names to data frames. Their ``test`` columns start at zero and
+            are shifted by the number of tests previously written.
+        """
+        ntests = 0
+        for name, df in tables.items():
+            df = df.copy()
+            df["test"] += self._ntests
+            self._append(name, df)
+            if name not in self._tables:
+                self._tables.append(name)
+            if name == "stats":
+                ntests = df.shape[0]
+        self._ntests += ntests
+
+    def read(self, name):
+        """
+        Read a table back.
+
+        Parameters
+        ----------
+        name : str
+            Table name.
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Table rows.
+        """
+        return self._read(name)
+
+    def close(self):
+        """
+        Release resources held by the sink.
+        """
+        pass
+
+    def _append(self, name, df):
+        raise NotImplementedError
+
+    def _read(self, name):
+        raise NotImplementedError
+
+
+class CSVSink(ResultSink):
+    """
+    Write scan results to comma-separated values files.
+
+    Each table is written to ``<dirpath>/<name>.csv``.
+
+    Parameters
+    ----------
+    dirpath : str
+        Directory path. It is created if it does not exist.
+    flush_every : int, optional
+        Number of tests kept in memory before being written. Defaults to ``10000``.
+    """
+
+    def __init__(self, dirpath, flush_every=10000):
+        from os import makedirs
+
+        super().__init__(flush_every)
+        makedirs(dirpath, exist_ok=True)
+        self._dirpath = dirpath
+
+    def _filepath(self, name):
+        from os.path import join
+
+        return join(self._dirpath, name + ".csv")
+
+    def _append(self, name, df):
+        if name in self._tables:
+            df.to_csv(self._filepath(name), mode="a", header=False, index=False)
+        else:
+            df.to_csv(self._filepath(name), index=False)
+
+    def _read(self, name):
+        from pandas import read_csv
+
+        dtype = {c: str for c in ["trait", "effect_type", "effect_name", "env"]}
+        return read_csv(self._filepath(name), dtype=dtype)
+
+
+class HDF5Sink(ResultSink):
+    """
+    Write scan results to an HDF5 file.
+
+    Each table is stored as a group holding one resizable dataset per column, which
+    grows by one row group per flush.
+
+    Parameters
+    ----------
+    filepath : str
+        File path.
+    flush_every : int, optional
+        Number of tests kept in memory before being written. Defaults to ``10000``.
+    """
+
+    def __init__(self, filepath, flush_every=10000):
+        import h5py
+
+        super().__init__(flush_every)
+        self._filepath = filepath
+        with h5py.File(filepath, "w"):
+            pass
+
+    def _append(self, name, df):
+        import h5py
+        from numpy import asarray
+
+        with h5py.File(self._filepath, "a") as f:
+            if name not in f:
+                group = f.create_group(name)
+                group.attrs["columns"] = [c.encode() for c in df.columns]
+                for c in df.columns:
+                    kind = df[c].dtype.kind
+                    if kind in "biuf":
+                        dtype = df[c].dtype
+                    else:
+                        dtype = h5py.special_dtype(vlen=str)
+                    group.create_dataset(c, (0,), dtype, maxshape=(None,), chunks=True)
+
+            group = f[name]
+            for c in df.columns:
+                values = df[c].values
+                if values.dtype.kind not in "biuf":
+                    values = asarray(["" if v is None else str(v) for v in values])
+                    values = values.astype(object)
+                ds = group[c]
+                n = ds.shape[0]
+                ds.resize((n + len(values),))
+                ds[n:] = values
+
+    def _read(self, name):
+        import h5py
+        from pandas import DataFrame
+
+        with h5py.File(self._filepath, "r") as f:
+            group = f[name]
+            columns = [_decode(c) for c in group.attrs["columns"]]
+            data = {}
+            for c in columns:
+                v = group[c][()]
+                if v.dtype.kind not in "biuf":
+                    v = [_decode(i) for i in v]
+                    v = [None if i == "" else i for i in v]
+                data[c] = v
+        return DataFrame(data, columns=columns)
+
+
+class ParquetSink(ResultSink):
+    """
+    Write scan results to Apache Parquet files.
+
+    Each flush is written as a complete file ``<dirpath>/<name>/part-<i>.parquet``,
+    so that the parts written before an interruption remain readable. It requires
+    the ``pyarrow`` package.
+
+    Parameters
+    ----------
+    dirpath : str
+        Directory path. It is created if it does not exist.
+    flush_every : int, optional
+        Number of tests kept in memory before being written. Defaults to ``10000``.
+    """
+
+    def __init__(self, dirpath, flush_every=10000):
+        from os import makedirs
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("ParquetSink requires the `pyarrow` package.")
+
+        super().__init__(flush_every)
+        makedirs(dirpath, exist_ok=True)
+        self._dirpath = dirpath
+        self._schemas = {}
+
+    def _dirpath_of(self, name):
+        from os.path import join
+
+        return join(self._dirpath, name)
+
+    def _parts(self, name):
+        from glob import glob
+        from os.path import join
+
+        return sorted(glob(join(self._dirpath_of(name), "part-*.parquet")))
+
+    def _append(self, name, df):
+        from os import makedirs, remove
+        from os.path import join
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if name not in self._schemas:
+            makedirs(self._dirpath_of(name), exist_ok=True)
+            for filepath in self._parts(name):
+                remove(filepath)
+            fields = []
+            for c in df.columns:
+                if df[c].dtype.kind in "biuf":
+                    fields.append(pa.field(c, pa.from_numpy_dtype(df[c].dtype)))
+                else:
+                    fields.append(pa.field(c, pa.string()))
+            self._schemas[name] = pa.schema(fields)
+
+        schema = self._schemas[name]
+        part = len(self._parts(name))
+        filepath = join(self._dirpath_of(name), "part-{:06d}.parquet".format(part))
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        pq.write_table(table, filepath)
+
+    def _read(self, name):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = [pq.read_table(filepath) for filepath in self._parts(name)]
+        return pa.concat_tables(tables).to_pandas()
+
+
+def dataframes(tables, sink):
+    """
+    Statistics and effect sizes of a scan result.
+
+    Parameters
+    ----------
+    tables : callable
+        Function returning the tables of the tests held in memory.
+    sink : :class:`ResultSink`, None
+        Sink the tests have been written to, if any.
+    """
+    if sink is None:
+        tables = tables()
+    else:
+        tables = {name: sink.read(name) for name in sink.tables}
+
+    stats = tables.pop("stats")
+    effsizes = {k[len("effsizes_") :]: v for k, v in tables.items()}
+    return {"stats": stats, "effsizes": effsizes}
+
+
+def _decode(x):
+    if isinstance(x, bytes):
+        return x.decode()
+    return x
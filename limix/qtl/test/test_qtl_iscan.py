@@ -1,6 +1,7 @@
 import scipy.stats as st
 from numpy import exp, eye, zeros
 from numpy.random import RandomState
+from numpy.testing import assert_allclose
 
 from limix.qc import normalise_covariance
 from limix.qtl import iscan
@@ -86,5 +87,30 @@ def test_qtl_iscan_two_hypotheses():
     str(r)
 
 
+def test_qtl_iscan_block_scan():
+    random = RandomState(2)
+    n = 20
+
+    M = random.randn(n, 2)
+    E0 = random.randn(n, 1)
+    E1 = random.randn(n, 2)
+    G = random.randn(n, 6)
+
+    K = random.randn(n, n + 1)
+    K = normalise_covariance(K @ K.T)
+
+    y = _normalize(G @ random.randn(6)) + random.randn(n)
+
+    idx = list(range(G.shape[1]))
+    for lik in ["normal", "poisson"]:
+        if lik == "poisson":
+            y = random.poisson(exp(y))
+
+        for K_ in [K, None]:
+            r0 = iscan(G, y, lik, K_, M, idx=idx, E0=E0, E1=E1, verbose=False)
+            r1 = iscan(G, y, lik, K_, M, E0=E0, E1=E1, block_size=4, verbose=False)
+            assert_allclose(r0.stats.values, r1.stats.values, rtol=1e-5)
+
+
 def _normalize(x):
     return (x - x.mean()) / x.std()
@@ -1,3 +1,4 @@
+import dask.array as da
 import pytest
 from xarray import DataArray
 import scipy.stats as st
@@ -10,12 +11,13 @@ from numpy import (
     eye,
     kron,
     nan,
+    ones,
     reshape,
     sqrt,
     zeros,
 )
 from numpy.random import RandomState
-from numpy.testing import assert_allclose, assert_array_equal
+from numpy.testing import assert_allclose, assert_array_equal, assert_equal
 from pandas import DataFrame
 
 from limix.qc import normalise_covariance
@@ -229,6 +231,315 @@ def test_qtl_scan_lmm_nokinship():
     assert_allclose(pv[:2], [8.159539103135342e-05, 0.10807353641893498], atol=1e-5)
 
 
+def test_qtl_scan_lmm_blocks():
+    random = RandomState(0)
+    nsamples = 50
+
+    G = random.randn(50, 100)
+    K = linear_kinship(G[:, 0:80], verbose=False)
+
+    y = dot(G, random.randn(100)) / sqrt(100) + 0.2 * random.randn(nsamples)
+
+    M = G[:, :5]
+    X = G[:, 60:90]
+
+    r0 = scan(X, y, "normal", K, M=M, verbose=False)
+    r1 = scan(X, y, "normal", K, M=M, block_size=7, verbose=False)
+    r2 = scan(da.from_array(X, chunks=(50, 4)), y, "normal", K, M=M, verbose=False)
+
+    assert_allclose(r0.stats.values, r1.stats.values)
+    assert_allclose(r0.stats.values, r2.stats.values)
+    assert_allclose(r0.effsizes["h2"]["effsize"], r1.effsizes["h2"]["effsize"])
+    assert_allclose(r0.effsizes["h2"]["effsize"], r2.effsizes["h2"]["effsize"])
+
+
+def test_qtl_scan_lmm_n_jobs():
+    random = RandomState(0)
+    nsamples = 50
+
+    G = random.randn(50, 100)
+    K = linear_kinship(G[:, 0:80], verbose=False)
+
+    y = dot(G, random.randn(100)) / sqrt(100) + 0.2 * random.randn(nsamples)
+
+    M = G[:, :5]
+    X = G[:, 60:90]
+
+    r0 = scan(X, y, "normal", K, M=M, verbose=False)
+    r1 = scan(X, y, "normal", K, M=M, block_size=7, n_jobs=2, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+    assert_allclose(r0.effsizes["h2"]["effsize"], r1.effsizes["h2"]["effsize"])
+
+    idx = [[0, 1], 2, [3, 4, 5]]
+    r0 = scan(X, y, "normal", K, M=M, idx=idx, verbose=False)
+    r1 = scan(X, y, "normal", K, M=M, idx=idx, n_jobs=2, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+    assert_allclose(r0.effsizes["h2"]["effsize"], r1.effsizes["h2"]["effsize"])
+
+    Y = concatenate((y[:, None], X[:, [0]] + 0.2 * random.randn(nsamples, 1)), 1)
+    A = eye(2)
+    A0 = [[1], [1]]
+    r0 = scan(X[:, :6], Y, "normal", K, M=M, A=A, A0=A0, verbose=False)
+    r1 = scan(X[:, :6], Y, "normal", K, M=M, A=A, A0=A0, n_jobs=2, verbose=False)
+    logpv = ["logpv10", "logpv20", "logpv21"]
+    s0, s1 = r0.stats.drop(columns=logpv), r1.stats.drop(columns=logpv)
+    assert_allclose(s0.values, s1.values)
+    assert_allclose(exp(r0.stats[logpv].values), exp(r1.stats[logpv].values))
+    assert_allclose(r0.effsizes["h2"]["effsize"], r1.effsizes["h2"]["effsize"])
+
+
+def test_qtl_scan_lmm_more_tests_than_candidates():
+    random = RandomState(0)
+    nsamples = 30
+
+    G = random.randn(nsamples, 20)
+    K = linear_kinship(G, verbose=False)
+    y = dot(G, random.randn(20)) / sqrt(20) + 0.2 * random.randn(nsamples)
+
+    X = G[:, :3]
+    r0 = scan(X, y, "normal", K, idx=[[0, 1, 2], 0], verbose=False)
+    r1 = scan(X, y, "normal", K, idx=[[0, 1, 2]] * 4 + [0] * 5, verbose=False)
+
+    assert_equal(r1.stats.shape[0], 9)
+    assert_allclose(r1.stats["pv20"].values[:4], r0.stats["pv20"].values[0])
+    assert_allclose(r1.stats["pv20"].values[4:], r0.stats["pv20"].values[1])
+    assert_equal(r1.stats["dof20"].values, [3] * 4 + [1] * 5)
+
+    h2 = r1.effsizes["h2"]
+    names = h2.loc[h2["effect_type"] == "candidate", "effect_name"].values
+    assert_array_equal(names, ["0", "1", "2"] * 4 + ["0"] * 5)
+
+
+def test_qtl_scan_lmm_sink(tmp_path):
+    from limix.qtl import CSVSink, HDF5Sink
+
+    random = RandomState(0)
+    nsamples = 30
+
+    G = random.randn(nsamples, 20)
+    K = linear_kinship(G, verbose=False)
+    y = dot(G, random.randn(20)) / sqrt(20) + 0.2 * random.randn(nsamples)
+    Y = concatenate((y[:, None], G[:, [0]] + random.randn(nsamples, 1)), 1)
+
+    X = G[:, 5:12]
+    sinks = [
+        CSVSink(str(tmp_path / "csv"), flush_every=3),
+        HDF5Sink(str(tmp_path / "sink.h5"), flush_every=3),
+    ]
+    r0 = scan(X, y, "normal", K, verbose=False)
+    for sink in sinks:
+        r1 = scan(X, y, "normal", K, sink=sink, verbose=False)
+        assert_allclose(r0.stats.values, r1.stats.values)
+        assert_array_equal(r1.stats.index, range(X.shape[1]))
+        h2 = r1.effsizes["h2"]
+        assert_allclose(r0.effsizes["h2"]["effsize"], h2["effsize"])
+        assert_array_equal(r0.effsizes["h2"]["effect_name"], h2["effect_name"])
+
+    A0 = [[1], [1]]
+    sink = CSVSink(str(tmp_path / "mt"), flush_every=2)
+    r0 = scan(X, Y, "normal", K, A=eye(2), A0=A0, verbose=False)
+    r1 = scan(X, Y, "normal", K, A=eye(2), A0=A0, sink=sink, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+    assert_allclose(r0.effsizes["h1"]["effsize"], r1.effsizes["h1"]["effsize"])
+    assert_allclose(r0.effsizes["h2"]["effsize"], r1.effsizes["h2"]["effsize"])
+
+
+def test_qtl_scan_sink_append_after_read(tmp_path):
+    from pandas import DataFrame
+    from limix.qtl import CSVSink, HDF5Sink, ParquetSink
+
+    sinks = [CSVSink(str(tmp_path / "csv")), HDF5Sink(str(tmp_path / "sink.h5"))]
+    try:
+        sinks.append(ParquetSink(str(tmp_path / "parquet")))
+    except ImportError:
+        pass
+
+    for sink in sinks:
+        sink.write({"stats": DataFrame({"test": [0, 1], "lml": [1.0, 2.0]})})
+        assert_array_equal(sink.read("stats")["test"], [0, 1])
+        sink.write({"stats": DataFrame({"test": [0], "lml": [3.0]})})
+        df = sink.read("stats")
+        assert_array_equal(df["test"], [0, 1, 2])
+        assert_allclose(df["lml"], [1.0, 2.0, 3.0])
+        sink.close()
+
+
+def test_qtl_scan_lmm_checkpoint(tmp_path):
+    import os
+
+    random = RandomState(0)
+    nsamples = 30
+
+    G = random.randn(nsamples, 20)
+    K = linear_kinship(G, verbose=False)
+    y = dot(G, random.randn(20)) / sqrt(20) + 0.2 * random.randn(nsamples)
+
+    X = G[:, 5:12]
+    ckpt = str(tmp_path / "ckpt")
+    r0 = scan(X, y, "normal", K, block_size=3, verbose=False)
+    r1 = scan(X, y, "normal", K, block_size=3, checkpoint=ckpt, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+
+    files = sorted(os.listdir(ckpt))
+    assert_array_equal(
+        files,
+        [
+            "QS.pkl",
+            "block_0_3.pkl",
+            "block_3_6.pkl",
+            "block_6_7.pkl",
+            "key.pkl",
+            "null.pkl",
+        ],
+    )
+
+    os.remove(os.path.join(ckpt, "block_3_6.pkl"))
+    r2 = scan(X, y, "normal", K, block_size=3, checkpoint=ckpt, verbose=False)
+    assert_allclose(r0.stats.values, r2.stats.values)
+    assert_allclose(r0.effsizes["h2"]["effsize"], r2.effsizes["h2"]["effsize"])
+
+    with pytest.raises(ValueError):
+        scan(X, y + 1, "normal", K, checkpoint=ckpt, verbose=False)
+
+
+def test_qtl_scan_lmm_qs():
+    from numpy_sugar.linalg import economic_qs
+
+    random = RandomState(0)
+    nsamples = 30
+
+    G = random.randn(nsamples, 20)
+    K = linear_kinship(G, verbose=False)
+    y = dot(G, random.randn(20)) / sqrt(20) + 0.2 * random.randn(nsamples)
+    Y = concatenate([y[:, None], y[:, None] + 0.1 * random.randn(nsamples, 1)], 1)
+
+    X = G[:, 5:12]
+    QS = economic_qs(K)
+    r0 = scan(X, y, "normal", K, verbose=False)
+    r1 = scan(X, y, "normal", QS=QS, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+
+    A = eye(2)
+    r0 = scan(X, Y, "normal", K, A=A, verbose=False)
+    r1 = scan(X, Y, "normal", QS=QS, A=A, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values)
+
+
+def test_qtl_scan_lmm_kinship_factor():
+    random = RandomState(0)
+    nsamples = 30
+
+    G = random.randn(nsamples, 20)
+    Gk = G[:, :10] - G[:, :10].mean(0)
+    K = dot(Gk, Gk.T) / 10
+    y = dot(G, random.randn(20)) / sqrt(20) + 0.2 * random.randn(nsamples)
+
+    X = G[:, 10:]
+    r0 = scan(X, y, "normal", K, verbose=False)
+    r1 = scan(X, y, "normal", Gk=Gk, verbose=False)
+    assert_allclose(r0.stats.values, r1.stats.values, rtol=1e-5)
+
+
+def test_qtl_scan_lmm_permutations():
+    from glimix_core.lmm import FastScanner
+    from limix._qs import economic_qs
+    from limix.qtl._permutation import _permuted_traits
+    from limix.qtl._scan import _st_lmm
+
+    random = RandomState(0)
+    nsamples = 40
+
+    G = random.randn(nsamples, 30)
+    K = linear_kinship(G[:, :15], verbose=False)
+    y = dot(G[:, :15], random.randn(15)) / sqrt(15) + random.randn(nsamples)
+    X = G[:, 15:]
+
+    r0 = scan(X, y, "normal", K, verbose=False)
+    r = scan(X, y, "normal", K, permutations=10, seed=1, block_size=4, verbose=False)
+    assert_allclose(r.stats.values, r0.stats.values)
+    assert r0.permutation is None
+
+    # Same permuted traits, each one scanned on its own.
+    M = ones((nsamples, 1))
+    QS = economic_qs(K)
+    _, v0, v1 = _st_lmm(y, M, QS, False)
+    Y = _permuted_traits(y, M, QS, v0, v1, 10, RandomState(1))
+    max_stats = []
+    for i in range(10):
+        s = FastScanner(Y[:, i], M, (QS[0], v0 * QS[1]), v1)
+        lml = s.fast_scan(X, False)["lml"]
+        max_stats.append(2 * (lml - s.null_lml()).max())
+    assert_allclose(r.permutation.max_stats, max_stats, rtol=1e-6)
+
+    pv = r.permutation.pvalues
+    assert_array_equal(pv.index, r.stats.index)
+    assert ((pv >= 0.1) & (pv <= 1)).all()
+    assert 0 < r.permutation.threshold(0.05) < r.stats["pv20"].max()
+
+    with pytest.raises(ValueError):
+        scan(X, y, "poisson", K, permutations=10, verbose=False)
+
+
+def test_qtl_scan_mt_block_scanner():
+    from glimix_core.lmm import Kron2Sum
+    from numpy_sugar.linalg import economic_qs_linear
+    from limix.qtl._kron_scan import KronBlockScanner
+
+    random = RandomState(0)
+    n = 40
+    p = 3
+
+    Y = random.randn(n, p)
+    A = random.randn(p, p)
+    A = A @ A.T
+    M = random.randn(n, 2)
+    KG = random.randn(n, 5)
+    lmm = Kron2Sum(Y, A, M, KG, restricted=False)
+    lmm.fit(verbose=False)
+    scanner = lmm.get_fast_scanner()
+    block_scanner = KronBlockScanner(Y, A, M, economic_qs_linear(KG), lmm.C0, lmm.C1)
+
+    X = random.randn(n, 6)
+    for A1 in [eye(p), random.randn(p, 2), random.randn(p, 0)]:
+        r = block_scanner.scan(A1, X)
+        for i in range(X.shape[1]):
+            ri = scanner.scan(A1, X[:, [i]])
+            for k, v in ri.items():
+                assert_allclose(r[k][i], v, atol=1e-10)
+
+
+def test_qtl_scan_mt_block_scanner_rank_deficient():
+    from glimix_core.lmm import Kron2Sum
+    from numpy_sugar.linalg import economic_qs_linear
+    from limix.qtl._kron_scan import KronBlockScanner
+
+    random = RandomState(3)
+    n = 40
+    p = 3
+
+    Y = random.randn(n, p)
+    A = random.randn(p, p)
+    A = A @ A.T
+    M = random.randn(n, 2)
+    KG = random.randn(n, 5)
+    lmm = Kron2Sum(Y, A, M, KG, restricted=False)
+    lmm.fit(verbose=False)
+    scanner = lmm.get_fast_scanner()
+    block_scanner = KronBlockScanner(Y, A, M, economic_qs_linear(KG), lmm.C0, lmm.C1)
+
+    # A01 = [A0, I] is rank-deficient, as in scan with the default A1.
+    X = random.randn(n, 30)
+    X[:, 1] = M[:, 0]
+    A1 = concatenate((ones((p, 1)), eye(p)), 1)
+    r = block_scanner.scan(A1, X)
+    for i in range(X.shape[1]):
+        ri = block_scanner.scan(A1, X[:, [i]])
+        rj = scanner.scan(A1, X[:, [i]])
+        for k in ["lml", "effsizes0", "effsizes1", "scale"]:
+            assert_allclose(r[k][i], ri[k][0], rtol=1e-10, atol=1e-10)
+            assert_allclose(r[k][i], rj[k], rtol=1e-10, atol=1e-10)
+
+
 def test_qtl_scan_lmm_repeat_samples_by_index():
     random = RandomState(0)
     nsamples = 30
@@ -0,0 +1,65 @@
+from numpy import concatenate, dot, exp, ones, sqrt
+from numpy.random import RandomState
+from numpy.testing import assert_allclose, assert_array_equal
+
+from limix.qtl import CSVSink, scan, scan_many
+from limix.stats import linear_kinship
+
+
+def _dataset():
+    random = RandomState(0)
+    nsamples = 50
+
+    G = random.randn(nsamples, 40)
+    K = linear_kinship(G[:, :20], verbose=False)
+    Y = dot(G, random.randn(40, 3)) / sqrt(40) + 0.5 * random.randn(nsamples, 3)
+    M = concatenate([ones((nsamples, 1)), random.randn(nsamples, 2)], axis=1)
+    return G, K, Y, M
+
+
+def test_qtl_scan_many():
+    G, K, Y, _ = _dataset()
+
+    rs = scan_many(G, Y, K, block_size=7, verbose=False)
+    assert len(rs) == 3
+
+    for i, r in enumerate(rs):
+        r0 = scan(G, Y[:, i], "normal", K, verbose=False)
+        s0, s = r0.stats.drop(columns="logpv20"), r.stats.drop(columns="logpv20")
+        assert_allclose(s0.values, s.values, rtol=1e-6)
+        assert_allclose(exp(r0.stats["logpv20"]), exp(r.stats["logpv20"]), rtol=1e-6)
+
+        e0 = r0.effsizes["h2"]
+        e1 = r.effsizes["h2"]
+        assert_array_equal(e0["effect_name"], e1["effect_name"])
+        assert_allclose(e0["effsize"], e1["effsize"], rtol=1e-6, atol=1e-10)
+        assert_allclose(e0["effsize_se"], e1["effsize_se"], rtol=1e-6)
+
+
+def test_qtl_scan_many_covariates():
+    G, K, Y, M = _dataset()
+
+    rs = scan_many(G, Y, K, M=M, verbose=False)
+    for i, r in enumerate(rs):
+        r0 = scan(G, Y[:, i], "normal", K, M=M, verbose=False)
+        s0, s = r0.stats.drop(columns="logpv20"), r.stats.drop(columns="logpv20")
+        assert_allclose(s0.values, s.values, rtol=1e-6)
+        assert_allclose(exp(r0.stats["logpv20"]), exp(r.stats["logpv20"]), rtol=1e-6)
+        e0 = r0.effsizes["h2"]
+        e1 = r.effsizes["h2"]
+        assert_allclose(e0["effsize"], e1["effsize"], rtol=1e-6, atol=1e-10)
+        assert_allclose(e0["effsize_se"], e1["effsize_se"], rtol=1e-6)
+
+
+def test_qtl_scan_many_sinks(tmp_path):
+    G, K, Y, _ = _dataset()
+
+    rs0 = scan_many(G, Y, K, verbose=False)
+    sinks = [CSVSink(str(tmp_path / str(i)), flush_every=9) for i in range(3)]
+    rs1 = scan_many(G, Y, K, sinks=sinks, verbose=False)
+
+    for r0, r1 in zip(rs0, rs1):
+        assert_allclose(r0.stats.values, r1.stats.values)
+        e0 = r0.effsizes["h2"]
+        e1 = r1.effsizes["h2"]
+        assert_allclose(e0["effsize"], e1["effsize"])
@@ -90,50 +90,70 @@ class Chi2Mixture(object):
         self.n_intervals = n_intervals
         self.tol = tol
 
-    def estimate_chi2mixture(self, lrt):
+    def estimate_chi2mixture(self, lrt, method="grid"):
         r"""Estimates the parameters of a chi2 mixture.
 
         Estimates the parameters of a chi2 mixture by fitting the empirical
         distribution of null test statistic.
 
+        The ``"grid"`` method evaluates every pair of scale and dof values of a
+        ``n_intervals``-by-``n_intervals`` grid. The ``"optimize"`` method evaluates
+        a coarse grid instead, and refines its best pair by bounded continuous
+        optimisation, which is much faster and not limited by the grid resolution.
+
         Parameters
         ----------
         lrt : array_like
             Null test statistcs.
+        method : str, optional
+            ``"grid"`` or ``"optimize"``. Defaults to ``"grid"``.
         """
-        import scipy as sp
-        import scipy.stats as st
+        from numpy import asarray, ceil, linspace, log10, sort
+
+        if method not in ["grid", "optimize"]:
+            raise ValueError("Unknown method: {}.".format(method))
+
+        lrt = asarray(lrt, float)
 
         # step 1: estimate the probability of being in component one
         self.mixture = 1 - (lrt <= self.tol).mean()
-        n_false = sp.sum(lrt > self.tol)
+        n_false = (lrt > self.tol).sum()
 
         # step 2: only use the largest qmax fraction of test statistics to
         #         estimate the remaining parameters
-        n_fitting = int(sp.ceil(self.qmax * n_false))
-        lrt_sorted = -sp.sort(-lrt)[:n_fitting]
-        q = sp.linspace(0, 1, n_false)[1 : n_fitting + 1]
-        log_q = sp.log10(q)
+        n_fitting = int(ceil(self.qmax * n_false))
+        lrt_sorted = -sort(-lrt)[:n_fitting]
+        q = linspace(0, 1, n_false)[1 : n_fitting + 1]
+        log_q = log10(q)
 
         # step 3: fitting scale and dof by minimizing the squared error
         #          of the log10 p-values with their theorietical values
         #          [uniform distribution]
-        MSE_opt = sp.inf
-        MSE = sp.zeros((self.n_intervals, self.n_intervals))
-
-        for i, scale in enumerate(
-            sp.linspace(self.scale_min, self.scale_max, self.n_intervals)
-        ):
-            for j, dof in enumerate(
-                sp.linspace(self.dof_min, self.dof_max, self.n_intervals)
-            ):
-                p = st.chi2.sf(lrt_sorted / scale, dof)
-                log_p = sp.log10(p)
-                MSE[i, j] = sp.mean((log_q - log_p) ** 2)
-                if MSE[i, j] < MSE_opt:
-                    MSE_opt = MSE[i, j]
-                    self.scale = scale
-                    self.dof = dof
+        n = self.n_intervals
+        if method == "optimize":
+            n = min(n, 10)
+        scales = linspace(self.scale_min, self.scale_max, n)
+        dofs = linspace(self.dof_min, self.dof_max, n)
+        (self.scale, self.dof) = _grid_search(lrt_sorted, log_q, scales, dofs)
+
+        if method == "optimize":
+            self.scale, self.dof = self._refine(lrt_sorted, log_q)
+
+    def _refine(self, lrt_sorted, log_q):
+        from numpy import log, mean
+        from scipy.optimize import minimize
+        import scipy.stats as st
+
+        def mse(x):
+            log_p = st.chi2.logsf(lrt_sorted / x[0], x[1]) / log(10)
+            return mean((log_q - log_p) ** 2)
+
+        bounds = [(self.scale_min, self.scale_max), (self.dof_min, self.dof_max)]
+        x0 = [self.scale, self.dof]
+        r = minimize(mse, x0, method="L-BFGS-B", bounds=bounds)
+        if r.fun <= mse(x0):
+            return (r.x[0], r.x[1])
+        return (x0[0], x0[1])
 
     def sf(self, lrt):
         r"""Computes the p-values from test statistics lrt.
@@ -158,3 +178,31 @@ class Chi2Mixture(object):
         _lrt[lrt < self.tol] = 0
         pv = self.mixture * st.chi2.sf(_lrt / self.scale, self.dof)
         return pv
+
+
+def _grid_search(lrt_sorted, log_q, scales, dofs):
+    """
+    Pair of scale and dof values of minimum squared error of log10 p-values.
+
+    The p-values of many rows of the grid are computed by a single broadcasted call.
+    Ties are broken in favour of the first pair, in row-major order.
+    """
+    from numpy import argmin, empty, errstate, inf, log10, mean, unravel_index
+    import scipy.stats as st
+
+    from .._config import config
+
+    n = max(len(lrt_sorted), 1)
+    nrows = max(config["qtl.block_bytes"] // (8 * n * len(dofs)), 1)
+
+    MSE = empty((len(scales), len(dofs)))
+    for start in range(0, len(scales), nrows):
+        scale = scales[start : start + nrows, None, None]
+        p = st.chi2.sf(lrt_sorted / scale, dofs[None, :, None])
+        with errstate(divide="ignore"):
+            log_p = log10(p)
+        MSE[start : start + nrows] = mean((log_q - log_p) ** 2, axis=-1)
+
+    MSE[MSE != MSE] = inf
+    (i, j) = unravel_index(argmin(MSE), MSE.shape)
+    return (scales[i], dofs[j])
@@ -1,7 +1,15 @@
 from __future__ import division
 
 
-def linear_kinship(G, out=None, verbose=True):
+def linear_kinship(
+    G,
+    out=None,
+    verbose=True,
+    n_jobs=None,
+    backend="threading",
+    dtype=float,
+    packed=False,
+):
     """
     Estimate Kinship matrix via linear kernel.
 
@@ -24,14 +32,45 @@ def linear_kinship(G, out=None, verbose=True):
     otherwise require a large amount of memory if it were to be loaded in memory first.
     For those cases, libraries like Dask come in handy.
 
+    ``G`` is processed in blocks of columns: the column chunks of a dask-backed
+    ``G``, or blocks sized after the available memory otherwise. The next block is
+    read while the current one is being multiplied. With ``n_jobs`` workers, each
+    worker accumulates the blocks assigned to it into its own n×n partial sum, and
+    the partial sums are added up at the end.
+
+    Only the lower triangle is computed, via symmetric rank-k updates, and it is
+    mirrored at the end. For a file-backed output, the matrix is instead computed
+    one panel of rows at a time, each panel over a full pass on ``G``. Memory can be
+    further halved by a single-precision accumulator, ``dtype="float32"``, or by
+    returning the packed lower triangle.
+
     Parameters
     ----------
     G : array_like
         Samples-by-variants matrix.
-    out : ndarray
-        A location into which the result is stored.
+    out : ndarray, str, optional
+        A location into which the result is stored. It must have the shape and type
+        of the result. A :class:`numpy.memmap`, or the path of a ``.npy`` file to be
+        created as one, is filled one panel of rows at a time, so that the kinship
+        matrix can be larger than the available memory. It can be read back with
+        :func:`limix.io.npy.read`.
     verbose : bool, optional
         ``True`` for showing progress; ``False`` otherwise. Defauts to ``True``.
+    n_jobs : int, optional
+        Number of workers. ``-1`` uses every available core. If ``None``, the blocks
+        are processed in the calling thread. Defaults to ``None``.
+    backend : str, optional
+        ``"threading"`` for worker threads, which share ``G`` and run the BLAS calls
+        concurrently, or ``"loky"`` for worker processes. Defaults to
+        ``"threading"``.
+    dtype : data-type, optional
+        Floating-point type of the result, ``float`` or ``"float32"``. Defaults to
+        ``float``.
+    packed : bool, optional
+        ``True`` to return the lower triangle of the kinship matrix stored row by
+        row in a vector of length n(n+1)/2, in which the element (i, j) for j ≤ i is
+        at position i(i+1)/2 + j. The full matrix is then never allocated.
+        Defaults to ``False``.
 
     Examples
     --------
@@ -49,47 +88,244 @@ def linear_kinship(G, out=None, verbose=True):
          [-0.34133897 -0.2356003   0.95777313 -0.38083386]
          [-0.37897564 -0.47041761 -0.38083386  1.23022711]]
     """
-    from numpy import sqrt, zeros, asfortranarray, where, asarray, nanmean, std, isnan
-    from scipy.linalg.blas import get_blas_funcs
+    from numpy import dtype as _dtype, memmap
     from tqdm import tqdm
 
     (n, p) = G.shape
+    dtype = _dtype(dtype)
     if out is None:
-        out = zeros((n, n), order="F")
-    else:
-        out = asfortranarray(out)
+        out = _zeros(n, dtype, packed)
+    elif isinstance(out, str):
+        out = _open_memmap(out, n, dtype, packed)
+
+    if isinstance(out, memmap):
+        _panel_kinship(out, G, p, packed, verbose)
+        out.flush()
+        return out
+
+    # A symmetric matrix in row-major order is its own transpose in column-major
+    # order, which is the one BLAS works with.
+    K = out if packed or out.flags.f_contiguous else out.T
 
-    chunks = _get_chunks(G)
-    gemm = get_blas_funcs("gemm", [out])
+    if n_jobs is None or n_jobs == 1:
+        blocks = _get_blocks(G, 1, 0)
+        update = _packed_update if packed else _syrk_update
+        with tqdm(total=len(blocks), desc="Kinship", disable=not verbose) as pbar:
+            _accumulate(lambda g: update(K, g), G, blocks, p, dtype, pbar)
+        _finish(K, packed)
+        return out
 
-    start = 0
-    for chunk in tqdm(chunks, desc="Kinship", disable=not verbose):
-        end = start + chunk
+    from joblib import Parallel, delayed, effective_n_jobs
 
-        g = asarray(G[:, start:end])
-        m = nanmean(g, 0)
-        g = where(isnan(g), m, g)
-        g = g - m
-        g /= std(g, 0)
-        g /= sqrt(p)
+    nworkers = effective_n_jobs(n_jobs)
+    blocks = _get_blocks(G, nworkers, nworkers * out.nbytes)
+    size = -(-len(blocks) // nworkers)
+    groups = [blocks[i : i + size] for i in range(0, len(blocks), size)]
 
-        gemm(1.0, g, g, 1.0, out, 0, 1, 1)
+    with Parallel(n_jobs=nworkers, backend=backend) as parallel:
+        tasks = (delayed(_partial_kinship)(G, g, p, dtype, packed) for g in groups)
+        partials = parallel(tasks)
 
-        start = end
+    for P in tqdm(partials, desc="Kinship", disable=not verbose):
+        K += P
 
+    _finish(K, packed)
     return out
 
 
-def _get_chunks(G):
-    from numpy import isfinite
+def _zeros(n, dtype, packed):
+    from numpy import zeros
+
+    if packed:
+        return zeros(n * (n + 1) // 2, dtype)
+    return zeros((n, n), dtype, order="F")
+
+
+def _open_memmap(filepath, n, dtype, packed):
+    from numpy.lib.format import open_memmap
+
+    shape = (n * (n + 1) // 2,) if packed else (n, n)
+    return open_memmap(filepath, mode="w+", dtype=dtype, shape=shape)
+
+
+def _partial_kinship(G, blocks, p, dtype, packed):
+    out = _zeros(G.shape[0], dtype, packed)
+    update = _packed_update if packed else _syrk_update
+    _accumulate(lambda g: update(out, g), G, blocks, p, dtype)
+    return out
+
+
+def _panel_kinship(out, G, p, packed, verbose):
+    """
+    Compute the kinship matrix into a file-backed array one panel of rows at a time.
+
+    Each panel is accumulated in memory over a full pass on ``G`` and then written
+    once, so that the file is written sequentially and the whole matrix never needs
+    to fit in memory. ``G`` is read once per panel.
+    """
+    from numpy import arange, zeros
+    from scipy.linalg.blas import get_blas_funcs
+    from tqdm import tqdm
+
+    n = G.shape[0]
+    dtype = out.dtype
+    gemm = get_blas_funcs("gemm", dtype=dtype)
+    size = _panel_rows(n, dtype.itemsize)
+    panels = [(a, min(a + size, n)) for a in range(0, n, size)]
+    blocks = _get_blocks(G, 1, size * n * dtype.itemsize)
+
+    total = len(panels) * len(blocks)
+    with tqdm(total=total, desc="Kinship", disable=not verbose) as pbar:
+        for a, b in panels:
+            panel = zeros((b - a, b), dtype)
+
+            def update(g):
+                gemm(1.0, g[:b], g[a:b], 1.0, panel.T, 0, 1, 1)
+
+            _accumulate(update, G, blocks, p, dtype, pbar)
+
+            if packed:
+                mask = arange(b)[None, :] <= arange(a, b)[:, None]
+                out[a * (a + 1) // 2 : b * (b + 1) // 2] = panel[mask]
+            else:
+                out[a:b, :b] = panel
+                out[:a, a:b] = panel[:, :a].T
+
+
+def _panel_rows(n, itemsize):
+    from .._config import config
+
+    # A panel and the blocks of candidates take at most half the free memory.
+    free = _available_memory()
+    nbytes = config["qtl.block_bytes"] if free is None else free // 4
+    return max(min(nbytes // (itemsize * max(n, 1)), n), 1)
+
+
+def _accumulate(update, G, blocks, p, dtype, pbar=None):
+    from concurrent.futures import ThreadPoolExecutor
+    from numpy import asfortranarray, sqrt
+
+    # The next block is read in the background while the current one is in BLAS.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = None
+        for i, (start, end) in enumerate(blocks):
+            if future is None:
+                future = executor.submit(_read_block, G, start, end)
+            g = future.result()
+            if i + 1 < len(blocks):
+                future = executor.submit(_read_block, G, *blocks[i + 1])
+
+            g /= sqrt(p)
+            update(asfortranarray(g, dtype))
+
+            if pbar is not None:
+                pbar.update()
+
+
+def _syrk_update(out, g):
+    from scipy.linalg.blas import get_blas_funcs
+
+    syrk = get_blas_funcs("syrk", [out])
+    syrk(1.0, g, 1.0, out, trans=0, lower=1, overwrite_c=1)
+
+
+def _packed_update(out, g):
+    from numpy import arange
+
+    # Rows [a, b) of the lower triangle are contiguous in the packed vector, and
+    # they only depend on the rows up to b of the block.
+    n = g.shape[0]
+    size = _tile_rows(n, g.itemsize)
+    for a in range(0, n, size):
+        b = min(a + size, n)
+        tile = g[a:b] @ g[:b].T
+        mask = arange(b)[None, :] <= arange(a, b)[:, None]
+        out[a * (a + 1) // 2 : b * (b + 1) // 2] += tile[mask]
+
+
+def _finish(out, packed):
+    if packed:
+        return out
+
+    # Copy the lower triangle into the upper one, a tile at a time.
+    n = out.shape[0]
+    size = _tile_rows(n, out.itemsize)
+    for a in range(0, n, size):
+        b = min(a + size, n)
+        out[a:b, b:] = out[b:, a:b].T
+        tile = out[a:b, a:b]
+        for i in range(b - a):
+            tile[i, i + 1 :] = tile[i + 1 :, i]
+    return out
+
+
+def _tile_rows(n, itemsize):
+    from .._config import config
+
+    return max(min(config["qtl.block_bytes"] // (itemsize * max(n, 1)), n), 1)
+
+
+def _read_block(G, start, end):
+    from numpy import asarray, isnan, nanmean, std, where
+
+    g = asarray(G[:, start:end], float)
+    m = nanmean(g, 0)
+    g = where(isnan(g), m, g)
+    g = g - m
+    g /= std(g, 0)
+    return g
+
+
+def _get_blocks(G, nworkers, reserved):
+    """
+    Column blocks of ``G``.
+
+    ``reserved`` is the number of bytes of the accumulators yet to be allocated,
+    which are left out of the available memory.
+    """
+    from numpy import cumsum, isfinite
+
+    from .._config import config
 
     if hasattr(G, "chunks") and G.chunks is not None:
         if len(G.chunks) > 1 and all(isfinite(G.chunks[0])):
-            return G.chunks[1]
-
-    siz = G.shape[1] // 100
-    sizl = G.shape[1] - siz * 100
-    chunks = [siz] * 100
-    if sizl > 0:
-        chunks += [sizl]
-    return tuple(chunks)
+            ends = cumsum(G.chunks[1]).tolist()
+            return list(zip([0] + ends[:-1], ends))
+
+    (n, p) = G.shape
+    nbytes = config["qtl.block_bytes"]
+    free = _available_memory()
+    if free is not None:
+        # Every worker holds the block being read, the block being multiplied, and
+        # its copy in the accumulator type.
+        nbytes = min(nbytes, (free - reserved) // (3 * nworkers))
+
+    # Narrower blocks would make each BLAS call too small to be efficient.
+    size = max(nbytes // (8 * max(n, 1)), min(_MIN_BLOCK_COLUMNS, p), 1)
+    return [(i, min(i + size, p)) for i in range(0, p, size)]
+
+
+_MIN_BLOCK_COLUMNS = 256
+
+
+def _available_memory():
+    """
+    Memory available for new allocations, in bytes.
+
+    It is read from ``MemAvailable`` in ``/proc/meminfo``, which accounts for the
+    page cache that can be reclaimed, and otherwise from the number of free pages.
+    """
+    import os
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
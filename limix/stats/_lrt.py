@@ -1,30 +1,107 @@
 from __future__ import division
 
 
-def lrt_pvalues(null_lml, alt_lmls, dof=1):
+def lrt_pvalues(null_lml, alt_lmls, dof=1, log=False):
     """
     Compute p-values from likelihood ratios.
 
-    These are likelihood ratio test p-values.
+    These are likelihood ratio test p-values. The survival function of the
+    chi-squared distribution is evaluated in closed form for one and two degrees of
+    freedom, and by :func:`scipy.special.chdtrc` otherwise, so that millions of
+    tests can be handled at once.
 
     Parameters
     ----------
-    null_lml : float
+    null_lml : float, array_like
         Log of the marginal likelihood under the null hypothesis.
     alt_lmls : array_like
         Log of the marginal likelihoods under the alternative hypotheses.
-    dof : int
-        Degrees of freedom.
+    dof : int, array_like
+        Degrees of freedom, either shared by all tests or one per test.
+    log : bool, optional
+        ``True`` to return the natural logarithm of the p-values, which does not
+        underflow for very strong associations; ``False`` otherwise. Defaults to
+        ``False``.
 
     Returns
     -------
     pvalues : ndarray
-        P-values.
+        P-values, or their logarithms if ``log`` is ``True``.
     """
-    from scipy.stats import chi2
     from numpy_sugar import epsilon
-    from numpy import asarray, clip, inf
+    from numpy import asarray, broadcast_arrays, clip, full, inf, log1p, nan, unique
 
-    lrs = clip(-2 * null_lml + 2 * asarray(alt_lmls, float), epsilon.super_tiny, inf)
-    pv = chi2(df=dof).sf(lrs)
-    return clip(pv, epsilon.super_tiny, 1 - epsilon.tiny)
+    lrs = -2 * asarray(null_lml, float) + 2 * asarray(alt_lmls, float)
+    lrs = clip(lrs, epsilon.super_tiny, inf)
+    lrs, dof = broadcast_arrays(lrs, asarray(dof, float))
+
+    func = _chi2_logsf if log else _chi2_sf
+    if dof.size > 0 and dof.min() == dof.max():
+        out = func(lrs, dof.flat[0])
+    else:
+        out = full(lrs.shape, nan)
+        for d in unique(dof):
+            ok = dof == d
+            out[ok] = func(lrs[ok], d)
+
+    if log:
+        return clip(out, -inf, log1p(-epsilon.tiny))
+    return clip(out, epsilon.super_tiny, 1 - epsilon.tiny)
+
+
+def _chi2_sf(x, dof):
+    """
+    Chi-squared survival function.
+    """
+    from numpy import exp
+    from scipy.special import chdtrc, erfc
+
+    if dof == 1:
+        return erfc((x / 2) ** 0.5)
+
+    if dof == 2:
+        return exp(-x / 2)
+
+    return chdtrc(dof, x)
+
+
+def _chi2_logsf(x, dof):
+    """
+    Logarithm of the chi-squared survival function.
+    """
+    from numpy import errstate, log
+    from scipy.special import chdtrc, log_ndtr
+
+    if dof == 1:
+        return log(2) + log_ndtr(-(x ** 0.5))
+
+    if dof == 2:
+        return -x / 2
+
+    with errstate(divide="ignore"):
+        logsf = log(chdtrc(dof, x))
+    tiny = logsf < -700
+    if tiny.any():
+        logsf[tiny] = _chi2_logsf_asymptotic(x[tiny], dof)
+    return logsf
+
+
+def _chi2_logsf_asymptotic(x, dof):
+    """
+    Asymptotic expansion of the chi-squared log survival function for large ``x``.
+
+    It uses Q(a, z) ~ z^(a-1) e^(-z) / Γ(a) (1 + (a-1)/z + (a-1)(a-2)/z² + ...),
+    with ``a = dof/2`` and ``z = x/2``.
+    """
+    from numpy import log, ones_like
+    from scipy.special import gammaln
+
+    a = dof / 2
+    z = x / 2
+    series = ones_like(z)
+    term = ones_like(z)
+    for i in range(1, 6):
+        term = term * (a - i) / z
+        series += term
+
+    return (a - 1) * log(z) - z - gammaln(a) + log(series)
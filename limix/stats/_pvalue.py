@@ -58,13 +58,19 @@ def empirical_pvalues(xt, x0):
     observed on the data and the null test statistics
     (from permutations, parametric bootstraps, etc).
 
+    The null test statistics can also be given as an iterator of batches, for
+    example one batch per permutation. Only the number of null statistics above each
+    observed one is kept while the batches are consumed, so the whole null never
+    has to be held in memory.
+
     Parameters
     ----------
     xt : array_like
         Test statistcs observed on data.
-    x0 : array_like
-        Null test statistcs. The minimum p-value that can be
-        estimated is ``1./len(x0)``.
+    x0 : array_like, iterator
+        Null test statistcs, or an iterator of arrays of null test statistics. The
+        minimum p-value that can be estimated is ``1./len(x0)``, where ``len(x0)`` is
+        the total number of null test statistics.
 
     Returns
     -------
@@ -84,32 +90,34 @@ def empirical_pvalues(xt, x0):
         >>>
         >>> empirical_pvalues(x0, x1) # doctest: +FLOAT_CMP
         array([0.56300000, 1.00000000, 0.83900000, 0.79820000, 0.58030000])
+        >>>
+        >>> batches = (x1[i : i + 1000] for i in range(0, 10000, 1000))
+        >>> empirical_pvalues(x0, batches) # doctest: +FLOAT_CMP
+        array([0.56300000, 1.00000000, 0.83900000, 0.79820000, 0.58030000])
     """
-    from numpy import argsort, zeros, asarray
+    from numpy import argsort, asarray, bincount, cumsum, empty, isnan, minimum, nan
+    from numpy import searchsorted, zeros
 
     xt = asarray(xt, float)
-    x0 = asarray(x0, float)
+    if hasattr(x0, "__len__"):
+        x0 = [x0]
 
-    idxt = argsort(xt)[::-1]
-    idx0 = argsort(x0)[::-1]
+    idxt = argsort(xt)
     xts = xt[idxt]
-    x0s = x0[idx0]
-    it = 0
-    i0 = 0
-    _count = 0
-    count = zeros(xt.shape[0])
-    while True:
-        if x0s[i0] > xts[it]:
-            _count += 1
-            i0 += 1
-            if i0 == x0.shape[0]:
-                count[idxt[it:]] = _count
-                break
-        else:
-            count[idxt[it]] = _count
-            it += 1
-            if it == xt.shape[0]:
-                break
-    pv = (count + 1) / float(x0.shape[0])
-    pv[pv > 1.0] = 1.0
+
+    # The i-th element counts the null statistics greater than exactly the i
+    # smallest observed ones.
+    hist = zeros(xt.shape[0] + 1, int)
+    total = 0
+    for batch in x0:
+        batch = asarray(batch, float).ravel()
+        total += batch.shape[0]
+        pos = searchsorted(xts, batch[~isnan(batch)], side="left")
+        hist += bincount(pos, minlength=hist.shape[0])
+
+    count = empty(xt.shape[0])
+    count[idxt] = cumsum(hist[::-1])[::-1][1:]
+
+    pv = minimum((count + 1) / float(total), 1.0)
+    pv[isnan(xt)] = nan
     return pv
@@ -30,3 +30,20 @@ def test_chi2mixture():
     assert_allclose(chi2mix.scale, 1.9808080808080812)
     assert_allclose(chi2mix.dof, 0.891919191919192)
     assert_allclose(chi2mix.mixture, 0.199999999999999960)
+
+
+def test_chi2mixture_optimize():
+    random = RandomState(0)
+    x = 1.5 * random.chisquare(1, 5000)
+    x[random.choice(5000, 2500, replace=False)] = 0
+
+    grid = Chi2Mixture(tol=4e-3)
+    grid.estimate_chi2mixture(x)
+
+    opt = Chi2Mixture(tol=4e-3)
+    opt.estimate_chi2mixture(x, method="optimize")
+
+    resolution = (5.0 - 0.1) / 99
+    assert_allclose(opt.mixture, grid.mixture)
+    assert_allclose(opt.scale, grid.scale, atol=resolution)
+    assert_allclose(opt.dof, grid.dof, atol=resolution)
@@ -14,3 +14,80 @@ def test_kinship_estimation():
     X = da.from_array(X, chunks=(5, 13))
     K1 = linear_kinship(X, verbose=False)
     assert_allclose(K0, K1)
+
+
+def test_kinship_estimation_parallel():
+    random = RandomState(0)
+    X = random.randn(30, 40)
+    X[2, 3] = float("nan")
+
+    K0 = linear_kinship(X, verbose=False)
+
+    K1 = linear_kinship(X, verbose=False, n_jobs=2)
+    assert_allclose(K0, K1)
+
+    X = da.from_array(X, chunks=(30, 7))
+    K2 = linear_kinship(X, verbose=False, n_jobs=3, backend="loky")
+    assert_allclose(K0, K2)
+
+
+def test_kinship_estimation_float32_packed():
+    from numpy import tril_indices
+
+    random = RandomState(0)
+    X = random.randn(30, 40)
+
+    K0 = linear_kinship(X, verbose=False)
+    assert_allclose(K0, K0.T)
+
+    K1 = linear_kinship(X, verbose=False, dtype="float32")
+    assert K1.dtype == "float32"
+    assert_allclose(K0, K1, rtol=1e-4, atol=1e-5)
+
+    K2 = linear_kinship(X, verbose=False, packed=True)
+    assert_allclose(K2, K0[tril_indices(30)])
+
+    K3 = linear_kinship(X, verbose=False, packed=True, n_jobs=2, dtype="float32")
+    assert_allclose(K3, K0[tril_indices(30)], rtol=1e-4, atol=1e-5)
+
+
+def test_kinship_estimation_memmap(tmp_path, monkeypatch):
+    from numpy import tril_indices
+    from limix.io import npy
+    from limix.stats import _kinship
+
+    random = RandomState(0)
+    X = random.randn(30, 40)
+    K0 = linear_kinship(X, verbose=False)
+
+    # Small enough for the matrix to be computed in several panels of rows.
+    monkeypatch.setattr(_kinship, "_available_memory", lambda: 4 * 8 * 30 * 7)
+
+    filepath = str(tmp_path / "K.npy")
+    K1 = linear_kinship(X, out=filepath, verbose=False)
+    assert_allclose(K0, K1)
+    assert_allclose(K0, npy.read(filepath, verbose=False))
+
+    K2 = npy.read(filepath, verbose=False, lazy=True)
+    assert isinstance(K2, da.Array)
+    assert_allclose(K0, K2.compute())
+
+    filepath = str(tmp_path / "Kp.npy")
+    K3 = linear_kinship(X, out=filepath, verbose=False, packed=True)
+    assert_allclose(K0[tril_indices(30)], K3)
+
+
+def test_kinship_blocks(monkeypatch):
+    from numpy import zeros
+    from limix.stats import _kinship
+
+    G = zeros((1000, 2000))
+    monkeypatch.setattr(_kinship, "_available_memory", lambda: 3 * 8 * 1000 * 300)
+    assert _kinship._get_blocks(G, 1, 0)[0] == (0, 300)
+
+    # Partial sums take most of the memory, but blocks keep a minimum width.
+    blocks = _kinship._get_blocks(G, 2, 2 * 8 * 1000 * 1000)
+    assert blocks[0] == (0, 256)
+    assert blocks[-1] == (1792, 2000)
+
+    assert _kinship._get_blocks(G[:, :40], 1, 0) == [(0, 40)]
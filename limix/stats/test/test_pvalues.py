@@ -1,7 +1,8 @@
+from numpy import isnan, log, nan
 from numpy.random import RandomState
 from numpy.testing import assert_allclose
 
-from limix.stats import empirical_pvalues, multipletests
+from limix.stats import empirical_pvalues, lrt_pvalues, multipletests
 
 
 def test_empirical_pvalues():
@@ -17,6 +18,40 @@ def test_empirical_pvalues():
     assert_allclose(pv[-3:], [0.249, 0.3278, 0.4848])
 
 
+def test_empirical_pvalues_batches():
+    random = RandomState(1)
+
+    x0 = random.chisquare(1, 1000)
+    x1 = random.chisquare(1, 10000)
+    x0[:10] = x1[:10]
+
+    pv = empirical_pvalues(x0, x1)
+    batches = (x1[i : i + 999] for i in range(0, 10000, 999))
+    assert_allclose(empirical_pvalues(x0, batches), pv)
+
+
+def test_lrt_pvalues():
+    from scipy.stats import chi2
+
+    random = RandomState(2)
+
+    lml = random.chisquare(1, 100) / 2
+    for dof in [1, 2, 3]:
+        pv = lrt_pvalues(0, lml, dof)
+        assert_allclose(pv, chi2(df=dof).sf(2 * lml), rtol=1e-10)
+        assert_allclose(lrt_pvalues(0, lml, dof, log=True), log(pv), rtol=1e-10)
+
+    dof = random.randint(1, 4, 100)
+    assert_allclose(lrt_pvalues(0, lml, dof), chi2.sf(2 * lml, dof), rtol=1e-10)
+
+    logpv = lrt_pvalues(0, [1000, 2000], [1, 3], log=True)
+    assert_allclose(logpv, [-1004.0267, -1996.0785], rtol=1e-6)
+
+    pv = lrt_pvalues(0, [1, 2, 3], [1, nan, 2])
+    assert isnan(pv[1])
+    assert_allclose(pv[[0, 2]], chi2.sf([2, 6], [1, 2]), rtol=1e-10)
+
+
 def test_multipletests():
     random = RandomState(5)
 
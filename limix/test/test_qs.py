@@ -0,0 +1,53 @@
+import os
+
+from numpy import dot
+from numpy.random import RandomState
+from numpy.testing import assert_allclose
+
+import limix
+from limix._qs import economic_qs, economic_qs_linear, normalise_qs
+
+
+def test_qs_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setitem(limix.config, "qs.cache", True)
+
+    random = RandomState(0)
+    G = random.randn(20, 5)
+    K = dot(G, G.T)
+
+    QS0 = economic_qs(K)
+    files = os.listdir(tmp_path / "limix" / "qs")
+    assert len(files) == 1
+
+    QS1 = economic_qs(K)
+    assert_allclose(QS0[0][0], QS1[0][0])
+    assert_allclose(QS0[1], QS1[1])
+    assert os.listdir(tmp_path / "limix" / "qs") == files
+
+    economic_qs(K + 1)
+    assert len(os.listdir(tmp_path / "limix" / "qs")) == 2
+
+
+def test_qs_normalise():
+    random = RandomState(0)
+    G = random.randn(20, 5)
+    K = dot(G, G.T)
+
+    (Q0, _), S0 = normalise_qs(economic_qs(K))
+    assert_allclose((Q0 * S0) @ Q0.T, K / K.diagonal().mean(), atol=1e-10)
+
+
+def test_qs_linear():
+    random = RandomState(0)
+
+    for p in [5, 30]:
+        G = random.randn(20, p)
+        G -= G.mean(0)
+        K = dot(G, G.T) / p
+
+        (Q0, Q1), S0 = economic_qs_linear(G)
+        assert_allclose((Q0 * S0) @ Q0.T, K, atol=1e-10)
+        assert_allclose(Q0.T @ Q1, 0, atol=1e-10)
+        assert Q0.shape[1] + Q1.shape[1] == 20
+        assert_allclose(sorted(S0), sorted(economic_qs(K)[1]))
@@ -2,6 +2,7 @@ import warnings
 
 from .._data import conform_dataset, normalize_likelihood
 from .._display import session_block
+from .._qs import economic_qs, normalise_qs
 
 
 class VarDec(object):
@@ -97,6 +98,7 @@ class VarDec(object):
         else:
             self._mean = LinearMean(asarray(M, float))
         self._covariance = []
+        self._QS = []
         self._glmm = None
         self._fit = False
         self._unnamed = 0
@@ -180,8 +182,24 @@ class VarDec(object):
 
         cov.name = name
         self._covariance.append(cov)
+        self._QS.append(None)
 
-    def append(self, K, name=None):
+    def append(self, K, name=None, QS=None):
+        """
+        Append a covariance matrix.
+
+        Parameters
+        ----------
+        K : n×n array_like
+            Covariance matrix. It is normalised as ``K = K / K.diagonal().mean()``.
+        name : str, optional
+            Name of the random effect. Defaults to ``None``.
+        QS : tuple, optional
+            Economic eigendecomposition ``((Q0, Q1), S0)`` of ``K``, as returned by
+            :func:`numpy_sugar.linalg.economic_qs`. It is normalised in the same way
+            as ``K`` and avoids decomposing ``K`` again when the model is fitted.
+            Defaults to ``None``.
+        """
         from numpy_sugar import is_all_finite
         from numpy import asarray
         from glimix_core.cov import GivenCov
@@ -204,6 +222,9 @@ class VarDec(object):
         cov.name = name
 
         self._covariance.append(cov)
+        if QS is not None:
+            QS = normalise_qs(QS)
+        self._QS.append(QS)
 
     def plot(self):
         import limix
@@ -247,10 +268,12 @@ class VarDec(object):
     def _fit_lmm_multi_trait(self, verbose):
         from numpy import sqrt, asarray
         from glimix_core.lmm import Kron2Sum
-        from numpy_sugar.linalg import economic_qs, ddot
+        from numpy_sugar.linalg import ddot
 
         X = asarray(self._M, float)
-        QS = economic_qs(self._covariance[0]._K)
+        QS = self._QS[0]
+        if QS is None:
+            QS = economic_qs(self._covariance[0]._K)
         G = ddot(QS[0][0], sqrt(QS[1]))
         lmm = Kron2Sum(self._y, self._mean.A, X, G, rank=1, restricted=True)
         lmm.fit(verbose=verbose)
@@ -260,32 +283,24 @@ class VarDec(object):
         self._mean.B = lmm.B
 
     def _fit_lmm_simple_model(self, verbose):
-        from numpy_sugar.linalg import economic_qs
         from glimix_core.lmm import LMM
         from numpy import asarray
 
-        K = self._get_matrix_simple_model()
+        QS = self._get_qs_simple_model()
 
         y = asarray(self._y, float).ravel()
-        QS = None
-        if K is not None:
-            QS = economic_qs(K)
         lmm = LMM(y, self._M, QS)
         lmm.fit(verbose=verbose)
         self._set_simple_model_variances(lmm.v0, lmm.v1)
         self._glmm = lmm
 
     def _fit_glmm_simple_model(self, verbose):
-        from numpy_sugar.linalg import economic_qs
         from glimix_core.glmm import GLMMExpFam
         from numpy import asarray
 
-        K = self._get_matrix_simple_model()
+        QS = self._get_qs_simple_model()
 
         y = asarray(self._y, float).ravel()
-        QS = None
-        if K is not None:
-            QS = economic_qs(K)
 
         glmm = GLMMExpFam(y, self._lik, self._M, QS)
         glmm.fit(verbose=verbose)
@@ -302,16 +317,16 @@ class VarDec(object):
             elif isinstance(c, EyeCov):
                 c.scale = v1
 
-    def _get_matrix_simple_model(self):
+    def _get_qs_simple_model(self):
         from glimix_core.cov import GivenCov
 
-        K = None
-        for i in range(len(self._covariance)):
-            if isinstance(self._covariance[i], GivenCov):
-                self._covariance[i].scale = 1.0
-                K = self._covariance[i].value()
-                break
-        return K
+        for c, QS in zip(self._covariance, self._QS):
+            if isinstance(c, GivenCov):
+                c.scale = 1.0
+                if QS is None:
+                    QS = economic_qs(c.value())
+                return QS
+        return None
 
     def _multi_trait(self):
         return self._y.ndim == 2 and self._y.shape[1] > 1
@@ -182,3 +182,34 @@ def test_vardec_multitrait():
         ],
         rtol=1e-4,
     )
+
+
+def test_vardec_qs():
+    from numpy_sugar.linalg import economic_qs
+
+    random = RandomState(0)
+    nsamples = 20
+
+    X = random.randn(nsamples, 2)
+    X = (X - X.mean(0)) / X.std(0)
+    X = concatenate((ones((nsamples, 1)), X), axis=1)
+
+    K = random.randn(nsamples, 10)
+    K = K @ K.T
+    K += eye(nsamples) * 1e-4
+
+    y = X @ random.randn(3) + mvn(random, zeros(nsamples), K) + random.randn(nsamples)
+
+    vardec0 = VarDec(y, "normal", X)
+    vardec0.append(K)
+    vardec0.append_iid()
+    vardec0.fit(verbose=False)
+
+    vardec1 = VarDec(y, "normal", X)
+    vardec1.append(K, QS=economic_qs(K))
+    vardec1.append_iid()
+    vardec1.fit(verbose=False)
+
+    assert_allclose(vardec0.covariance[0].scale, vardec1.covariance[0].scale)
+    assert_allclose(vardec0.covariance[1].scale, vardec1.covariance[1].scale)
+    assert_allclose(vardec0.lml(), vardec1.lml())